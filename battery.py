@@ -0,0 +1,6 @@
+#!/usr/bin/env python
+from libpv.cli.battery import run
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+from libpv.benchmarks import BENCHMARKS, run_benchmarks, find_regressions
+
+import argparse
+import json
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='bench',
+        description='Measure the throughput of the generation and consume hot paths')
+
+    parser.add_argument(
+        'benchmarks',
+        metavar='NAME',
+        nargs='*',
+        help=f'the benchmarks to run [default: all]. Available: {", ".join(BENCHMARKS)}')
+    parser.add_argument(
+        '-n', '--samples',
+        type=int,
+        default=100_000,
+        help='the number of samples processed by each benchmark [default: 100000]')
+    parser.add_argument(
+        '-r', '--repeat',
+        type=int,
+        default=3,
+        help='the number of runs of each benchmark; the fastest run is reported [default: 3]')
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        type=str,
+        help='save the results as JSON to this file')
+    parser.add_argument(
+        '-c', '--compare',
+        metavar='FILE',
+        type=str,
+        help='compare the results with a JSON file saved earlier, and fail if a benchmark got slower')
+    parser.add_argument(
+        '-t', '--tolerance',
+        type=float,
+        default=0.1,
+        help='the allowed slowdown when comparing results, 0.1 = 10%% [default: 0.1]')
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help="don't print information to stdout")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    quiet = args.quiet
+    names = args.benchmarks or list(BENCHMARKS)
+
+    for name in names:
+        if name not in BENCHMARKS:
+            raise CliError(f'unknown benchmark `{name}`')
+    if args.samples < 1 or args.repeat < 1:
+        raise CliError('samples and repeat must be at least 1')
+
+    def on_result(name: str, result: dict):
+        if not quiet:
+            print(f'{name:<28} {result["samples_per_sec"]:>14,.0f} samples/s')
+
+    results = run_benchmarks(names, args.samples, args.repeat, on_result)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        regressions = find_regressions(baseline, results, args.tolerance)
+        for name, ratio in regressions:
+            print(f'regression: {name} reached {ratio:.0%} of the baseline throughput')
+        if regressions:
+            sys.exit(1)
+
+
+class CliError(Exception):
+    def __init__(self, desc: str):
+        self.description = desc
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('Interrupted')
+    except CliError as e:
+        print(f'error: {e.description}')
+        sys.exit(1)
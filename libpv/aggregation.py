@@ -0,0 +1,238 @@
+from libpv.meter import SECONDS_STEP
+from libpv.time_of_day import TimeOfDay, Timestamp, MILLIS_PER_DAY, seconds_from_millis
+
+from array import array
+import math
+import os
+import numpy as np
+
+AGGREGATE_HEADER = (
+    'start,samples,'
+    'meter_min,meter_max,meter_mean,pv_min,pv_max,pv_mean,sum_min,sum_max,sum_mean,'
+    'meter_wh,pv_wh,sum_wh,self_consumption\n')
+
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_window(input: str) -> float:
+    "Parses the length of a window in seconds, e.g. `300`, `15m` or `1h`"
+
+    factor = _UNITS.get(input[-1:], None)
+    number = input[:-1] if factor is not None else input
+    seconds = float(number) * (factor or 1)
+    if not math.isfinite(seconds) or round(seconds * 1000) < 1:
+        raise ValueError(f'invalid window `{input}`')
+    return seconds
+
+
+def window_label(seconds: float) -> str:
+    "A short name of a window length, e.g. `15m`"
+
+    for unit in 'dhm':
+        if seconds % _UNITS[unit] == 0:
+            return f'{int(seconds // _UNITS[unit])}{unit}'
+    return f'{seconds:g}s'
+
+
+def aggregate_path(path: str, seconds: float) -> str:
+    "The path of the aggregates of the output file at `path`, e.g. `pv_values.15m.csv` for `pv_values.txt`"
+
+    (stem, _) = os.path.splitext(path)
+    return f'{stem}.{window_label(seconds)}.csv'
+
+
+def _to_millis(times) -> (np.ndarray, bool):
+    """Converts times to milliseconds. Returns the milliseconds and whether they are absolute
+    (since the epoch) instead of since midnight."""
+
+    if isinstance(times, list):
+        if times and isinstance(times[0], Timestamp):
+            return np.fromiter((t.millis for t in times), dtype=np.int64, count=len(times)), True
+        return np.fromiter((round(t.seconds() * 1000) for t in times), dtype=np.int64, count=len(times)), False
+
+    times = np.asarray(times)
+    if times.dtype.kind == 'M':
+        return times.astype('M8[ms]').view(np.int64), True
+    return np.rint(times * 1000).astype(np.int64), False
+
+
+class _Window:
+    __slots__ = ('key', 'absolute', 'last_millis', 'count', 'mins', 'maxs', 'totals', 'self_consumed')
+
+    def merge(self, count, mins, maxs, totals, self_consumed):
+        self.count += count
+        self.mins = [min(a, b) for a, b in zip(self.mins, mins)]
+        self.maxs = [max(a, b) for a, b in zip(self.maxs, maxs)]
+        self.totals = [a + b for a, b in zip(self.totals, totals)]
+        self.self_consumed += self_consumed
+
+
+class WindowAggregator:
+    """
+    Aggregates the samples over consecutive windows of `window` seconds and writes one CSV line
+    per window to the file at `path`, which must not exist yet. The windows are aligned to
+    midnight (UTC midnight for absolute timestamps). The columns are described by `AGGREGATE_HEADER`:
+
+    * the start of the window and the number of samples
+    * the minimum, maximum and mean of the meter, PV and sum values, in W
+    * the energy of the meter, PV and sum values in Wh, assuming a sample every `step` seconds
+    * the fraction of the PV energy that is consumed on site, i.e. not exported (`sum > 0`)
+
+    Only the open window is kept in memory. It is written when a sample of the next window
+    arrives, or when the aggregator is closed. Samples must be ordered by time; with times of day,
+    a time earlier than the previous one starts a new day.
+    """
+
+    def __init__(self, window: float, path: str, step: float = SECONDS_STEP):
+        self.window = window
+        self.window_ms = round(window * 1000)
+        self.step = step
+        self.file = open(path, 'x')
+        self.file.write(AGGREGATE_HEADER)
+        self.open_window = None
+
+    def add(self, millis: np.ndarray, absolute: bool, meter_values, pv_values, sums):
+        """Adds samples, where `millis` are the times in milliseconds since midnight,
+        or since the epoch if `absolute` is true"""
+
+        if len(millis) == 0:
+            return
+
+        keys = millis // self.window_ms
+        starts = np.empty(len(keys), dtype=bool)
+        starts[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=starts[1:])
+        starts[1:] |= millis[1:] < millis[:-1]
+        starts = np.flatnonzero(starts)
+
+        columns = [np.asarray(meter_values), np.asarray(pv_values), np.asarray(sums)]
+        counts = np.diff(starts, append=len(keys)).tolist()
+        mins = [np.minimum.reduceat(c, starts).tolist() for c in columns]
+        maxs = [np.maximum.reduceat(c, starts).tolist() for c in columns]
+        totals = [np.add.reduceat(c.astype(np.int64), starts).tolist() for c in columns]
+        self_consumed = np.add.reduceat(
+            columns[1].astype(np.int64) - np.maximum(columns[2], 0), starts).tolist()
+        # the last time of each window, to detect the start of a new day
+        last_millis = millis[np.append(starts[1:], len(keys)) - 1].tolist()
+        keys = keys[starts].tolist()
+
+        window = self.open_window
+        for i, key in enumerate(keys):
+            stats = (
+                counts[i],
+                [m[i] for m in mins], [m[i] for m in maxs], [t[i] for t in totals],
+                self_consumed[i])
+
+            if i == 0 and window is not None and window.key == key and window.absolute == absolute \
+                    and window.last_millis <= millis[0]:
+                window.merge(*stats)
+            else:
+                if window is not None:
+                    self._write(window)
+                window = _Window()
+                (window.count, window.mins, window.maxs, window.totals, window.self_consumed) = stats
+                window.key = key
+                window.absolute = absolute
+            window.last_millis = last_millis[i]
+
+        self.open_window = window
+
+    def _write(self, window: _Window):
+        start = window.key * self.window_ms
+        if window.absolute:
+            label = str(Timestamp(start))
+        else:
+            label = str(TimeOfDay(seconds_from_millis(start % MILLIS_PER_DAY)))
+
+        count = window.count
+        means = ','.join(f'{mn},{mx},{total / count:.1f}' for mn, mx, total in zip(window.mins, window.maxs, window.totals))
+        energy = ','.join(f'{total * self.step / 3600:.2f}' for total in window.totals)
+        pv_total = window.totals[1]
+        fraction = f'{window.self_consumed / pv_total:.4f}' if pv_total > 0 else ''
+        self.file.write(f'{label},{count},{means},{energy},{fraction}\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        "Writes the open window and closes the file"
+
+        if self.open_window is not None:
+            self._write(self.open_window)
+            self.open_window = None
+        self.file.close()
+
+
+class AggregatingOutput:
+    """
+    Passes the samples to `output` and additionally to the `WindowAggregator`s, so a simulation
+    produces aggregates over several windows without reading its output again.
+
+    The buffering works like in the wrapped output: the samples are aggregated in `write_batch()`,
+    which can run in another thread, so the aggregation doesn't slow down the message loop.
+    """
+
+    def __init__(self, output, aggregators: [WindowAggregator]):
+        self.output = output
+        self.aggregators = aggregators
+        self.buffer_size = output.buffer_size
+
+        self.chunks = []
+        self.columns = self._new_columns()
+
+    @staticmethod
+    def _new_columns():
+        return [], array('q'), array('q'), array('q')
+
+    def write(self, time: TimeOfDay, meter_value: int, pv_value: int, sum: int):
+        self.output.write(time, meter_value, pv_value, sum)
+
+        (times, meter_values, pv_values, sums) = self.columns
+        times.append(time)
+        meter_values.append(meter_value)
+        pv_values.append(pv_value)
+        sums.append(sum)
+
+    def write_arrays(self, times, meter_values, pv_values, sums):
+        self.output.write_arrays(times, meter_values, pv_values, sums)
+
+        self._finish_columns()
+        self.chunks.append((times, meter_values, pv_values, sums))
+
+    def _finish_columns(self):
+        if len(self.columns[0]) > 0:
+            (times, *values) = self.columns
+            self.chunks.append((times, *(np.frombuffer(c, dtype=np.int64) for c in values)))
+            self.columns = self._new_columns()
+
+    def pending(self) -> int:
+        return self.output.pending()
+
+    def detach(self):
+        self._finish_columns()
+        chunks = self.chunks
+        self.chunks = []
+        return self.output.detach(), chunks
+
+    def write_batch(self, batch):
+        (output_batch, chunks) = batch
+        self.output.write_batch(output_batch)
+
+        for (times, meter_values, pv_values, sums) in chunks:
+            (millis, absolute) = _to_millis(times)
+            for aggregator in self.aggregators:
+                aggregator.add(millis, absolute, meter_values, pv_values, sums)
+        for aggregator in self.aggregators:
+            aggregator.flush()
+
+    def flush(self):
+        self.write_batch(self.detach())
+
+    def sync(self) -> int:
+        return self.output.sync()
+
+    def close(self):
+        self.flush()
+        self.output.close()
+        for aggregator in self.aggregators:
+            aggregator.close()
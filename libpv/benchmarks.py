@@ -0,0 +1,268 @@
+from libpv.messages import encode_meter_message, parse_meter_message, TEXT_FORMAT, BINARY_FORMAT
+from libpv.meter import meter_prng, times_of_day, day_timestamps, SECONDS_STEP
+from libpv.output import TextOutput
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation, simulate_offline
+from libpv.time_of_day import TimeOfDay
+from libpv.transport import create_transport
+
+from collections import deque
+from itertools import chain
+import io
+import numpy as np
+import platform
+from random import Random
+import shutil
+import tempfile
+import threading
+import time
+
+BLOCK_SIZE = 1024
+
+# The samples of one day, as sent by `meter.py`
+DAY_SAMPLES = len(day_timestamps(SECONDS_STEP))
+
+
+class InMemoryQueue:
+    "A stand-in for a RabbitMQ queue, with the parts of the channel API used by `meter.py` and `simulator.py`"
+
+    def __init__(self):
+        self.messages = deque()
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes):
+        self.messages.append(body)
+
+    def consume(self, on_message_callback):
+        "Calls `on_message_callback(body)` for every message in the queue until it is empty"
+
+        messages = self.messages
+        while messages:
+            on_message_callback(messages.popleft())
+
+
+def _new_simulation(output) -> Simulation:
+    pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+    weather_gen = chain.from_iterable(weather(0.4, Random(0)).blocks(BLOCK_SIZE))
+    return Simulation(pv_gen, weather_gen, output)
+
+
+def _encoded_day(format: str, batch_size: int) -> [bytes]:
+    rng = meter_prng(9000, 0)
+    samples = [(t.seconds(), -next(rng)) for t in times_of_day(SECONDS_STEP)]
+    return [
+        encode_meter_message(samples[i:i + batch_size], format)
+        for i in range(0, len(samples), batch_size)
+    ]
+
+
+# Every benchmark receives the number of samples to process and returns the number of samples
+# that were actually processed. Setup work should be done before the returned function is called.
+
+def bench_prng_next(n: int):
+    rng = meter_prng(9000, 0)
+    return lambda: len([next(rng) for _ in range(n)])
+
+
+def bench_prng_block(n: int):
+    rng = meter_prng(9000, 0)
+    return lambda: len(rng.take(n))
+
+
+def bench_weather_next(n: int):
+    w = weather(0.4, Random(0))
+    return lambda: len([next(w) for _ in range(n)])
+
+
+def bench_weather_block(n: int):
+    w = weather(0.4, Random(0))
+    return lambda: len(w.take(n))
+
+
+def bench_pv_get_value(n: int):
+    gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+    times = [TimeOfDay(t) for t in range(n)]
+    return lambda: len([gen.get_value(t) for t in times])
+
+
+def bench_pv_get_values(n: int):
+    gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+    seconds = np.arange(n)
+    return lambda: len(gen.get_values(seconds))
+
+
+def _bench_parse(format: str, batch_size: int):
+    def bench(n: int):
+        days = n // DAY_SAMPLES + 1
+        messages = (_encoded_day(format, batch_size) * days)[:max(1, n // batch_size)]
+        return lambda: sum(len(parse_meter_message(m)) for m in messages)
+    return bench
+
+
+def bench_format_text(n: int):
+    output = TextOutput(io.StringIO(), csv=False)
+    times = [TimeOfDay(t) for t in range(n)]
+
+    def run():
+        for t in times:
+            output.write(t, -1000, 500, -500)
+        return len(output.detach())
+    return run
+
+
+def bench_format_text_arrays(n: int):
+    output = TextOutput(io.StringIO(), csv=False)
+    seconds = np.arange(n)
+    values = np.full(n, -1000)
+
+    def run():
+        output.write_arrays(seconds, values, values, values)
+        return len(output.detach())
+    return run
+
+
+def _bench_end_to_end(format: str, batch_size: int):
+    def bench(n: int):
+        days = max(1, n // DAY_SAMPLES)
+        messages = _encoded_day(format, batch_size) * days
+
+        def run():
+            queue = InMemoryQueue()
+            for body in messages:
+                queue.basic_publish(exchange='', routing_key='meter', body=body)
+
+            output = TextOutput(io.StringIO(), csv=False)
+            simulation = _new_simulation(output)
+
+            def receive(body: bytes):
+                simulation.process(parse_meter_message(body))
+                if output.pending() >= output.buffer_size:
+                    output.flush()
+
+            queue.consume(receive)
+            output.flush()
+            return days * DAY_SAMPLES
+        return run
+    return bench
+
+
+def _bench_transport(scheme: str, format: str, batch_size: int):
+    """Like `_bench_end_to_end`, but the messages are sent by a producer thread through a transport,
+    to measure its overhead"""
+
+    def bench(n: int):
+        days = max(1, n // DAY_SAMPLES)
+        messages = _encoded_day(format, batch_size) * days
+
+        def run():
+            directory = tempfile.mkdtemp() if scheme == 'unix' else None
+            url = f'unix://{directory}' if scheme == 'unix' else f'memory://bench-{time.monotonic_ns()}'
+            try:
+                output = TextOutput(io.StringIO(), csv=False)
+                simulation = _new_simulation(output)
+
+                def receive(body: bytes, delivery_tag: int):
+                    simulation.process(parse_meter_message(body))
+                    if output.pending() >= output.buffer_size:
+                        output.flush()
+
+                consumer = create_transport(url)
+                consumer.consume('meter', receive)
+
+                def produce():
+                    producer = create_transport(url)
+                    for body in messages:
+                        producer.publish('', 'meter', body)
+                    producer.close()
+
+                thread = threading.Thread(target=produce)
+                thread.start()
+                consumer.run()
+                thread.join()
+                consumer.close()
+                output.flush()
+            finally:
+                if directory is not None:
+                    shutil.rmtree(directory)
+            return days * DAY_SAMPLES
+        return run
+    return bench
+
+
+def bench_offline(n: int):
+    days = max(1, n // DAY_SAMPLES)
+
+    def run():
+        simulate_offline(_new_simulation(TextOutput(io.StringIO(), csv=False)), 9000, 0, days)
+        return days * DAY_SAMPLES
+    return run
+
+
+BENCHMARKS = {
+    'prng_next': bench_prng_next,
+    'prng_block': bench_prng_block,
+    'weather_next': bench_weather_next,
+    'weather_block': bench_weather_block,
+    'pv_get_value': bench_pv_get_value,
+    'pv_get_values': bench_pv_get_values,
+    'parse_text': _bench_parse(TEXT_FORMAT, 1),
+    'parse_text_batch100': _bench_parse(TEXT_FORMAT, 100),
+    'parse_binary_batch100': _bench_parse(BINARY_FORMAT, 100),
+    'format_text': bench_format_text,
+    'format_text_arrays': bench_format_text_arrays,
+    'end_to_end_text': _bench_end_to_end(TEXT_FORMAT, 1),
+    'end_to_end_binary_batch100': _bench_end_to_end(BINARY_FORMAT, 100),
+    'transport_memory_text': _bench_transport('memory', TEXT_FORMAT, 1),
+    'transport_unix_text': _bench_transport('unix', TEXT_FORMAT, 1),
+    'transport_unix_binary100': _bench_transport('unix', BINARY_FORMAT, 100),
+    'offline': bench_offline,
+}
+
+
+def run_benchmark(bench, samples: int, repeat: int) -> dict:
+    """Runs a benchmark `repeat` times and returns the throughput of the fastest run.
+    The setup of each run isn't measured."""
+
+    best = None
+    for _ in range(repeat):
+        run = bench(samples)
+        start = time.perf_counter()
+        processed = run()
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed / processed < best['seconds'] / best['samples']:
+            best = {'samples': processed, 'seconds': elapsed}
+
+    best['samples_per_sec'] = best['samples'] / best['seconds']
+    return best
+
+
+def run_benchmarks(names: [str], samples: int, repeat: int, on_result=None) -> dict:
+    "Runs the given benchmarks and returns the results in a JSON-serializable dict"
+
+    results = {}
+    for name in names:
+        results[name] = run_benchmark(BENCHMARKS[name], samples, repeat)
+        if on_result is not None:
+            on_result(name, results[name])
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'samples': samples,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def find_regressions(baseline: dict, current: dict, tolerance: float) -> [(str, float)]:
+    """Compares two results of `run_benchmarks` and returns the names and relative throughputs
+    of all benchmarks that are more than `tolerance` (e.g. 0.1 = 10%) slower than the baseline"""
+
+    regressions = []
+    for name, result in current['results'].items():
+        if name in baseline['results']:
+            ratio = result['samples_per_sec'] / baseline['results'][name]['samples_per_sec']
+            if ratio < 1 - tolerance:
+                regressions.append((name, ratio))
+    return regressions
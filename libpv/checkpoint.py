@@ -0,0 +1,145 @@
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+from itertools import chain, islice
+import json
+from operator import length_hint
+import os
+
+
+class CheckpointableIterator:
+    """
+    Iterates over the values of `source` in blocks, like `chain.from_iterable(source.blocks(block_size))`,
+    but remembers the state of `source` before the current block, so the position can be saved with
+    `getstate()` and restored with `setstate()`. `source` must support `take()`, `getstate()` and
+    `setstate()`, e.g. `Weather` or `ContinuousPrng`.
+
+    For speed, `iter()` returns a C-level iterator, which must be requested again after `setstate()`.
+    """
+
+    def __init__(self, source, block_size: int = 1024):
+        self.source = source
+        self.block_size = block_size
+        self._reset()
+
+    def _reset(self):
+        self._block_state = None
+        self._block = iter(())
+        self._values = chain.from_iterable(self._blocks())
+
+    def _blocks(self):
+        while True:
+            self._block_state = self.source.getstate()
+            self._block = iter(self.source.take(self.block_size).tolist())
+            yield self._block
+
+    def __iter__(self):
+        return self._values
+
+    def __next__(self):
+        return next(self._values)
+
+    def getstate(self) -> dict:
+        "Returns a JSON-serializable checkpoint of the position"
+
+        remaining = length_hint(self._block)
+        if remaining == 0:
+            return {'source': self.source.getstate(), 'offset': 0}
+        return {'source': self._block_state, 'offset': self.block_size - remaining}
+
+    def setstate(self, state: dict):
+        self.source.setstate(state['source'])
+        self._reset()
+
+        offset = state['offset']
+        next(islice(self._values, offset, offset), None)
+
+
+class Checkpoint:
+    "A JSON file containing the state needed to resume a run, which is replaced atomically"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> dict:
+        "Returns the saved state, or `None` if there is no checkpoint"
+
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state: dict):
+        "Writes the checkpoint, so that a crash leaves either the old or the new state"
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class Checkpointer:
+    """
+    Saves the state of a simulation together with the position of its output, so that a run can be
+    resumed with the same weather values after a crash.
+
+    `snapshot()` must be called when the output is detached or flushed, because the state has to
+    match the samples written so far. `commit()` can then be called after the samples were written,
+    also from another thread. It makes sure the output is on disk before the checkpoint is saved.
+    `rollback()` returns to the last committed checkpoint.
+    """
+
+    def __init__(self, checkpoint: Checkpoint, simulation, weather_values: CheckpointableIterator, **fields):
+        self.checkpoint = checkpoint
+        self.simulation = simulation
+        self.weather_values = weather_values
+        self.fields = fields
+
+    def snapshot(self, **fields) -> dict:
+        (last_time, batch_start) = (self.simulation.last_time, self.simulation.batch_start)
+        self.simulation.batch_start = None
+        return dict(
+            self.fields,
+            weather=self.weather_values.getstate(),
+            last_time=last_time.seconds() if last_time is not None else None,
+            last_timestamp=last_time.millis if isinstance(last_time, Timestamp) else None,
+            batch_start_time=batch_start.seconds() if batch_start is not None else None,
+            batch_start_timestamp=batch_start.millis if isinstance(batch_start, Timestamp) else None,
+            **fields)
+
+    def commit(self, state: dict):
+        position = self.simulation.output.sync()
+        self.checkpoint.save(dict(state, output_position=position))
+
+    def rollback(self):
+        """Returns to the last saved checkpoint before the messages that weren't acknowledged are redelivered
+        in the same process: discards the buffered samples, restores the position of the weather stream and
+        skips the redelivered samples that were written (see `Simulation.resume_after()`)"""
+
+        state = self.checkpoint.load()
+        simulation = self.simulation
+
+        simulation.output.detach()
+        self.weather_values.setstate(state['weather'])
+        simulation.weather_gen = iter(self.weather_values)
+        simulation.batch_start = None
+        simulation.skip_through = None
+
+        last_time = saved_time(state, 'last')
+        if last_time is not None:
+            simulation.resume_after(last_time, saved_time(state, 'batch_start'))
+        else:
+            simulation.last_time = None
+
+
+def saved_time(state: dict, name: str) -> TimeOfDay:
+    """Returns a time saved by `Checkpointer.snapshot()`, i.e. `'last'` or `'batch_start'`, as a `Timestamp`
+    if it was one, or `None`"""
+
+    millis = state.get(f'{name}_timestamp')
+    if millis is not None:
+        return Timestamp(millis)
+    seconds = state.get(f'{name}_time')
+    return TimeOfDay(seconds) if seconds is not None else None
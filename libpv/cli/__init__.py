@@ -0,0 +1,8 @@
+"""
+The command line programs. They are installed as console scripts (see `pyproject.toml`), and can also
+be run with the scripts in the root directory, e.g. `./simulator.py`.
+
+These modules only import `argparse`, `libpv.defaults` and other modules without heavy dependencies at
+the top. numpy, pika and pyarrow are imported in `main()` once the arguments are valid, so that `--help`,
+invalid arguments and short runs start quickly. `tests/startup.py` checks this.
+"""
@@ -0,0 +1,124 @@
+from libpv.defaults import SECONDS_STEP
+
+import argparse
+import errno
+import math
+import os
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='battery',
+        description='Simulate home batteries of many sizes on the output of the simulator')
+
+    parser.add_argument(
+        'input',
+        metavar='FILE',
+        type=str,
+        help='an output file of the simulator (text, CSV, .npy, .parquet or .arrow)')
+    parser.add_argument(
+        '--capacity',
+        metavar='WH',
+        type=parse_values,
+        default=[0, 2500, 5000, 10000],
+        help='the usable capacities in Wh, as a list (`5000,10000`) or a range (`0:20000:500`) '
+        '[default: 0,2500,5000,10000]')
+    parser.add_argument(
+        '--power',
+        metavar='W',
+        type=parse_values,
+        default=[5000],
+        help='the maximum charge and discharge power in W, as a list or a range [default: 5000]')
+    parser.add_argument(
+        '--efficiency',
+        metavar='FACTOR',
+        type=parse_values,
+        default=[0.9],
+        help='the round-trip efficiencies, as a list or a range [default: 0.9]')
+    parser.add_argument(
+        '--step',
+        metavar='SECONDS',
+        type=float,
+        default=SECONDS_STEP,
+        help=f'the interval between two values in the input [default: {SECONDS_STEP}]')
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        type=str,
+        default='battery.csv',
+        help='the CSV file where the results should be written to, one line per battery. '
+        'All combinations of capacity, power and efficiency are simulated [default: battery.csv]')
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help="don't print information to stdout")
+
+    return parser.parse_args()
+
+
+def parse_values(input: str) -> [float]:
+    "Parses a list of numbers like `1,2,3` or a range like `0:100:10`, which includes the end"
+
+    try:
+        if ':' in input:
+            (start, stop, step) = map(float, input.split(':'))
+            if step <= 0:
+                raise ValueError()
+            return [start + i * step for i in range(max(0, math.ceil((stop - start) / step + 0.5)))]
+        return [float(value) for value in input.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid values `{input}`')
+
+
+def main():
+    args = parse_args()
+
+    from libpv.battery import BatteryConfigs, BatteryDispatch
+    from libpv.output import read_output
+
+    if args.step <= 0:
+        raise CliError('step must be positive')
+    try:
+        configs = BatteryConfigs.grid(args.capacity, args.power, args.efficiency)
+    except ValueError as e:
+        raise CliError(str(e))
+
+    if os.path.exists(args.output):
+        raise FileExistsError(errno.EEXIST, 'File exists', args.output)
+    if not args.quiet:
+        print(f' [*] Simulating {len(configs)} batteries on `{args.input}`')
+
+    dispatch = BatteryDispatch(configs, args.step)
+    try:
+        for (meter_values, pv_values, _) in read_output(args.input):
+            dispatch.process(meter_values, pv_values)
+    except FileNotFoundError as e:
+        raise CliError(f'File `{e.filename}` not found')
+    except ImportError as e:
+        raise CliError(str(e))
+
+    with open(args.output, 'x') as file:
+        dispatch.write_csv(file)
+
+    if not args.quiet:
+        print(f' [*] Processed {dispatch.samples} samples, results written to `{args.output}`')
+
+
+class CliError(Exception):
+    def __init__(self, desc: str):
+        self.description = desc
+
+
+def run():
+    "The entry point of the console script, which prints errors instead of raising them"
+
+    try:
+        main()
+    except FileExistsError as e:
+        print(f'error: File `{e.filename}` already exists\n'
+              'delete or rename it before trying again')
+        sys.exit(1)
+    except CliError as e:
+        print(f'error: {e.description}')
+        sys.exit(1)
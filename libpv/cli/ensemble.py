@@ -0,0 +1,163 @@
+from libpv.defaults import SECONDS_STEP, DEFAULT_PERCENTILES
+from libpv.time_of_day import TimeOfDay
+
+import argparse
+import errno
+import os
+import sys
+from random import randrange
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='ensemble',
+        description='Estimate the uncertainty of the PV energy caused by the weather, '
+        'by simulating many weather trajectories')
+
+    parser.add_argument(
+        '-m', '--max-power',
+        metavar='POWER',
+        type=int,
+        default=3500,
+        help='the maximum amount of power produced in Watt [default: 3500]')
+    parser.add_argument(
+        '-i', '--sunrise',
+        metavar='TIME',
+        type=str,
+        default='08:00',
+        help='the time of sunrise [default: 8 am]')
+    parser.add_argument(
+        '-e', '--sunset',
+        metavar='TIME',
+        type=str,
+        default='20:00',
+        help='the time of sunset [default: 8 pm]')
+    parser.add_argument(
+        '-w', '--weather-noise',
+        metavar='NOISE',
+        type=float,
+        default=0.4,
+        help='the amount of noise caused by the weather. '
+        '0 = no noise, 1 = lots of noise [default: 0.4]')
+    parser.add_argument(
+        '-s', '--seed',
+        type=int,
+        help='the seed for randomness')
+    parser.add_argument(
+        '-n', '--members',
+        type=int,
+        default=1000,
+        help='the number of weather trajectories [default: 1000]')
+    parser.add_argument(
+        '--days',
+        type=int,
+        default=365,
+        help='the number of days [default: 365]')
+    parser.add_argument(
+        '--step',
+        metavar='SECONDS',
+        type=float,
+        default=SECONDS_STEP,
+        help=f'the interval between two values [default: {SECONDS_STEP}]')
+    parser.add_argument(
+        '-p', '--percentiles',
+        metavar='LIST',
+        type=parse_percentiles,
+        default=list(DEFAULT_PERCENTILES),
+        help='the percentiles of the energy, separated by commas [default: 10,50,90]')
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help='the number of worker processes [default: number of CPUs]')
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        type=str,
+        default='bands.csv',
+        help='the CSV file where the percentiles of the daily energy in Wh are written to [default: bands.csv]')
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help="don't print information to stdout")
+
+    return parser.parse_args()
+
+
+def parse_percentiles(input: str) -> [float]:
+    try:
+        percentiles = [float(p) for p in input.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid percentiles `{input}`')
+    if any(p < 0 or p > 100 for p in percentiles):
+        raise argparse.ArgumentTypeError('percentiles must be between 0 and 100')
+    return percentiles
+
+
+def main():
+    args = parse_args()
+
+    quiet = args.quiet
+    sunrise = TimeOfDay.parse_hms(args.sunrise)
+    sunset = TimeOfDay.parse_hms(args.sunset)
+    noise_factor = args.weather_noise
+    seed = args.seed if args.seed is not None else randrange(sys.maxsize)
+
+    if sunrise > sunset:
+        raise CliError("sunrise can't occur after sunset")
+    if args.max_power < 0:
+        raise CliError('max-power must be positive')
+    if noise_factor < 0 or noise_factor > 1:
+        raise CliError('noise-factor must be between 0 and 1')
+    if args.members < 1:
+        raise CliError('members must be at least 1')
+    if args.days < 1:
+        raise CliError('days must be at least 1')
+    if args.step < 0.001:
+        raise CliError('step must be at least 0.001')
+    if args.workers < 1:
+        raise CliError('workers must be at least 1')
+    if os.path.exists(args.output):
+        raise FileExistsError(errno.EEXIST, 'File exists', args.output)
+
+    from libpv.ensemble import ensemble_daily_energy, percentile_bands, write_bands
+    from libpv.meter import day_timestamps
+    from libpv.pv_generation import PvGenerator
+
+    if not quiet:
+        print(f' [*] Simulating {args.members} weather trajectories for {args.days} day(s) '
+              f'on {args.workers} worker(s)')
+        print(f' [*] Seed: {seed}')
+
+    curve = PvGenerator(sunrise, sunset, args.max_power).get_values(day_timestamps(args.step))
+    energy = ensemble_daily_energy(curve, noise_factor, seed, args.members, args.days, args.step, args.workers)
+    bands = percentile_bands(energy, args.percentiles)
+
+    with open(args.output, 'x') as file:
+        write_bands(file, bands)
+
+    if not quiet:
+        for p, total in zip(bands['percentiles'], bands['total']):
+            print(f' [x] P{p:g} of the total energy: {total / 1000:.1f} kWh')
+        print(f' [*] Daily percentiles written to `{args.output}`')
+
+
+class CliError(Exception):
+    def __init__(self, desc: str):
+        self.description = desc
+
+
+def run():
+    "The entry point of the console script, which prints errors instead of raising them"
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('Interrupted')
+    except FileExistsError as e:
+        print(f'error: File `{e.filename}` already exists\n'
+              'delete or rename it before trying again')
+        sys.exit(1)
+    except CliError as e:
+        print(f'error: {e.description}')
+        sys.exit(1)
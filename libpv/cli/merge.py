@@ -0,0 +1,63 @@
+import argparse
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='merge',
+        description='Merge the output files of partitioned simulators into one file ordered by time')
+
+    parser.add_argument(
+        'inputs',
+        metavar='FILE',
+        type=str,
+        nargs='+',
+        help='the output files of the simulators, in the order of their partitions')
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        type=str,
+        default='pv_values.txt',
+        help='the file where the merged values should be written to. It must have the same format '
+        'as the input files [default: pv_values.txt]')
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help="don't print information to stdout")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from libpv.partition import merge_outputs
+
+    try:
+        merge_outputs(args.inputs, args.output)
+    except FileNotFoundError as e:
+        raise CliError(f'File `{e.filename}` not found')
+    except ValueError as e:
+        raise CliError(str(e))
+
+    if not args.quiet:
+        print(f' [*] Merged {len(args.inputs)} file(s) into `{args.output}`')
+
+
+class CliError(Exception):
+    def __init__(self, desc: str):
+        self.description = desc
+
+
+def run():
+    "The entry point of the console script, which prints errors instead of raising them"
+
+    try:
+        main()
+    except FileExistsError as e:
+        print(f'error: File `{e.filename}`` already exists\n'
+              'delete or rename it before trying again')
+        sys.exit(1)
+    except CliError as e:
+        print(f'error: {e.description}')
+        sys.exit(1)
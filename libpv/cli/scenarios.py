@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+from random import randrange
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='scenarios',
+        description='Simulate many sites and days in parallel, without RabbitMQ')
+
+    parser.add_argument(
+        'grid',
+        metavar='FILE',
+        type=str,
+        help='a CSV or JSON file with one scenario per row. Columns: name, max_power, '
+        'sunrise, sunset, weather_noise, max_consumption, days')
+    parser.add_argument(
+        '-s', '--seed',
+        type=int,
+        help='the master seed, from which the seeds of every site and day are derived')
+    parser.add_argument(
+        '-o', '--output-dir',
+        metavar='DIR',
+        type=str,
+        default='scenarios',
+        help='the directory where one file per scenario is written to [default: scenarios]')
+    parser.add_argument(
+        '--csv',
+        action='store_true',
+        help='write CSV files instead of text files')
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help='the number of worker processes [default: number of CPUs]')
+    parser.add_argument(
+        '--curve-cache',
+        metavar='CURVES',
+        type=int,
+        default=16,
+        help='the maximum number of daily PV curves shared between the workers [default: 16]')
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help="don't print information to stdout")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    quiet = args.quiet
+    seed = args.seed if args.seed is not None else randrange(sys.maxsize)
+    workers = args.workers
+
+    if workers < 1:
+        raise CliError('workers must be at least 1')
+    if args.curve_cache < 1:
+        raise CliError('curve-cache must be at least 1')
+
+    from libpv.scenarios import load_scenarios, run_scenarios
+
+    try:
+        scenarios = load_scenarios(args.grid)
+    except (ValueError, TypeError) as e:
+        raise CliError(f'invalid scenario file: {e}')
+
+    if not quiet:
+        site_days = sum(s.days for s in scenarios)
+        print(f' [*] Simulating {len(scenarios)} scenario(s) with {site_days} site-days '
+              f'on {workers} worker(s)')
+        print(f' [*] Seed: {seed}')
+
+    def on_done(scenario):
+        if not quiet:
+            print(f' [x] {scenario.name}')
+
+    run_scenarios(scenarios, seed, args.output_dir, args.csv, workers, on_done, args.curve_cache)
+
+    if not quiet:
+        print('Done')
+
+
+class CliError(Exception):
+    def __init__(self, desc: str):
+        self.description = desc
+
+
+def run():
+    "The entry point of the console script, which prints errors instead of raising them"
+
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('Interrupted')
+    except FileExistsError as e:
+        print(f'error: File `{e.filename}`` already exists\n'
+              'delete or rename it before trying again')
+        sys.exit(1)
+    except CliError as e:
+        print(f'error: {e.description}')
+        sys.exit(1)
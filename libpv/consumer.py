@@ -0,0 +1,147 @@
+from libpv.checkpoint import Checkpointer
+from libpv.metrics import Metrics
+from libpv.simulation import Simulation
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+
+class AsyncConsumer:
+    """
+    Consumes meter messages with pika's asyncio adapter and manual acknowledgements.
+
+    At most `prefetch_count` messages are unacknowledged at any time. The output of the
+    simulation is written by a background thread (write-behind), and messages are
+    acknowledged in batches only after the output containing them has been flushed.
+    This happens when half of the prefetch window is used up, or after `flush_interval`
+    seconds, whichever comes first.
+
+    If a `checkpointer` is given, a checkpoint is saved after each write, before the
+    messages are acknowledged.
+    """
+
+    def __init__(
+            self,
+            simulation: Simulation,
+            queue: str,
+            prefetch_count: int,
+            flush_interval: float = 1.0,
+            url: str = 'amqp://localhost',
+            metrics: Metrics = None,
+            checkpointer: Checkpointer = None):
+        self.simulation = simulation
+        self.metrics = metrics if metrics is not None else Metrics(simulation.output)
+        self.checkpointer = checkpointer
+        self.queue = queue
+        self.prefetch_count = prefetch_count
+        self.ack_threshold = max(1, prefetch_count // 2)
+        self.flush_interval = flush_interval
+        self.url = url
+
+        self.loop = None
+        self.connection = None
+        self.channel = None
+        self.writer = ThreadPoolExecutor(max_workers=1)
+
+        self.unacked = 0
+        self.last_delivery_tag = None
+        self.flush_timer = None
+        self.error = None
+
+    def run(self):
+        "Consumes messages until the connection is closed or `KeyboardInterrupt` is raised"
+
+        self.loop = asyncio.new_event_loop()
+        self.connection = AsyncioConnection(
+            pika.URLParameters(self.url),
+            on_open_callback=self.on_connection_open,
+            on_open_error_callback=self.on_connection_error,
+            on_close_callback=self.on_connection_closed,
+            custom_ioloop=self.loop)
+
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = self.flush()
+            if pending is not None:
+                self.loop.run_until_complete(pending)
+            self.writer.shutdown(wait=True)
+            if self.connection.is_open:
+                self.connection.close()
+                self.loop.run_forever()
+            self.loop.close()
+
+        if self.error is not None:
+            raise self.error
+
+    def on_connection_open(self, connection):
+        connection.channel(on_open_callback=self.on_channel_open)
+
+    def on_connection_error(self, connection, error):
+        self.error = error
+        self.loop.stop()
+
+    def on_connection_closed(self, connection, reason):
+        self.loop.stop()
+
+    def on_channel_open(self, channel):
+        self.channel = channel
+        channel.basic_qos(prefetch_count=self.prefetch_count, callback=self.on_qos_ok)
+
+    def on_qos_ok(self, frame):
+        self.channel.queue_declare(queue=self.queue, callback=self.on_queue_declared)
+
+    def on_queue_declared(self, frame):
+        self.channel.basic_consume(
+            queue=self.queue,
+            auto_ack=False,
+            on_message_callback=self.on_message)
+
+    def on_message(self, channel, method, properties, body: bytes):
+        self.metrics.process(self.simulation, body)
+
+        self.unacked += 1
+        self.last_delivery_tag = method.delivery_tag
+
+        if self.unacked >= self.ack_threshold:
+            self.flush()
+        elif self.flush_timer is None:
+            self.flush_timer = self.loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        """Writes the buffered output in the background and acknowledges the messages afterwards.
+        Returns the future of the write, or `None` if there was nothing to write."""
+
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+
+        if self.unacked == 0:
+            return None
+
+        batch = self.simulation.output.detach()
+        state = self.checkpointer.snapshot() if self.checkpointer is not None else None
+        delivery_tag = self.last_delivery_tag
+        self.unacked = 0
+
+        future = self.loop.run_in_executor(self.writer, self.write, batch, state)
+        future.add_done_callback(lambda f: self.on_flushed(f, delivery_tag))
+        return future
+
+    def write(self, batch, state: dict):
+        "Writes a detached batch and saves the checkpoint taken when it was detached. Runs in the writer thread."
+
+        self.metrics.write_batch(batch)
+        if state is not None:
+            self.checkpointer.commit(state)
+
+    def on_flushed(self, future, delivery_tag: int):
+        if future.exception() is not None:
+            # don't acknowledge messages that weren't written, so they are redelivered
+            self.error = future.exception()
+            if self.connection.is_open:
+                self.connection.close()
+        elif self.channel.is_open:
+            self.channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
@@ -0,0 +1,137 @@
+from libpv.pv_generation import PvGenerator
+from libpv.time_of_day import TimeOfDay, SECS_PER_DAY
+
+from collections import OrderedDict
+import hashlib
+from multiprocessing import shared_memory
+import numpy as np
+import sys
+
+# A shared curve starts with a flag that is set once the values are complete,
+# followed by one float64 per second of the day
+_HEADER_SIZE = 8
+_CURVE_SIZE = _HEADER_SIZE + SECS_PER_DAY * 8
+
+
+class CurveCache:
+    """
+    LRU cache of precomputed daily PV curves, i.e. the values of `PvGenerator.profile(1)`.
+    A curve only depends on `(sunrise, sunset, max_power)`, so it can be reused for every day
+    and every site with the same parameters. At most `max_curves` curves are kept.
+
+    If `shared` is true, curves are stored in `multiprocessing.shared_memory` under a name derived
+    from `namespace` and the parameters, so processes using the same namespace share one read-only
+    copy. If `owner` is true, missing curves are published and removed again when they are evicted
+    or the cache is closed; otherwise only curves published by another process are attached, and
+    missing curves are computed privately.
+    """
+
+    def __init__(self, max_curves: int = 16, shared: bool = False, owner: bool = True, namespace: str = 'pvcurve'):
+        if max_curves < 1:
+            raise ValueError('max_curves must be at least 1')
+
+        self.max_curves = max_curves
+        self.shared = shared
+        self.owner = owner
+        self.namespace = namespace
+
+        # key -> (curve, shared memory or None, whether this cache created the shared memory)
+        self.curves = OrderedDict()
+
+    def get(self, sunrise: TimeOfDay, sunset: TimeOfDay, max_power: int) -> np.ndarray:
+        "Returns the read-only curve for the parameters, where index `i` is the value at `i` seconds after midnight"
+
+        key = (sunrise.seconds(), sunset.seconds(), max_power)
+        if key in self.curves:
+            self.curves.move_to_end(key)
+            return self.curves[key][0]
+
+        if self.shared:
+            entry = self._load_shared(key)
+        else:
+            entry = (self._compute(key), None, False)
+
+        entry[0].flags.writeable = False
+        self.curves[key] = entry
+        if len(self.curves) > self.max_curves:
+            self._release(*self.curves.popitem(last=False)[1])
+
+        return entry[0]
+
+    def get_for(self, pv_gen: PvGenerator) -> np.ndarray:
+        return self.get(pv_gen.sunrise, pv_gen.sunset, pv_gen.max_power)
+
+    def __len__(self):
+        return len(self.curves)
+
+    def close(self):
+        "Releases all curves, and removes the shared memory created by this cache"
+
+        while self.curves:
+            self._release(*self.curves.popitem()[1])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _compute(key) -> np.ndarray:
+        (sunrise, sunset, max_power) = key
+        return PvGenerator(TimeOfDay(sunrise), TimeOfDay(sunset), max_power).profile(1)
+
+    def shared_name(self, key) -> str:
+        digest = hashlib.sha1(repr(key).encode('ascii')).hexdigest()[:16]
+        return f'{self.namespace}-{digest}'
+
+    def _load_shared(self, key):
+        name = self.shared_name(key)
+
+        try:
+            shm = _attach_shared_memory(name)
+            created = False
+        except FileNotFoundError:
+            if not self.owner:
+                return self._compute(key), None, False
+            shm = shared_memory.SharedMemory(name=name, create=True, size=_CURVE_SIZE)
+            created = True
+
+        ready = np.ndarray((1,), dtype=np.uint64, buffer=shm.buf)
+        curve = np.ndarray((SECS_PER_DAY,), dtype=np.float64, buffer=shm.buf, offset=_HEADER_SIZE)
+
+        if created:
+            curve[:] = self._compute(key)
+            ready[0] = 1
+        elif ready[0] != 1:
+            # the owner is still computing the curve
+            del ready, curve
+            shm.close()
+            return self._compute(key), None, False
+
+        del ready
+        return curve, shm, created
+
+    @staticmethod
+    def _release(curve, shm, created: bool):
+        if shm is None:
+            return
+        if created:
+            shm.unlink()
+
+        del curve
+        try:
+            shm.close()
+        except BufferError:
+            # the curve is still in use; the memory is unmapped once it is garbage collected
+            pass
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    # Before Python 3.13, attaching always registers the memory with the resource tracker,
+    # which removes it when the tracker exits. This is harmless for worker processes, because
+    # they share the tracker of the main process, which owns the memory.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    else:
+        return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,16 @@
+"""
+Constants that are needed to parse the command line. This module must not import numpy, pika or
+pyarrow (directly or indirectly), so that `--help` and invalid arguments are handled quickly.
+"""
+
+# `meter.py` sends one value every 5 seconds
+SECONDS_STEP = 5
+
+COLUMNAR_EXTENSIONS = ['.parquet', '.arrow', '.npy']
+
+# The units of the `time` column of columnar outputs: seconds or milliseconds since midnight,
+# or milliseconds since the epoch (for `Timestamp`s)
+TIME_UNITS = ['s', 'ms', 'datetime']
+
+# the percentiles of the energy computed by `ensemble.py`
+DEFAULT_PERCENTILES = (10, 50, 90)
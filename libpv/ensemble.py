@@ -0,0 +1,203 @@
+from libpv.defaults import SECONDS_STEP, DEFAULT_PERCENTILES
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+import numpy as np
+import os
+
+# the number of members generated together from one random stream
+GROUP_SIZE = 32
+
+
+class EnsemblePrng:
+    """
+    The batched variant of `SeekablePrng`: the values of many ensemble members at once, as a 2-D array
+    with one row per member. Each member is a random walk with plateaus between anchors, like a
+    `SeekablePrng` with the same parameters.
+
+    Members are generated in groups of `GROUP_SIZE`, and block `k` of a group is generated from
+    its own Philox stream, derived from `seed`, `stream`, `k` and the group. So the values of a member
+    only depend on `seed`, `stream` and its number, not on the other members that are generated.
+    """
+
+    def __init__(
+            self,
+            v_min: int, v_max: int,
+            max_diff: float, max_equal_values: int,
+            seed: int, first_group: int, groups: int,
+            stream: int = 0,
+            block_size: int = 1024):
+        self.v_min = v_min
+        self.v_max = v_max
+        self.max_equal_values = max_equal_values
+        self.seed = seed
+        self.stream = stream
+        self.groups = range(first_group, first_group + groups)
+        self.step = math.floor(max_diff)
+        self.block_size = max(block_size, math.ceil(2 * (v_max - v_min) / self.step))
+
+    def _generator(self, block: int, group: int) -> np.random.Generator:
+        seq = np.random.SeedSequence(self.seed, spawn_key=(self.stream, block, group))
+        return np.random.Generator(np.random.Philox(seq))
+
+    def _anchors(self, block: int) -> np.ndarray:
+        "The first value of block `block` of every member, which is the first value drawn from its streams"
+
+        return np.concatenate([
+            self._generator(block, group).integers(self.v_min, self.v_max, size=GROUP_SIZE, endpoint=True)
+            for group in self.groups
+        ])
+
+    def _plateau_lengths(self, gen: np.random.Generator, size: int) -> np.ndarray:
+        """Draws the lengths of the plateaus of a group, cut so that each row adds up to `size`.
+        Only a few more lengths than expected are drawn at first, since there are many steps per plateau."""
+
+        count = min(size, 4 * size // (1 + self.max_equal_values) + 16)
+        lengths = gen.integers(1, self.max_equal_values, size=(GROUP_SIZE, count), endpoint=True, dtype=np.int32)
+        ends = np.cumsum(lengths, axis=1)
+        while ends[:, -1].min() < size:
+            more = gen.integers(1, self.max_equal_values, size=(GROUP_SIZE, count), endpoint=True, dtype=np.int32)
+            ends = np.concatenate([ends, ends[:, -1:] + np.cumsum(more, axis=1)], axis=1)
+
+        np.minimum(ends, size, out=ends)
+        return np.diff(ends, axis=1, prepend=0)
+
+    def _steps(self, gen: np.random.Generator, size: int, half_step: float) -> np.ndarray:
+        "The steps of the random walks of a group: a drift that stays the same for a plateau, plus jitter"
+
+        lengths = self._plateau_lengths(gen, size)
+        drifts = gen.random(lengths.shape, dtype=np.float32)
+        steps = np.repeat(drifts.reshape(-1), lengths.reshape(-1)).reshape(GROUP_SIZE, size).astype(float)
+        steps += gen.random((GROUP_SIZE, size), dtype=np.float32) / 2
+        # drift and jitter are uniform between -half_step and half_step, and -half_step/2 and half_step/2
+        steps -= 0.75
+        steps *= 2 * half_step
+        np.clip(steps, -half_step, half_step, out=steps)
+        return steps
+
+    def block(self, k: int) -> np.ndarray:
+        "Returns the values of block `k` of every member, as an array of shape `(members, block_size)`"
+
+        (size, half_step) = (self.block_size, self.step / 2)
+        members = len(self.groups) * GROUP_SIZE
+
+        end = self._anchors(k + 1)
+
+        start = np.empty(members)
+        steps = np.empty((members, size))
+        for i, group in enumerate(self.groups):
+            rows = slice(i * GROUP_SIZE, (i + 1) * GROUP_SIZE)
+            gen = self._generator(k, group)
+            start[rows] = gen.integers(self.v_min, self.v_max, size=GROUP_SIZE, endpoint=True)
+            steps[rows] = self._steps(gen, size, half_step)
+
+        walk = np.empty((members, size + 1))
+        walk[:, 0] = start
+        np.cumsum(steps, axis=1, out=walk[:, 1:])
+        walk[:, 1:] += start[:, np.newaxis]
+        np.clip(walk, self.v_min, self.v_max, out=walk)
+
+        walk += (end - walk[:, -1])[:, np.newaxis] * np.linspace(0, 1, size + 1)
+        np.clip(walk, self.v_min, self.v_max, out=walk)
+
+        values = np.floor(walk[:, :size])
+        values[:, 0] = start
+        return values
+
+    def values(self, start: int, stop: int) -> np.ndarray:
+        "Returns the values of every member at the indices `start` up to (excluding) `stop`"
+
+        first = start // self.block_size
+        last = (stop - 1) // self.block_size
+        values = np.concatenate([self.block(k) for k in range(first, last + 1)], axis=1)
+
+        offset = first * self.block_size
+        return values[:, start - offset:stop - offset]
+
+
+class EnsembleWeather:
+    "The batched variant of `SeekableWeather`, with one row of weather factors per member"
+
+    def __init__(self, noise_factor: float, seed: int, first_group: int, groups: int):
+        self.noise_factor = noise_factor
+        self.rng1 = EnsemblePrng(0, 10_000, 10, 100, seed, first_group, groups, stream=0)
+        self.rng2 = EnsemblePrng(0, 10_000, 10, 100, seed, first_group, groups, stream=1)
+
+    def values(self, start: int, stop: int) -> np.ndarray:
+        weather = self.rng1.values(start, stop) * self.rng2.values(start, stop)
+        weather *= -self.noise_factor / 10_000 ** 2
+        weather += 1
+        return weather
+
+
+def _group_energy(task) -> np.ndarray:
+    "Computes the daily energy of the members of some groups. This runs in a worker process."
+
+    (curve, noise_factor, seed, first_group, groups, days, hours) = task
+
+    weather = EnsembleWeather(noise_factor, seed, first_group, groups)
+    samples = len(curve)
+    energy = np.empty((groups * GROUP_SIZE, days))
+    for day in range(days):
+        factors = weather.values(day * samples, (day + 1) * samples)
+        energy[:, day] = factors @ curve * hours
+    return energy
+
+
+def ensemble_daily_energy(
+        curve: np.ndarray,
+        noise_factor: float, seed: int,
+        members: int, days: int = 1,
+        step: float = SECONDS_STEP,
+        workers: int = None) -> np.ndarray:
+    """Computes the daily PV energy in Wh of `members` weather trajectories for `days` days.
+
+    `curve` is the clear-sky PV power of one day with a value every `step` seconds, which is shared by
+    all members and days. Each member has its own weather (see `EnsembleWeather`), which continues
+    from one day to the next like in `simulate_offline`.
+
+    Returns an array of shape `(members, days)`. The members are computed one group and one day at a
+    time, in a process pool with `workers` processes (by default one per CPU), so the memory use doesn't
+    depend on the number of days. The result doesn't depend on the number of workers."""
+
+    if members < 1 or days < 1:
+        raise ValueError('members and days must be at least 1')
+
+    curve = np.asarray(curve, dtype=float)
+    groups = -(-members // GROUP_SIZE)
+    hours = step / 3600
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return _group_energy((curve, noise_factor, seed, 0, groups, days, hours))[:members]
+
+    # a few groups per task, so that every worker has something to do
+    per_task = max(1, groups // (4 * workers))
+    tasks = [
+        (curve, noise_factor, seed, first, min(per_task, groups - first), days, hours)
+        for first in range(0, groups, per_task)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.concatenate(list(executor.map(_group_energy, tasks)))[:members]
+
+
+def percentile_bands(daily_energy: np.ndarray, percentiles: [float] = DEFAULT_PERCENTILES) -> dict:
+    """Reduces the result of `ensemble_daily_energy()` to percentiles over the members. Returns a dict with
+    the percentiles of every day (`'daily'`, shape `(len(percentiles), days)`) and of the total energy
+    (`'total'`). P10 is the energy that is exceeded by 90 % of the members."""
+
+    return {
+        'percentiles': list(percentiles),
+        'daily': np.percentile(daily_energy, percentiles, axis=0),
+        'total': np.percentile(daily_energy.sum(axis=1), percentiles),
+    }
+
+
+def write_bands(file, bands: dict):
+    "Writes the result of `percentile_bands()` as CSV, with a line per day and a last line with the total energy"
+
+    names = [f'p{p:g}' for p in bands['percentiles']]
+    file.write(','.join(['day'] + names) + '\n')
+    for day, values in enumerate(bands['daily'].T):
+        file.write(','.join([str(day)] + [f'{v:.1f}' for v in values]) + '\n')
+    file.write(','.join(['total'] + [f'{v:.1f}' for v in bands['total']]) + '\n')
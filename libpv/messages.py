@@ -0,0 +1,205 @@
+from libpv.time_of_day import TimeOfDay, Timestamp, seconds_from_millis
+
+import re
+import struct
+
+TEXT_FORMAT = 'text'
+BINARY_FORMAT = 'binary'
+FORMATS = [TEXT_FORMAT, BINARY_FORMAT]
+
+# Binary messages start with a version byte. Text messages always start with a digit, or with
+# a header line (`@` or `#`), so the formats can be told apart by the first byte.
+BINARY_V1 = 1
+# like version 1, but the version byte is followed by the length of the site id and the site id
+BINARY_V2 = 2
+# timestamps in milliseconds: the version byte is followed by a flags byte, the length of the
+# site id (0 = no site id) and the site id
+BINARY_V3 = 3
+
+# flag of version 3: the timestamps are milliseconds since the epoch instead of since midnight
+_ABSOLUTE = 1
+
+# text header of messages with absolute timestamps, which are milliseconds since the epoch
+_EPOCH_HEADER = '#epoch'
+
+# uint32 timestamp, int32 meter value (little endian)
+_BINARY_V1_RECORD = struct.Struct('<Ii')
+# int64 timestamp in milliseconds, int32 meter value (little endian)
+_BINARY_V3_RECORD = struct.Struct('<qi')
+
+# site ids are used as routing keys and in file names
+_SITE_ID = re.compile(r'[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*')
+
+
+def check_site_id(site: str) -> str:
+    """Returns `site` if it is a valid site id of at most 64 characters: words of ASCII letters, digits,
+    `_` or `-`, separated by dots. The words can be matched by the patterns of a topic exchange, e.g. `tenant.*`."""
+
+    if len(site) > 64 or not _SITE_ID.fullmatch(site):
+        raise ValueError(f'invalid site id `{site}`')
+    return site
+
+
+def encode_meter_message(samples, format: str = TEXT_FORMAT, site: str = None) -> bytes:
+    """Encodes one or more `(timestamp, meter_value)` pairs as a single message. The timestamps are
+    either seconds since midnight (an `int`, or a `float` with millisecond precision) or `Timestamp`s.
+    A message can't contain both.
+
+    In the text format, each sample is formatted as `timestamp:value` and the samples
+    are separated by newlines. In the binary format, the version byte is followed by
+    one fixed-width record per sample.
+
+    If `site` is given, the message starts with the site id: in the text format as a line
+    `@site`, in the binary format after the version byte (version 2 or 3).
+
+    Messages with `Timestamp`s start with a line `#epoch` in the text format, and contain
+    milliseconds since the epoch. In the binary format, version 3 is used for timestamps
+    that aren't whole seconds since midnight."""
+
+    if site is not None:
+        check_site_id(site)
+
+    samples = list(samples)
+    absolute = any(isinstance(timestamp, Timestamp) for timestamp, _ in samples)
+    if absolute and not all(isinstance(timestamp, Timestamp) for timestamp, _ in samples):
+        raise ValueError("a message can't contain both timestamps and times of day")
+
+    if format == BINARY_FORMAT:
+        return _encode_binary(samples, site, absolute)
+    elif format == TEXT_FORMAT:
+        if absolute:
+            lines = [_EPOCH_HEADER] + [f'{timestamp.millis}:{value}' for timestamp, value in samples]
+        else:
+            lines = [f'{_format_seconds(timestamp)}:{value}' for timestamp, value in samples]
+        if site is not None:
+            lines.insert(0, f'@{site}')
+        return '\n'.join(lines).encode('ascii')
+    else:
+        raise ValueError(f'unknown message format `{format}`')
+
+
+def parse_meter_message(msg: bytes) -> [(TimeOfDay, int)]:
+    """Decodes a message created by `encode_meter_message`, which may contain multiple samples.
+    The format is detected automatically, the site id is ignored. The times are `TimeOfDay`s,
+    or `Timestamp`s if the message contains absolute timestamps."""
+
+    return parse_site_message(msg)[1]
+
+
+def parse_site_message(msg: bytes) -> (str, [(TimeOfDay, int)]):
+    """Like `parse_meter_message`, but also returns the site id of the message, or `None`.
+    Raises a `ValueError` if the message is malformed or truncated."""
+
+    version = msg[:1]
+    if version == bytes([BINARY_V1]):
+        return None, _parse_binary_records(memoryview(msg)[1:])
+    elif version == bytes([BINARY_V2]):
+        length = _header_byte(msg, 1)
+        site = _header_site(msg, 2, length)
+        return site, _parse_binary_records(memoryview(msg)[2 + length:])
+    elif version == bytes([BINARY_V3]):
+        (flags, length) = (_header_byte(msg, 1), _header_byte(msg, 2))
+        site = _header_site(msg, 3, length) if length > 0 else None
+        return site, _parse_binary_v3_records(memoryview(msg)[3 + length:], flags & _ABSOLUTE)
+    elif version.isdigit() or version == b'@' or version == b'#':
+        lines = msg.decode('ascii').split('\n')
+        site = None
+        absolute = False
+        while lines and lines[0][:1] in ('@', '#'):
+            header = lines.pop(0)
+            if header == _EPOCH_HEADER:
+                absolute = True
+            elif header.startswith('@'):
+                site = header[1:]
+            else:
+                raise ValueError(f'unknown header `{header}`')
+        return site, _parse_text_lines(lines, absolute)
+    else:
+        raise ValueError(f'unsupported message version {version}')
+
+
+def _format_seconds(seconds) -> str:
+    if type(seconds) is int:
+        return str(seconds)
+    (whole, millis) = divmod(round(seconds * 1000), 1000)
+    return f'{whole}.{millis:03}'
+
+
+def _header_byte(msg: bytes, index: int) -> int:
+    if len(msg) <= index:
+        raise ValueError('truncated binary message header')
+    return msg[index]
+
+
+def _header_site(msg: bytes, start: int, length: int) -> str:
+    if len(msg) < start + length:
+        raise ValueError('truncated site id in binary message')
+    return msg[start:start + length].decode('ascii')
+
+
+def _check_records(records, record: struct.Struct):
+    if len(records) % record.size != 0:
+        raise ValueError(f'binary message has a truncated record ({len(records)} bytes of records)')
+
+
+def _parse_binary_records(records) -> [(TimeOfDay, int)]:
+    _check_records(records, _BINARY_V1_RECORD)
+    return [
+        (TimeOfDay(timestamp), meter_value)
+        for timestamp, meter_value in _BINARY_V1_RECORD.iter_unpack(records)
+    ]
+
+
+def _parse_binary_v3_records(records, absolute: bool) -> [(TimeOfDay, int)]:
+    _check_records(records, _BINARY_V3_RECORD)
+    if absolute:
+        return [
+            (Timestamp(millis), meter_value)
+            for millis, meter_value in _BINARY_V3_RECORD.iter_unpack(records)
+        ]
+    return [
+        (TimeOfDay(seconds_from_millis(millis)), meter_value)
+        for millis, meter_value in _BINARY_V3_RECORD.iter_unpack(records)
+    ]
+
+
+def _parse_text_lines(lines: [str], absolute: bool = False) -> [(TimeOfDay, int)]:
+    samples = []
+    for line in lines:
+        [timestamp, meter_value] = line.split(':')
+        if absolute:
+            time = Timestamp(int(timestamp))
+        elif '.' in timestamp:
+            time = TimeOfDay(float(timestamp))
+        else:
+            time = TimeOfDay(int(timestamp))
+        samples.append((time, int(meter_value)))
+    return samples
+
+
+def _encode_binary(samples: list, site: str = None, absolute: bool = False) -> bytes:
+    site_bytes = site.encode('ascii') if site is not None else b''
+
+    if absolute or any(type(timestamp) is not int for timestamp, _ in samples):
+        header = bytes([BINARY_V3, _ABSOLUTE if absolute else 0, len(site_bytes)]) + site_bytes
+        record = _BINARY_V3_RECORD
+        if absolute:
+            samples = [(timestamp.millis, value) for timestamp, value in samples]
+        else:
+            samples = [(round(timestamp * 1000), value) for timestamp, value in samples]
+    elif site is None:
+        header = bytes([BINARY_V1])
+        record = _BINARY_V1_RECORD
+    else:
+        header = bytes([BINARY_V2, len(site_bytes)]) + site_bytes
+        record = _BINARY_V1_RECORD
+
+    size = record.size
+    pack_into = record.pack_into
+
+    buffer = bytearray(len(header) + size * len(samples))
+    buffer[:len(header)] = header
+    for i, (timestamp, meter_value) in enumerate(samples):
+        pack_into(buffer, len(header) + i * size, timestamp, meter_value)
+
+    return bytes(buffer)
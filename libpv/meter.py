@@ -0,0 +1,65 @@
+from libpv.defaults import SECONDS_STEP
+from libpv.time_of_day import TimeOfDay, Timestamp, MILLIS_PER_DAY, seconds_from_millis
+from libpv.prng import continuous_prng, ContinuousPrng
+
+from datetime import date as Date
+import numpy as np
+from random import Random
+
+
+def meter_prng(max_consumption: int, seed: int) -> ContinuousPrng:
+    "The generator of (positive) power consumption values used by `meter.py`"
+
+    return continuous_prng(
+        v_min=0,
+        v_max=max_consumption,
+        max_diff=max_consumption / 500,
+        max_equal_values=300,
+        randomness=Random(seed))
+
+
+def _step_millis(seconds_step) -> int:
+    step = round(seconds_step * 1000)
+    if step < 1:
+        raise ValueError('the step must be at least 1 millisecond')
+    return step
+
+
+def samples_per_day(seconds_step) -> int:
+    "The number of times in a day when `meter.py` sends a value every `seconds_step` seconds"
+    return (MILLIS_PER_DAY - 1) // _step_millis(seconds_step)
+
+
+def times_of_day(seconds_step):
+    """The times at which `meter.py` sends values, starting at `seconds_step` after midnight.
+    The step can be fractional, with millisecond precision."""
+
+    step = _step_millis(seconds_step)
+    for i in range(1, samples_per_day(seconds_step) + 1):
+        yield TimeOfDay._from_normalized(seconds_from_millis(i * step))
+
+
+def day_timestamps(seconds_step) -> np.ndarray:
+    """The same times as `times_of_day`, as an array of seconds since midnight.
+    The array contains floats if the step isn't a whole number of seconds."""
+
+    step = _step_millis(seconds_step)
+    millis = np.arange(1, samples_per_day(seconds_step) + 1) * step
+    return millis // 1000 if step % 1000 == 0 else millis / 1000
+
+
+def timestamps(date: Date, seconds_step):
+    "Like `times_of_day`, but yields absolute `Timestamp`s on `date`"
+
+    start = Timestamp.from_datetime(date).millis
+    step = _step_millis(seconds_step)
+    for i in range(1, samples_per_day(seconds_step) + 1):
+        yield Timestamp(start + i * step)
+
+
+def date_timestamps(date: Date, seconds_step) -> np.ndarray:
+    "The same times as `timestamps`, as a `datetime64[ms]` array"
+
+    step = _step_millis(seconds_step)
+    offsets = np.arange(1, samples_per_day(seconds_step) + 1) * step
+    return np.datetime64(date, 'ms') + offsets.astype('m8[ms]')
@@ -0,0 +1,231 @@
+from libpv.messages import parse_meter_message, parse_site_message
+from libpv.time_of_day import SECS_PER_DAY, Timestamp
+
+from bisect import bisect_left
+import cProfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import pstats
+import signal
+import threading
+import time
+
+# upper bounds of the histogram buckets, in seconds
+LATENCY_BUCKETS = [
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+]
+LAG_BUCKETS = [0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600, 6 * 3600, SECS_PER_DAY]
+
+
+class Histogram:
+    "A histogram with fixed buckets, like a Prometheus histogram"
+
+    def __init__(self, buckets: [float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count > 0 else 0.0
+
+    def prometheus_lines(self, name: str) -> [str]:
+        lines = [f'# TYPE {name} histogram']
+        cumulative = 0
+        for bound, count in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum {self.sum}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+def _lag(sample_time) -> float:
+    "The seconds since the time of a sample, which are negative if it is in the future"
+
+    if isinstance(sample_time, Timestamp):
+        return time.time() - sample_time.millis / 1000
+
+    now = datetime.now()
+    wall_clock = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+    lag = (wall_clock - sample_time.seconds()) % SECS_PER_DAY
+    return lag - SECS_PER_DAY if lag > SECS_PER_DAY / 2 else lag
+
+
+class Metrics:
+    """
+    Measures the `receive` path of the simulator: the number of messages and samples,
+    the latency of parsing, computing and writing, the depth of the output buffer and
+    the queue lag.
+
+    The queue lag is the difference between the wall-clock time and the timestamp of the last
+    sample in a message. It is only meaningful if the meter sends its values in real time.
+    `Timestamp`s are compared with the current UTC time, times of day with the local time of
+    day, where a sample up to 12 hours ahead counts as being in the future. Samples from the
+    future have a lag of 0.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.started = time.monotonic()
+
+        self.messages = 0
+        self.samples = 0
+        self.parse_latency = Histogram(LATENCY_BUCKETS)
+        self.compute_latency = Histogram(LATENCY_BUCKETS)
+        self.write_latency = Histogram(LATENCY_BUCKETS)
+        self.queue_lag = Histogram(LAG_BUCKETS)
+
+        self.last_report = (self.started, 0)
+
+    def process(self, simulation, body: bytes):
+        "Parses a message and passes it to `simulation`, while measuring both steps"
+
+        t0 = time.perf_counter()
+        samples = parse_meter_message(body)
+        t1 = time.perf_counter()
+        simulation.process(samples)
+        t2 = time.perf_counter()
+
+        self._observe(samples, t0, t1, t2)
+
+    def process_site(self, sites, body: bytes):
+        "Like `process`, but passes the samples to the site of the message in a `SiteTable`"
+
+        t0 = time.perf_counter()
+        (site, samples) = parse_site_message(body)
+        t1 = time.perf_counter()
+        sites.process(site, samples)
+        t2 = time.perf_counter()
+
+        self._observe(samples, t0, t1, t2)
+
+    def _observe(self, samples, t0: float, t1: float, t2: float):
+        self.messages += 1
+        self.samples += len(samples)
+        self.parse_latency.observe(t1 - t0)
+        self.compute_latency.observe(t2 - t1)
+
+        if samples:
+            self.queue_lag.observe(max(0, _lag(samples[-1][0])))
+
+    def write_batch(self, batch):
+        "Calls `output.write_batch` while measuring it. This can be called from another thread."
+
+        t0 = time.perf_counter()
+        self.output.write_batch(batch)
+        self.write_latency.observe(time.perf_counter() - t0)
+
+    def flush(self):
+        self.write_batch(self.output.detach())
+
+    def messages_per_sec(self) -> float:
+        "The message rate since the previous call"
+
+        now = time.monotonic()
+        (last_time, last_messages) = self.last_report
+        self.last_report = (now, self.messages)
+        return (self.messages - last_messages) / max(now - last_time, 1e-9)
+
+    def stats_line(self) -> str:
+        return (
+            f' [i] {self.messages_per_sec():.0f} msg/s, {self.samples} samples, '
+            f'parse {self.parse_latency.mean() * 1e6:.1f}µs, '
+            f'compute {self.compute_latency.mean() * 1e6:.1f}µs, '
+            f'write {self.write_latency.mean() * 1e3:.2f}ms, '
+            f'buffer {self.output.pending()}, '
+            f'lag {self.queue_lag.mean():.1f}s')
+
+    def prometheus_text(self) -> str:
+        "The metrics in the Prometheus text exposition format"
+
+        lines = [
+            '# TYPE simulator_messages_total counter',
+            f'simulator_messages_total {self.messages}',
+            '# TYPE simulator_samples_total counter',
+            f'simulator_samples_total {self.samples}',
+            '# TYPE simulator_output_buffer_samples gauge',
+            f'simulator_output_buffer_samples {self.output.pending()}',
+            '# TYPE simulator_uptime_seconds gauge',
+            f'simulator_uptime_seconds {time.monotonic() - self.started}',
+        ]
+        lines += self.parse_latency.prometheus_lines('simulator_parse_seconds')
+        lines += self.compute_latency.prometheus_lines('simulator_compute_seconds')
+        lines += self.write_latency.prometheus_lines('simulator_write_seconds')
+        lines += self.queue_lag.prometheus_lines('simulator_queue_lag_seconds')
+        return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(metrics: Metrics, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    "Serves the metrics at `http://host:port/metrics` in a background thread"
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def print_stats_periodically(metrics: Metrics, interval: float):
+    "Prints `metrics.stats_line()` every `interval` seconds in a background thread"
+
+    def run():
+        while True:
+            time.sleep(interval)
+            print(metrics.stats_line(), flush=True)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+class ProfilerToggle:
+    """
+    Starts cProfile when the process receives `SIGUSR1`, and stops it when the signal is
+    received again. The profile is then written to `simulator-<pid>-<n>.prof` and the
+    functions with the highest cumulative time are printed.
+    """
+
+    def __init__(self, quiet: bool = False):
+        self.quiet = quiet
+        self.profiler = None
+        self.profiles = 0
+
+    def install(self):
+        signal.signal(signal.SIGUSR1, self.toggle)
+
+    def toggle(self, signum=None, frame=None):
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            if not self.quiet:
+                print(' [i] Profiling started')
+        else:
+            self.profiler.disable()
+            self.profiles += 1
+            path = f'simulator-{os.getpid()}-{self.profiles}.prof'
+            self.profiler.dump_stats(path)
+
+            if not self.quiet:
+                print(f' [i] Profiling stopped, written to {path}')
+                pstats.Stats(self.profiler).sort_stats('cumulative').print_stats(15)
+            self.profiler = None
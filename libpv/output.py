@@ -0,0 +1,359 @@
+from libpv.defaults import COLUMNAR_EXTENSIONS, TIME_UNITS
+from libpv.time_of_day import TimeOfDay, SECS_PER_DAY, MILLIS_PER_DAY, hms_strings
+
+from array import array
+from importlib.util import find_spec
+import numpy as np
+import os
+
+# pyarrow is optional. It is only imported when it's used, because importing it takes longer
+# than importing everything else.
+HAS_PYARROW = find_spec('pyarrow') is not None
+
+
+def _pyarrow():
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    return pyarrow
+
+
+def create_output(path: str, resumable: bool = False, resume_position: int = None, time_unit: str = 's'):
+    """Creates the output for the file at `path`, which must not exist yet. The format depends on
+    the file extension: `.parquet`, `.arrow` and `.npy` are columnar formats, `.csv` is CSV,
+    everything else is the human readable text format. `time_unit` is only used by columnar
+    formats, see `ColumnarOutput`.
+
+    If `resumable` is true, the output must support `sync()`, which is not the case for Parquet
+    and Arrow files. If `resume_position` is given, the existing file is opened instead and
+    everything after the position returned by `sync()` is discarded."""
+
+    if resume_position is not None:
+        resumable = True
+
+    if any(path.endswith(ext) for ext in COLUMNAR_EXTENSIONS):
+        if resumable and not path.endswith('.npy'):
+            raise ValueError('only text, CSV and .npy outputs can be resumed')
+        return ColumnarOutput(path, resume_position=resume_position, time_unit=time_unit)
+    elif resume_position is not None:
+        file = open(path, 'r+')
+        file.truncate(resume_position)
+        file.seek(0, os.SEEK_END)
+        return TextOutput(file, csv=path.endswith('.csv'))
+    else:
+        return TextOutput(open(path, 'x'), csv=path.endswith('.csv'))
+
+
+def read_output(path: str, chunk_size: int = 65536):
+    """Reads the values of an output file in chunks of at most `chunk_size` samples. Yields tuples of
+    the meter, PV and sum values as integer arrays. `.npy` files are memory-mapped, Parquet and Arrow
+    files are read by record batches (which may be larger than `chunk_size`)."""
+
+    if path.endswith('.npy'):
+        values = np.load(path, mmap_mode='r')
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            yield chunk['meter'], chunk['pv'], chunk['sum']
+    elif path.endswith('.parquet') or path.endswith('.arrow'):
+        if not HAS_PYARROW:
+            raise ImportError(f'pyarrow is required to read `{path}`')
+        pyarrow = _pyarrow()
+        if path.endswith('.parquet'):
+            batches = pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size)
+        else:
+            reader = pyarrow.ipc.open_file(path)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        for batch in batches:
+            yield tuple(batch.column(name).to_numpy() for name in ('meter', 'pv', 'sum'))
+    else:
+        csv = path.endswith('.csv')
+        with open(path) as file:
+            while True:
+                lines = file.readlines(chunk_size * 32)
+                if not lines:
+                    break
+                if csv:
+                    rows = [line.split(',')[1:] for line in lines]
+                else:
+                    # `[time] M:meter P:pv S:sum`
+                    rows = [[field[2:] for field in line.split()[1:]] for line in lines]
+                yield tuple(np.array(column, dtype=np.int64) for column in zip(*rows))
+
+
+class TextOutput:
+    """
+    Writes the simulated values to a text file, one line per sample, either as CSV
+    or in the format `[time] M:meter P:pv S:sum`.
+
+    Lines are buffered until `flush()` is called. To write the buffered lines from another
+    thread, call `detach()` first and pass the result to `write_batch()` in the other thread.
+    """
+
+    # the number of buffered samples after which the simulator flushes the output
+    buffer_size = 1024
+
+    def __init__(self, file, csv: bool):
+        self.file = file
+        self.csv = csv
+        self.lines = []
+
+    def write(self, time: TimeOfDay, meter_value: int, pv_value: int, sum: int):
+        if self.csv:
+            self.lines.append(f'{time},{meter_value},{pv_value},{sum}\n')
+        else:
+            self.lines.append(f'[{time}] M:{meter_value} P:{pv_value} S:{sum}\n')
+
+    def write_arrays(self, times, meter_values, pv_values, sums):
+        """Like `write`, but for arrays of values, where the times are given in seconds since midnight
+        (integers, or floats with millisecond precision) or as a `datetime64` array"""
+
+        times = np.asarray(times)
+        if times.dtype.kind == 'M':
+            times = np.datetime_as_string(times.astype('M8[ms]'), unit='ms').tolist()
+        elif times.dtype.kind == 'f':
+            (seconds, millis) = np.divmod(np.rint(times * 1000).astype(np.int64), 1000)
+            table = hms_strings()
+            times = [
+                f'{table[s]}.{ms:03}'
+                for s, ms in zip(np.mod(seconds, SECS_PER_DAY).tolist(), millis.tolist())
+            ]
+        else:
+            times = map(hms_strings().__getitem__, np.mod(times, SECS_PER_DAY).tolist())
+        rows = zip(times, meter_values.tolist(), pv_values.tolist(), sums.tolist())
+
+        if self.csv:
+            self.lines.extend(f'{t},{m},{p},{s}\n' for t, m, p, s in rows)
+        else:
+            self.lines.extend(f'[{t}] M:{m} P:{p} S:{s}\n' for t, m, p, s in rows)
+
+    def pending(self) -> int:
+        "The number of samples that haven't been written to the file yet"
+        return len(self.lines)
+
+    def detach(self):
+        "Removes the buffered samples from the buffer and returns them"
+
+        lines = self.lines
+        self.lines = []
+        return lines
+
+    def write_batch(self, lines):
+        "Writes samples returned by `detach()` to the file and flushes it"
+
+        self.file.write(''.join(lines))
+        self.file.flush()
+
+    def flush(self):
+        self.write_batch(self.detach())
+
+    def sync(self) -> int:
+        """Makes sure the written samples are stored on disk, and returns the position
+        to resume from, which is the size of the file"""
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class ColumnarOutput:
+    """
+    Writes the simulated values to a columnar file with the columns `time`, `meter`, `pv` and `sum`.
+
+    * `.parquet`: Parquet with one row group per flush (requires pyarrow)
+    * `.arrow`: Arrow IPC file with one record batch per flush (requires pyarrow)
+    * `.npy`: NumPy array of records, which can be loaded with `np.load(path, mmap_mode='r')`.
+      The header is updated on every flush, so the file can be read while it's being written.
+
+    The unit of `time` depends on `time_unit`:
+
+    * `'s'`: seconds since midnight, which requires whole seconds. In the Arrow formats, `time` is a `time32[s]`.
+    * `'ms'`: milliseconds since midnight, a `time32[ms]` in the Arrow formats.
+    * `'datetime'`: `Timestamp`s, which are stored as `datetime64[ms]` or `timestamp[ms]`.
+
+    The buffering works like in `TextOutput`.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 65536, resume_position: int = None, time_unit: str = 's'):
+        if time_unit not in TIME_UNITS:
+            raise ValueError(f'unknown time unit `{time_unit}`')
+
+        self.buffer_size = buffer_size
+        self.time_unit = time_unit
+        self.dtype = np.dtype([
+            ('time', '<M8[ms]' if time_unit == 'datetime' else '<u4'),
+            ('meter', '<i4'), ('pv', '<i4'), ('sum', '<i4'),
+        ])
+
+        if path.endswith('.npy'):
+            self.writer = _NpyWriter(path, self.dtype, resume_position)
+        elif not HAS_PYARROW:
+            raise ImportError(f'pyarrow is required to write `{path}`, use a `.npy` file instead')
+        elif path.endswith('.parquet'):
+            self.writer = _ArrowWriter(path, time_unit, parquet=True)
+        elif path.endswith('.arrow'):
+            self.writer = _ArrowWriter(path, time_unit, parquet=False)
+        else:
+            raise ValueError(f'unsupported columnar file `{path}`')
+
+        self.chunks = []
+        self.columns = self._new_columns()
+        self.chunk_rows = 0
+
+    def _new_columns(self):
+        return array('q' if self.time_unit == 'datetime' else 'I'), array('i'), array('i'), array('i')
+
+    def write(self, time: TimeOfDay, meter_value: int, pv_value: int, sum: int):
+        (times, meter_values, pv_values, sums) = self.columns
+        if self.time_unit == 's':
+            times.append(time.seconds())
+        elif self.time_unit == 'ms':
+            times.append(round(time.seconds() * 1000))
+        else:
+            times.append(time.millis)
+        meter_values.append(meter_value)
+        pv_values.append(pv_value)
+        sums.append(sum)
+
+    def write_arrays(self, times, meter_values, pv_values, sums):
+        """Like `write`, but for arrays of values, where the times are given in seconds since midnight
+        or as a `datetime64` array"""
+
+        times = np.asarray(times)
+        if self.time_unit == 'datetime':
+            times = times.astype('M8[ms]').view(np.int64)
+        elif times.dtype.kind == 'M':
+            millis = np.mod(times.astype('M8[ms]').view(np.int64), MILLIS_PER_DAY)
+            times = millis if self.time_unit == 'ms' else millis // 1000
+        elif self.time_unit == 'ms':
+            times = np.rint(times * 1000)
+        elif times.dtype.kind == 'f':
+            raise ValueError("times with milliseconds require the time unit 'ms' or 'datetime'")
+
+        self._finish_columns()
+        self.chunks.append((times, meter_values, pv_values, sums))
+        self.chunk_rows += len(times)
+
+    def _finish_columns(self):
+        if len(self.columns[0]) > 0:
+            self.chunks.append(tuple(np.frombuffer(c, dtype=c.typecode) for c in self.columns))
+            self.chunk_rows += len(self.columns[0])
+            self.columns = self._new_columns()
+
+    def pending(self) -> int:
+        return self.chunk_rows + len(self.columns[0])
+
+    def detach(self):
+        self._finish_columns()
+        chunks = self.chunks
+        self.chunks = []
+        self.chunk_rows = 0
+        return chunks
+
+    def write_batch(self, chunks):
+        if not chunks:
+            return
+
+        records = np.empty(sum(len(chunk[0]) for chunk in chunks), dtype=self.dtype)
+        for i, name in enumerate(self.dtype.names):
+            column = np.concatenate([chunk[i] for chunk in chunks])
+            if name == 'time' and self.time_unit == 'datetime':
+                column = column.view('M8[ms]')
+            records[name] = column
+
+        self.writer.write(records)
+
+    def flush(self):
+        self.write_batch(self.detach())
+
+    def sync(self) -> int:
+        """Makes sure the written samples are stored on disk, and returns the position
+        to resume from, which is the number of rows. Only supported for `.npy` files."""
+        return self.writer.sync()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class _NpyWriter:
+    # The header has a fixed size, so it can be overwritten when the number of rows changes
+    HEADER_SIZE = 256
+
+    def __init__(self, path: str, dtype: np.dtype, resume_position: int = None):
+        self.dtype = dtype
+
+        if resume_position is not None:
+            self.file = open(path, 'r+b')
+            self.rows = resume_position
+            self.file.truncate(self.HEADER_SIZE + self.rows * dtype.itemsize)
+        else:
+            self.file = open(path, 'xb')
+            self.rows = 0
+        self._write_header()
+
+    def _write_header(self):
+        header = f"{{'descr': {self.dtype.descr!r}, 'fortran_order': False, 'shape': ({self.rows},), }}"
+        prefix = b'\x93NUMPY\x01\x00' + (self.HEADER_SIZE - 10).to_bytes(2, 'little')
+        header = header.ljust(self.HEADER_SIZE - len(prefix) - 1) + '\n'
+
+        self.file.seek(0)
+        self.file.write(prefix + header.encode('latin1'))
+
+    def write(self, records: np.ndarray):
+        self.file.seek(0, 2)
+        self.file.write(records.tobytes())
+        self.rows += len(records)
+        self._write_header()
+        self.file.flush()
+
+    def sync(self) -> int:
+        os.fsync(self.file.fileno())
+        return self.rows
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowWriter:
+    def __init__(self, path: str, time_unit: str, parquet: bool):
+        pyarrow = self.pyarrow = _pyarrow()
+        if time_unit == 'datetime':
+            self.time_type = pyarrow.timestamp('ms')
+        else:
+            self.time_type = pyarrow.time32(time_unit)
+
+        self.schema = pyarrow.schema([
+            ('time', self.time_type),
+            ('meter', pyarrow.int32()),
+            ('pv', pyarrow.int32()),
+            ('sum', pyarrow.int32()),
+        ])
+
+        self.file = open(path, 'xb')
+        if parquet:
+            self.writer = pyarrow.parquet.ParquetWriter(self.file, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(self.file, self.schema)
+
+    def write(self, records: np.ndarray):
+        times = records['time']
+        if times.dtype.kind != 'M':
+            times = times.astype(np.int32)
+
+        pyarrow = self.pyarrow
+        batch = pyarrow.record_batch([
+            pyarrow.array(times, type=self.time_type),
+            pyarrow.array(records['meter']),
+            pyarrow.array(records['pv']),
+            pyarrow.array(records['sum']),
+        ], schema=self.schema)
+
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+        self.file.close()
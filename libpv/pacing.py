@@ -0,0 +1,94 @@
+import time
+
+
+class Pacer:
+    """
+    Paces the messages of a publisher to wall-clock time. Call `wait()` before sending each message.
+
+    * With `speed`, a message is sent when `(sample_time - first_sample_time) / speed` seconds have
+      passed since the first message, e.g. `speed=60` replays an hour of samples in a minute.
+    * With `rate`, at most `rate` messages are sent per second (token bucket). Up to `burst`
+      messages can be sent at once after a pause.
+
+    Both can be combined. Deadlines are absolute times on the monotonic clock, so delays don't
+    accumulate. `wait()` only sleeps if the next deadline is at least `min_sleep` seconds away;
+    otherwise the message is sent immediately. This way, high rates are sustained by sending the
+    messages that became due during one sleep in a burst.
+    """
+
+    def __init__(
+            self,
+            speed: float = None,
+            rate: float = None,
+            burst: int = 1,
+            min_sleep: float = 0.001,
+            clock=time.monotonic,
+            sleep=time.sleep):
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be positive')
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+
+        self.speed = speed
+        self.rate = rate
+        self.burst = burst
+        self.min_sleep = min_sleep
+        self.clock = clock
+        self.sleep = sleep
+
+        self.started = None
+        self.first_sample_time = None
+        self.tokens = burst
+        self.updated = None
+
+        self.sent = 0
+        self.max_lag = 0.0
+
+    def wait(self, sample_time: float = None):
+        "Waits until the next message may be sent. `sample_time` (in seconds) is required with `speed`."
+
+        now = self.clock()
+        if self.started is None:
+            self.started = now
+            self.updated = now
+            self.first_sample_time = sample_time
+
+        deadline = now
+        if self.speed is not None:
+            deadline = self.started + (sample_time - self.first_sample_time) / self.speed
+        if self.rate is not None:
+            tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            if tokens < 1:
+                deadline = max(deadline, now + (1 - tokens) / self.rate)
+
+        if deadline - now >= self.min_sleep:
+            self.sleep(deadline - now)
+        else:
+            # the deadline was missed, or is too close to sleep accurately
+            self.max_lag = max(self.max_lag, now - deadline)
+
+        if self.rate is not None:
+            # tokens are counted until the deadline, so messages sent early are paid back later
+            updated = max(deadline, self.updated)
+            self.tokens = min(self.burst, self.tokens + (updated - self.updated) * self.rate) - 1
+            self.updated = updated
+
+        self.sent += 1
+
+    def achieved_rate(self) -> float:
+        "The average number of messages per second since the first message"
+
+        if self.started is None:
+            return 0.0
+        elapsed = self.clock() - self.started
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def stats_line(self) -> str:
+        line = f' [i] {self.sent} messages, {self.achieved_rate():.0f} msg/s'
+        if self.rate is not None:
+            line += f' (target {self.rate:.0f} msg/s)'
+        if self.speed is not None:
+            line += f' at {self.speed:g}x speed'
+        return line + f', max lag {self.max_lag * 1000:.1f} ms'
@@ -0,0 +1,122 @@
+from libpv.output import COLUMNAR_EXTENSIONS, create_output
+from libpv.prng import derive_seed
+from libpv.time_of_day import SECS_PER_DAY
+
+import heapq
+from itertools import islice
+from operator import itemgetter
+import numpy as np
+
+
+def partition_of(seconds, partitions: int):
+    """The partition of a timestamp (or an array of timestamps) in seconds since midnight.
+    The day is split into `partitions` time ranges of equal length."""
+    return seconds % SECS_PER_DAY * partitions // SECS_PER_DAY
+
+
+def partition_queue(queue: str, partition: int) -> str:
+    "The name of the queue that receives the messages of a partition"
+    return f'{queue}.{partition}'
+
+
+def partition_seed(seed: int, partition: int) -> int:
+    """The weather seed of a partition. Each partition has its own weather stream,
+    so its output only depends on the seed and the messages of the partition."""
+    return derive_seed(seed, 'partition', partition)
+
+
+def _line_time(line: str) -> str:
+    # `HH:MM:SS,...` in CSV files, `[HH:MM:SS] ...` otherwise; the times sort like strings
+    if line.startswith('['):
+        return line[1:line.index(']')]
+    return line[:line.index(',')]
+
+
+def _keyed_lines(file):
+    """Yields the lines of an output file with the key `(day, time)`. The times of a partition increase
+    within a day, so a new day starts whenever the time doesn't increase. Timestamps always increase."""
+
+    (day, previous) = (0, None)
+    for line in file:
+        time = _line_time(line)
+        if previous is not None and time <= previous:
+            day += 1
+        previous = time
+        yield (day, time), line
+
+
+def _keyed_chunks(path: str, chunk_size: int):
+    "Like `_keyed_lines`, but yields chunks of the records of a memory-mapped `.npy` file with their days"
+
+    values = np.load(path, mmap_mode='r')
+    (day, previous) = (0, None)
+    for start in range(0, len(values), chunk_size):
+        chunk = np.array(values[start:start + chunk_size])
+        times = chunk['time']
+        new_days = np.empty(len(times), dtype=np.int64)
+        new_days[0] = previous is not None and times[0] <= previous
+        new_days[1:] = times[1:] <= times[:-1]
+        days = day + np.cumsum(new_days)
+        (day, previous) = (days[-1], times[-1])
+        yield chunk, days
+
+
+def _merge_npy(paths: [str], output, chunk_size: int):
+    """Merges `.npy` files chunk by chunk: in each step, the records up to the smallest last key of the
+    current chunks are written, since no later chunk can contain a smaller key"""
+
+    sources = [_keyed_chunks(path, chunk_size) for path in paths]
+    buffers = [next(source, None) for source in sources]
+
+    while any(buffer is not None for buffer in buffers):
+        bound = min((days[-1], chunk['time'][-1]) for chunk, days in filter(None, buffers))
+
+        parts = []
+        for i, buffer in enumerate(buffers):
+            if buffer is None:
+                continue
+            (chunk, days) = buffer
+            count = np.count_nonzero((days < bound[0]) | ((days == bound[0]) & (chunk['time'] <= bound[1])))
+            parts.append((chunk[:count], days[:count]))
+            buffers[i] = (chunk[count:], days[count:]) if count < len(chunk) else next(sources[i], None)
+
+        records = np.concatenate([chunk for chunk, _ in parts])
+        days = np.concatenate([days for _, days in parts])
+        # samples with the same key keep the order of the files
+        order = np.lexsort((np.arange(len(records)), records['time'], days))
+        records = records[order]
+        output.write_arrays(records['time'], records['meter'], records['pv'], records['sum'])
+
+
+def merge_outputs(paths: [str], output_path: str, chunk_size: int = 65536):
+    """Merges the output files of partition workers into one file ordered by time, which must not exist yet.
+    Samples with the same time keep the order of `paths`. All files must have the same format.
+
+    If the files contain times of day of several days, each file is split into days where its times
+    stop increasing, and the days are merged in order.
+
+    Text and CSV files are merged line by line without loading them into memory.
+    `.npy` files are memory-mapped and merged in chunks of `chunk_size` samples per file."""
+
+    if any(path.endswith(ext) for path in paths + [output_path] for ext in COLUMNAR_EXTENSIONS):
+        if not all(path.endswith('.npy') for path in paths + [output_path]):
+            raise ValueError('only text, CSV and .npy files can be merged')
+
+        # milliseconds since midnight are copied unchanged like seconds
+        datetimes = any(np.load(path, mmap_mode='r')['time'].dtype.kind == 'M' for path in paths)
+        output = create_output(output_path, time_unit='datetime' if datetimes else 's')
+        _merge_npy(paths, output, chunk_size)
+        output.close()
+    else:
+        files = [open(path) for path in paths]
+        try:
+            with open(output_path, 'x') as output:
+                lines = heapq.merge(*map(_keyed_lines, files), key=itemgetter(0))
+                while True:
+                    chunk = list(islice(lines, chunk_size))
+                    if not chunk:
+                        break
+                    output.writelines(line for _, line in chunk)
+        finally:
+            for file in files:
+                file.close()
@@ -1,3 +1,5 @@
+from array import array
+import hashlib
 from random import Random
 
 
@@ -7,30 +9,154 @@ def continuous_prng(
         randomness: Random):
     "Random number generator, where each value differs from the previous value by at most `max_diff`"
 
-    next_value = None
-    prev = None
-    equal_values = 0
+    return ContinuousPrng(v_min, v_max, max_diff, max_equal_values, randomness)
 
-    while True:
-        if equal_values == 0:
-            equal_values = randomness.randint(1, max_equal_values)
-            next_value = randomness.randint(v_min, v_max)
 
-            if prev is None:
-                prev = randomness.randint(v_min, v_max)
-        elif next_value == prev:
+class ContinuousPrng:
+    """
+    Iterator returned by `continuous_prng`.
+
+    Values can be requested one at a time with `next()`, or in blocks with `fill()`, `take()`
+    and `blocks()`. Both ways can be mixed and produce the same sequence for the same seed.
+    """
+
+    def __init__(
+            self,
+            v_min: int, v_max: int,
+            max_diff: int, max_equal_values: int,
+            randomness: Random):
+        self.v_min = v_min
+        self.v_max = v_max
+        self.max_diff = max_diff
+        self.max_equal_values = max_equal_values
+        self.randomness = randomness
+
+        self.next_value = None
+        self.prev = None
+        self.equal_values = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        v_min = self.v_min
+        v_max = self.v_max
+        max_diff = self.max_diff
+
+        if self.equal_values == 0:
+            self.equal_values = self.randomness.randint(1, self.max_equal_values)
+            self.next_value = self.randomness.randint(v_min, v_max)
+
+            if self.prev is None:
+                self.prev = self.randomness.randint(v_min, v_max)
+        elif self.next_value == self.prev:
             v_range = (v_max - v_min) / 200
-            next_min = max(v_min, next_value - v_range)
-            next_max = min(v_max, next_value + v_range)
-            next_value = randomness.randint(int(next_min), int(next_max))
-
-        if abs(next_value - prev) <= max_diff:
-            prev = next_value
-        elif prev < next_value:
-            prev += max_diff
+            next_min = max(v_min, self.next_value - v_range)
+            next_max = min(v_max, self.next_value + v_range)
+            self.next_value = self.randomness.randint(int(next_min), int(next_max))
+
+        if abs(self.next_value - self.prev) <= max_diff:
+            self.prev = self.next_value
+        elif self.prev < self.next_value:
+            self.prev += max_diff
         else:
-            prev -= max_diff
+            self.prev -= max_diff
+
+        self.equal_values -= 1
+
+        return int(self.prev)
+
+    def fill(self, buffer):
+        """Overwrites every element of `buffer` (e.g. an `array('i')` or a NumPy array)
+        with the next values and returns it"""
+
+        v_min = self.v_min
+        v_max = self.v_max
+        max_diff = self.max_diff
+        max_equal_values = self.max_equal_values
+        randint = self.randomness.randint
+        v_range = (v_max - v_min) / 200
+
+        next_value = self.next_value
+        prev = self.prev
+        equal_values = self.equal_values
+
+        for i in range(len(buffer)):
+            if equal_values == 0:
+                equal_values = randint(1, max_equal_values)
+                next_value = randint(v_min, v_max)
+
+                if prev is None:
+                    prev = randint(v_min, v_max)
+            elif next_value == prev:
+                next_min = max(v_min, next_value - v_range)
+                next_max = min(v_max, next_value + v_range)
+                next_value = randint(int(next_min), int(next_max))
+
+            if abs(next_value - prev) <= max_diff:
+                prev = next_value
+            elif prev < next_value:
+                prev += max_diff
+            else:
+                prev -= max_diff
+
+            equal_values -= 1
+            buffer[i] = int(prev)
+
+        self.next_value = next_value
+        self.prev = prev
+        self.equal_values = equal_values
+
+        return buffer
+
+    def getstate(self) -> dict:
+        """Returns a JSON-serializable checkpoint of this generator, including the state of
+        `randomness`, which can be restored with `setstate()`"""
+
+        state = self._getstate_fields()
+        state['random'] = random_state(self.randomness)
+        return state
+
+    def setstate(self, state: dict):
+        set_random_state(self.randomness, state['random'])
+        self._setstate_fields(state)
+
+    def _getstate_fields(self) -> dict:
+        return {'next_value': self.next_value, 'prev': self.prev, 'equal_values': self.equal_values}
+
+    def _setstate_fields(self, state: dict):
+        self.next_value = state['next_value']
+        self.prev = state['prev']
+        self.equal_values = state['equal_values']
+
+    def take(self, n: int) -> array:
+        "Returns the next `n` values in a new `array('i')`"
+        return self.fill(array('i', bytes(n * array('i').itemsize)))
+
+    def blocks(self, block_size: int):
+        """Yields the values in blocks of `block_size`.
+        The same buffer is reused for every block, so it must be consumed before requesting the next one."""
+
+        buffer = array('i', bytes(block_size * array('i').itemsize))
+        while True:
+            yield self.fill(buffer)
+
+
+def random_state(randomness: Random) -> list:
+    "The state of a `Random` instance as a JSON-serializable list"
+
+    (version, internal_state, gauss_next) = randomness.getstate()
+    return [version, list(internal_state), gauss_next]
+
+
+def set_random_state(randomness: Random, state: list):
+    (version, internal_state, gauss_next) = state
+    randomness.setstate((version, tuple(internal_state), gauss_next))
+
 
-        equal_values -= 1
+def derive_seed(master_seed: int, *keys) -> int:
+    """Derives a seed from the master seed and the given keys. The result only depends on
+    the arguments, not on the order or the process in which tasks are executed."""
 
-        yield int(prev)
+    key = ':'.join(str(k) for k in (master_seed,) + keys).encode('utf-8')
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], 'little')
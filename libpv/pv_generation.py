@@ -1,6 +1,8 @@
-from libpv.time_of_day import TimeOfDay
-from libpv.prng import continuous_prng
+from libpv.time_of_day import TimeOfDay, SECS_PER_DAY
+from libpv.prng import continuous_prng, random_state, set_random_state
 
+from array import array
+import numpy as np
 from random import Random
 
 
@@ -42,6 +44,32 @@ class PvGenerator:
         z2 = self.sunset.seconds()
         return self.poly_factor * (x - z1) * (x - z2)
 
+    def get_values(self, seconds) -> np.ndarray:
+        """Vectorized version of `get_value`, which accepts an array of seconds since midnight.
+        The seconds can be negative and arbitrarily large, just like in `TimeOfDay`.
+        The results are identical to calling `get_value` for each element."""
+
+        x = np.mod(np.asarray(seconds), SECS_PER_DAY)
+        z1 = self.sunrise.seconds()
+        z2 = self.sunset.seconds()
+        dawn_start = self.dawn_start.seconds()
+        dusk_end = self.dusk_end.seconds()
+
+        t1 = self.poly_factor * (x - z1) * (x - z2)
+        t2 = np.where(
+            x < self.zenith_time.seconds(),
+            (x - dawn_start) * self.dawn_slope,
+            -(x - dusk_end) * self.dawn_slope)
+
+        is_night = (x < dawn_start) | (x > dusk_end)
+        return np.where(is_night, 0.0, np.maximum(t1, t2))
+
+    def profile(self, step: int = 1) -> np.ndarray:
+        """Returns the PV values of a whole day, where the `i`-th value belongs to the time
+        `i * step` seconds after midnight"""
+
+        return self.get_values(np.arange(0, SECS_PER_DAY, step))
+
 
 def weather(noise_factor: float, randomness: Random):
     """
@@ -53,20 +81,122 @@ def weather(noise_factor: float, randomness: Random):
     If the `noise_factor` is 0, the `weather_factor` function always returns 1.
     """
 
-    rng1 = continuous_prng(
-        v_min=0,
-        v_max=10_000,
-        max_diff=10,
-        max_equal_values=100,
-        randomness=randomness)
-
-    rng2 = continuous_prng(
-        v_min=0,
-        v_max=10_000,
-        max_diff=10,
-        max_equal_values=100,
-        randomness=randomness)
-
-    while True:
-        weather = (next(rng1) / 10_000) * (next(rng2) / 10_000)
-        yield 1 - (weather * noise_factor)
+    return Weather(noise_factor, randomness)
+
+
+class Weather:
+    """
+    Iterator returned by `weather`.
+
+    Like `ContinuousPrng`, factors can be requested one at a time or in blocks.
+    """
+
+    def __init__(self, noise_factor: float, randomness: Random):
+        self.noise_factor = noise_factor
+
+        self.rng1 = continuous_prng(
+            v_min=0,
+            v_max=10_000,
+            max_diff=10,
+            max_equal_values=100,
+            randomness=randomness)
+
+        self.rng2 = continuous_prng(
+            v_min=0,
+            v_max=10_000,
+            max_diff=10,
+            max_equal_values=100,
+            randomness=randomness)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> float:
+        weather = (next(self.rng1) / 10_000) * (next(self.rng2) / 10_000)
+        return 1 - (weather * self.noise_factor)
+
+    def fill(self, buffer):
+        """Overwrites every element of `buffer` (e.g. an `array('d')` or a NumPy array)
+        with the next factors and returns it"""
+
+        # The loop of `ContinuousPrng.fill()`, inlined for both generators. They share the same `Random`
+        # instance, so they are advanced alternately to get the same sequence as with `next()`.
+        # Both are created with the same parameters.
+        (rng1, rng2) = (self.rng1, self.rng2)
+        v_min = rng1.v_min
+        v_max = rng1.v_max
+        max_diff = rng1.max_diff
+        max_equal_values = rng1.max_equal_values
+        randint = rng1.randomness.randint
+        v_range = (v_max - v_min) / 200
+        noise_factor = self.noise_factor
+
+        (next1, prev1, equal1) = (rng1.next_value, rng1.prev, rng1.equal_values)
+        (next2, prev2, equal2) = (rng2.next_value, rng2.prev, rng2.equal_values)
+
+        for i in range(len(buffer)):
+            if equal1 == 0:
+                equal1 = randint(1, max_equal_values)
+                next1 = randint(v_min, v_max)
+                if prev1 is None:
+                    prev1 = randint(v_min, v_max)
+            elif next1 == prev1:
+                next1 = randint(int(max(v_min, next1 - v_range)), int(min(v_max, next1 + v_range)))
+
+            if abs(next1 - prev1) <= max_diff:
+                prev1 = next1
+            elif prev1 < next1:
+                prev1 += max_diff
+            else:
+                prev1 -= max_diff
+            equal1 -= 1
+
+            if equal2 == 0:
+                equal2 = randint(1, max_equal_values)
+                next2 = randint(v_min, v_max)
+                if prev2 is None:
+                    prev2 = randint(v_min, v_max)
+            elif next2 == prev2:
+                next2 = randint(int(max(v_min, next2 - v_range)), int(min(v_max, next2 + v_range)))
+
+            if abs(next2 - prev2) <= max_diff:
+                prev2 = next2
+            elif prev2 < next2:
+                prev2 += max_diff
+            else:
+                prev2 -= max_diff
+            equal2 -= 1
+
+            buffer[i] = 1 - (int(prev1) / 10_000) * (int(prev2) / 10_000) * noise_factor
+
+        (rng1.next_value, rng1.prev, rng1.equal_values) = (next1, prev1, equal1)
+        (rng2.next_value, rng2.prev, rng2.equal_values) = (next2, prev2, equal2)
+
+        return buffer
+
+    def getstate(self) -> dict:
+        "Returns a JSON-serializable checkpoint of this generator, which can be restored with `setstate()`"
+
+        return {
+            'random': random_state(self.rng1.randomness),
+            'rng1': self.rng1._getstate_fields(),
+            'rng2': self.rng2._getstate_fields(),
+        }
+
+    def setstate(self, state: dict):
+        # both generators share the same `Random` instance
+        set_random_state(self.rng1.randomness, state['random'])
+        self.rng1._setstate_fields(state['rng1'])
+        self.rng2._setstate_fields(state['rng2'])
+
+    def take(self, n: int) -> array:
+        "Returns the next `n` factors in a new `array('d')`"
+        return self.fill(array('d', bytes(n * array('d').itemsize)))
+
+    def blocks(self, block_size: int):
+        """Yields the factors in blocks of `block_size`.
+        The same buffer is reused for every block, so it must be consumed before requesting the next one."""
+
+        buffer = array('d', bytes(block_size * array('d').itemsize))
+        while True:
+            yield self.fill(buffer)
@@ -0,0 +1,248 @@
+from libpv.time_of_day import Timestamp
+
+import mmap
+import numpy as np
+
+# gaps of up to one hour are filled with the previous value by default
+MAX_GAP = 3600
+# the maximum number of steps in a piece yielded by `resample()`
+PIECE_STEPS = 65536
+
+# the positions of the digits of `YYYY-MM-DDTHH:MM:SS` (the separator can also be a space)
+_ISO_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_NUMBER_CHARS = np.zeros(256, dtype=bool)
+_NUMBER_CHARS[list(b'0123456789.-+ "')] = True
+
+
+def _fields(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray, commas: np.ndarray, column: int):
+    "Returns the start and end positions of a column in every line"
+
+    first_comma = np.searchsorted(commas, starts)
+    commas = np.append(commas, len(buffer))
+
+    if column == 0:
+        field_starts = starts
+    else:
+        field_starts = commas[np.minimum(first_comma + column - 1, len(commas) - 1)] + 1
+    field_ends = np.minimum(commas[np.minimum(first_comma + column, len(commas) - 1)], ends)
+
+    if np.any(field_starts > ends):
+        line = int(np.argmax(field_starts > ends))
+        raise ValueError(f'column {column} is missing in line `{_line(buffer, starts[line], ends[line])}`')
+    return field_starts, field_ends
+
+
+def _line(buffer: np.ndarray, start: int, end: int) -> str:
+    return buffer[start:end].tobytes().decode(errors='replace')
+
+
+def _parse_numbers(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    "Parses decimal numbers like `-12.5`, which may be surrounded by spaces or quotes"
+
+    width = int((ends - starts).max())
+    positions = starts[:, np.newaxis] + np.arange(width)
+    chars = np.where(positions < ends[:, np.newaxis], buffer[np.minimum(positions, len(buffer) - 1)], ord(' '))
+
+    invalid = ~_NUMBER_CHARS[chars].all(axis=1)
+    digits = (chars >= ord('0')) & (chars <= ord('9'))
+    invalid |= ~digits.any(axis=1)
+    if np.any(invalid):
+        line = int(np.argmax(invalid))
+        raise ValueError(f'invalid number `{_line(buffer, starts[line], ends[line])}`')
+
+    # the exponent of a digit is the number of digits before the decimal point minus its own position
+    count = np.cumsum(digits, axis=1)
+    dots = chars == ord('.')
+    has_dot = dots.any(axis=1)
+    integer_digits = np.where(has_dot, count[np.arange(len(chars)), np.argmax(dots, axis=1)], count[:, -1])
+    exponents = integer_digits[:, np.newaxis] - count
+
+    values = (np.where(digits, chars - ord('0'), 0) * np.power(10.0, exponents)).sum(axis=1)
+    return np.where((chars == ord('-')).any(axis=1), -values, values)
+
+
+def _parse_iso_times(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    "Parses times like `2024-06-01T12:00:05` or `2024-06-01 12:00:05.250Z` as milliseconds since the epoch"
+
+    lengths = ends - starts
+    with_millis = (lengths == 23) | (lengths == 24)
+    invalid = ~((lengths == 19) | (lengths == 20) | with_millis)
+    if np.any(invalid):
+        line = int(np.argmax(invalid))
+        raise ValueError(f'invalid time `{_line(buffer, starts[line], ends[line])}`')
+
+    digits = buffer[starts[:, np.newaxis] + _ISO_DIGITS].astype(np.int64) - ord('0')
+    millis_positions = np.minimum(starts[:, np.newaxis] + [20, 21, 22], len(buffer) - 1)
+    millis_digits = np.where(with_millis[:, np.newaxis], buffer[millis_positions].astype(np.int64) - ord('0'), 0)
+
+    invalid = ((digits < 0) | (digits > 9)).any(axis=1) | ((millis_digits < 0) | (millis_digits > 9)).any(axis=1)
+    if np.any(invalid):
+        line = int(np.argmax(invalid))
+        raise ValueError(f'invalid time `{_line(buffer, starts[line], ends[line])}`')
+
+    pairs = digits[:, 4::2] * 10 + digits[:, 5::2]
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    (month, day, hour, minute, second) = pairs.T
+
+    days = ((year - 1970) * 12 + month - 1).astype('M8[M]').astype('M8[D]') + (day - 1).astype('m8[D]')
+    return (
+        days.astype('M8[ms]').view(np.int64)
+        + ((hour * 60 + minute) * 60 + second) * 1000
+        + millis_digits @ np.array([100, 10, 1]))
+
+
+def read_meter_csv(path: str, time_column: int = 0, value_column: int = 1, chunk_bytes: int = 1 << 22):
+    """Reads a CSV file of recorded meter values in chunks of about `chunk_bytes` bytes, so the memory use
+    doesn't depend on the size of the file. Yields tuples of the times (milliseconds since the epoch)
+    and the values of a chunk as arrays. The lines are parsed with vectorized numpy operations.
+
+    The times must be ascending, either ISO 8601 times in UTC like `2024-06-01T12:00:05` (with
+    optional milliseconds) or seconds since the epoch. A header line and empty lines are skipped."""
+
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            position = 0
+            iso = None
+
+            while position < size:
+                end = min(position + chunk_bytes, size)
+                if end < size:
+                    newline = data.rfind(b'\n', position, end)
+                    if newline < 0:
+                        newline = data.find(b'\n', end)
+                    end = newline + 1 if newline >= 0 else size
+
+                # copied, so that no array refers to the mapped memory when it is closed
+                buffer = np.frombuffer(data[position:end], dtype=np.uint8)
+                if hasattr(mmap, 'MADV_DONTNEED'):
+                    # release the pages that were read, so they don't count towards the memory use
+                    page_start = position - position % mmap.PAGESIZE
+                    data.madvise(mmap.MADV_DONTNEED, page_start, end - page_start)
+                newlines = np.flatnonzero(buffer == ord('\n'))
+                starts = np.concatenate([[0], newlines + 1])
+                ends = np.append(newlines, len(buffer))
+                # strip `\r`
+                ends -= (ends > starts) & (buffer[np.maximum(ends - 1, 0)] == ord('\r'))
+
+                non_empty = ends > starts
+                if position == 0 and non_empty.any():
+                    first = int(np.argmax(non_empty))
+                    char = buffer[starts[first]]
+                    if not (ord('0') <= char <= ord('9') or char == ord('-')):
+                        non_empty[first] = False
+                (starts, ends) = (starts[non_empty], ends[non_empty])
+                position = end
+
+                if len(starts) == 0:
+                    continue
+
+                commas = np.flatnonzero(buffer == ord(','))
+                (time_starts, time_ends) = _fields(buffer, starts, ends, commas, time_column)
+                (value_starts, value_ends) = _fields(buffer, starts, ends, commas, value_column)
+
+                if iso is None:
+                    iso = time_ends[0] - time_starts[0] >= 10 and buffer[time_starts[0] + 4] == ord('-')
+                if iso:
+                    millis = _parse_iso_times(buffer, time_starts, time_ends)
+                else:
+                    millis = np.rint(_parse_numbers(buffer, time_starts, time_ends) * 1000).astype(np.int64)
+
+                yield millis, _parse_numbers(buffer, value_starts, value_ends)
+
+
+def _fill(keys: np.ndarray, means: np.ndarray, step_ms: int, last: tuple, max_gap_steps: int):
+    """Yields the times and values of the steps up to the last key in pieces of at most `PIECE_STEPS` steps.
+    Missing steps repeat the previous value, unless more than `max_gap_steps` steps are missing in a row:
+    these steps are skipped."""
+
+    previous = last[0] if last is not None else keys[0] - 1
+    missing = keys - np.concatenate([[previous], keys[:-1]]) - 1
+
+    # the runs of steps that are emitted, separated by the gaps that are too long
+    skipped = missing > max_gap_steps
+    run_starts = np.flatnonzero(skipped | (np.arange(len(keys)) == 0))
+    run_ends = np.append(run_starts[1:], len(keys))
+
+    for first, end in zip(run_starts.tolist(), run_ends.tolist()):
+        start = int(keys[first] if skipped[first] else keys[first] - missing[first])
+        stop = int(keys[end - 1]) + 1
+        for piece_start in range(start, stop, PIECE_STEPS):
+            steps = np.arange(piece_start, min(piece_start + PIECE_STEPS, stop))
+            indices = np.searchsorted(keys, steps, side='right') - 1
+            values = np.where(indices >= 0, means[np.maximum(indices, 0)], last[1] if last is not None else 0)
+            yield (steps * step_ms).view('M8[ms]'), values
+
+
+def resample(chunks, step: float, max_gap: float = MAX_GAP):
+    """Resamples chunks of `(millis, values)` (e.g. from `read_meter_csv()`) to one value every `step` seconds.
+    The value of step `k` is the mean of the values between `k * step` and `(k + 1) * step`. A step without
+    values repeats the value of the previous step, unless the gap without values is longer than `max_gap`
+    seconds: then the steps of the gap are skipped instead of inventing values. Yields tuples of times (a
+    `datetime64[ms]` array) and values, with at most `PIECE_STEPS` steps each."""
+
+    step_ms = round(step * 1000)
+    max_gap_steps = int(max_gap * 1000 // step_ms)
+    # the step that may continue in the next chunk: (key, sum, count)
+    pending = None
+    # the last emitted step: (key, value)
+    last = None
+    last_millis = None
+
+    for millis, values in chunks:
+        if len(millis) == 0:
+            continue
+        if np.any(millis[1:] < millis[:-1]) or (last_millis is not None and millis[0] < last_millis):
+            raise ValueError('the times must be in ascending order')
+        last_millis = millis[-1]
+
+        keys = millis // step_ms
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        keys = keys[starts]
+        sums = np.add.reduceat(values, starts)
+        counts = np.diff(np.append(starts, len(millis)))
+
+        if pending is not None:
+            if pending[0] == keys[0]:
+                sums[0] += pending[1]
+                counts[0] += pending[2]
+            else:
+                keys = np.concatenate([[pending[0]], keys])
+                sums = np.concatenate([[pending[1]], sums])
+                counts = np.concatenate([[pending[2]], counts])
+
+        pending = (keys[-1], sums[-1], counts[-1])
+        if len(keys) > 1:
+            means = sums[:-1] / counts[:-1]
+            yield from _fill(keys[:-1], means, step_ms, last, max_gap_steps)
+            last = (keys[-2], means[-1])
+
+    if pending is not None:
+        yield from _fill(np.array([pending[0]]), np.array([pending[1] / pending[2]]), step_ms, last, max_gap_steps)
+
+
+def replay_chunks(path: str, step: float, scale: float = 1, value_column: int = 1, max_gap: float = MAX_GAP):
+    """Reads and resamples a CSV file of recorded consumption values, see `read_meter_csv()` and `resample()`.
+    Yields tuples of times (a `datetime64[ms]` array) and meter values, which are the consumption
+    times `scale` as negative integers, like the values sent by `meter.py`."""
+
+    for times, values in resample(read_meter_csv(path, value_column=value_column), step, max_gap):
+        yield times, -np.rint(values * scale).astype(np.int64)
+
+
+def replay_samples(path: str, step: float, scale: float = 1, value_column: int = 1, max_gap: float = MAX_GAP):
+    "Like `replay_chunks()`, but yields `(Timestamp, consumption)` pairs, where the consumption is positive"
+
+    for times, meter_values in replay_chunks(path, step, scale, value_column, max_gap):
+        yield from zip(map(Timestamp, times.view(np.int64).tolist()), (-meter_values).tolist())
+
+
+def simulate_replay(
+        simulation, path: str, step: float, scale: float = 1, value_column: int = 1, max_gap: float = MAX_GAP):
+    "Runs the simulation with the meter values of a CSV file instead of random values"
+
+    for times, meter_values in replay_chunks(path, step, scale, value_column, max_gap):
+        simulation.process_arrays(times, meter_values)
+        simulation.output.flush()
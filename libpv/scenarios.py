@@ -0,0 +1,169 @@
+from libpv.curve_cache import CurveCache
+from libpv.messages import check_site_id
+from libpv.output import TextOutput
+from libpv.prng import derive_seed
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation, simulate_offline
+from libpv.time_of_day import TimeOfDay
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+from itertools import groupby
+import json
+from operator import itemgetter
+import os
+from random import Random
+
+
+class Scenario:
+    """
+    The parameters of one simulated site. The parameters have the same meaning and defaults
+    as the command line options of `simulator.py --offline`. The name is used as file name,
+    so it must be a valid site id (see `check_site_id()`).
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_power: int = 3500,
+            sunrise: str = '08:00',
+            sunset: str = '20:00',
+            weather_noise: float = 0.4,
+            max_consumption: int = 9000,
+            days: int = 1):
+        self.name = check_site_id(str(name))
+        self.max_power = int(max_power)
+        self.sunrise = TimeOfDay.parse_hms(str(sunrise))
+        self.sunset = TimeOfDay.parse_hms(str(sunset))
+        self.weather_noise = float(weather_noise)
+        self.max_consumption = int(max_consumption)
+        self.days = int(days)
+
+        if self.sunrise > self.sunset:
+            raise ValueError(f"{name}: sunrise can't occur after sunset")
+        if self.max_power < 0 or self.max_consumption < 0:
+            raise ValueError(f'{name}: max-power and max-consumption must be positive')
+        if self.weather_noise < 0 or self.weather_noise > 1:
+            raise ValueError(f'{name}: weather-noise must be between 0 and 1')
+        if self.days < 1:
+            raise ValueError(f'{name}: days must be at least 1')
+
+    def __repr__(self):
+        return f'Scenario({self.name!r})'
+
+
+def load_scenarios(path: str) -> [Scenario]:
+    """Reads a parameter grid from a CSV file with a header row, or from a JSON file containing
+    a list of objects. The column names or keys are the parameters of `Scenario`."""
+
+    with open(path, newline='') as file:
+        if path.endswith('.json'):
+            rows = json.load(file)
+        else:
+            rows = [{k: v for k, v in row.items() if v != ''} for row in csv.DictReader(file)]
+
+    scenarios = [Scenario(**row) for row in rows]
+
+    names = [s.name for s in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError('scenario names must be unique')
+
+    return scenarios
+
+
+# The curve cache of a worker process, which attaches to the curves published by the main process
+_worker_curves = None
+
+
+def _get_worker_curves(namespace: str, max_curves: int) -> CurveCache:
+    global _worker_curves
+    if _worker_curves is None or _worker_curves.namespace != namespace:
+        _worker_curves = CurveCache(max_curves, shared=True, owner=False, namespace=namespace)
+    return _worker_curves
+
+
+def run_site_day(task) -> str:
+    "Simulates one day of a scenario and returns the output. This runs in a worker process."
+
+    scenario, weather_seed, meter_seed, csv_output, namespace, max_curves = task
+
+    pv_gen = PvGenerator(scenario.sunrise, scenario.sunset, scenario.max_power)
+    file = io.StringIO()
+    simulation = Simulation(
+        pv_gen,
+        weather(scenario.weather_noise, Random(weather_seed)),
+        TextOutput(file, csv_output),
+        curve=_get_worker_curves(namespace, max_curves).get_for(pv_gen))
+
+    simulate_offline(simulation, scenario.max_consumption, meter_seed)
+    return file.getvalue()
+
+
+def site_day_tasks(scenario: Scenario, master_seed: int, csv_output: bool, namespace: str, max_curves: int):
+    for day in range(scenario.days):
+        weather_seed = derive_seed(master_seed, scenario.name, day, 'weather')
+        meter_seed = derive_seed(master_seed, scenario.name, day, 'meter')
+        yield scenario, weather_seed, meter_seed, csv_output, namespace, max_curves
+
+
+def run_scenarios(
+        scenarios: [Scenario],
+        master_seed: int,
+        output_dir: str,
+        csv_output: bool = False,
+        workers: int = None,
+        on_done=None,
+        max_curves: int = 16):
+    """Simulates every day of every scenario in a process pool and writes the output of each
+    scenario to `<output_dir>/<name>.csv` (or `.txt`), with the days in order.
+
+    Every site-day has its own weather and meter seed derived from `master_seed`, so the
+    results don't depend on the number of workers. `on_done` is called with each scenario
+    after its file was written.
+
+    The daily PV curves of up to `max_curves` distinct scenarios are computed once and shared
+    with the workers through shared memory. Only a few site-days per worker are simulated ahead of
+    the one that is written, so the memory use doesn't depend on the number of scenarios and days."""
+
+    os.makedirs(output_dir, exist_ok=True)
+    extension = '.csv' if csv_output else '.txt'
+
+    namespace = f'pvcurve{os.getpid()}'
+    with CurveCache(max_curves, shared=True, namespace=namespace) as curves, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        for scenario in scenarios[:max_curves]:
+            curves.get(scenario.sunrise, scenario.sunset, scenario.max_power)
+
+        tasks = (
+            (scenario, task)
+            for scenario in scenarios
+            for task in site_day_tasks(scenario, master_seed, csv_output, namespace, max_curves)
+        )
+        results = _bounded_map(executor, tasks, 4 * (workers or os.cpu_count() or 1))
+
+        for scenario, days in groupby(results, key=itemgetter(0)):
+            with open(os.path.join(output_dir, scenario.name + extension), 'x') as file:
+                for _, day in days:
+                    file.write(day)
+
+            if on_done is not None:
+                on_done(scenario)
+
+
+def _bounded_map(executor, tasks, in_flight: int):
+    """Runs `run_site_day` for each `(scenario, task)` pair and yields the `(scenario, output)` pairs in
+    order. At most `in_flight` tasks are submitted ahead, so the outputs don't pile up in memory
+    while an earlier scenario is written."""
+
+    pending = deque()
+    for scenario, task in tasks:
+        pending.append((scenario, executor.submit(run_site_day, task)))
+        if len(pending) >= in_flight:
+            (scenario, future) = pending.popleft()
+            yield scenario, future.result()
+
+    while pending:
+        (scenario, future) = pending.popleft()
+        yield scenario, future.result()
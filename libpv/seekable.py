@@ -0,0 +1,210 @@
+import math
+import numpy as np
+
+
+class SeekablePrng:
+    """
+    Counter-based variant of `continuous_prng`: a stream of random integers between `v_min` and
+    `v_max`, where each value differs from the previous value by at most `max_diff`.
+
+    The stream is divided into blocks of `block_size` values. Block `k` is generated from its own
+    Philox stream, derived from `seed`, `stream` and `k`, so the value at any index can be computed
+    in O(block_size) without generating the values before it. The first value of every block is an
+    anchor drawn independently; the values in between are a random walk with plateaus (like
+    `continuous_prng`), bent so that it ends at the next anchor.
+
+    The values differ from `continuous_prng` with the same seed, but have similar properties.
+    Like `ContinuousPrng`, this is an iterator that also supports `fill`, `take` and `blocks`.
+    Its state is just its position, see `getstate()`.
+    """
+
+    def __init__(
+            self,
+            v_min: int, v_max: int,
+            max_diff: float, max_equal_values: int,
+            seed: int, stream: int = 0,
+            block_size: int = None):
+        if max_diff < 1:
+            raise ValueError('max_diff must be at least 1')
+
+        self.v_min = v_min
+        self.v_max = v_max
+        self.max_equal_values = max_equal_values
+        self.seed = seed
+        self.stream = stream
+
+        # Values are floored at the end, which can increase the difference between two values
+        # by up to 1, unless the maximum step is a whole number
+        self.step = math.floor(max_diff)
+
+        # The walk uses at most half of each step, and the bend towards the next anchor the other
+        # half; this is always enough to reach the next anchor if the block is long enough
+        min_block_size = math.ceil(2 * (v_max - v_min) / self.step)
+        if block_size is None:
+            block_size = max(1024, min_block_size)
+        elif block_size < min_block_size:
+            raise ValueError(f'block_size must be at least {min_block_size}')
+        self.block_size = block_size
+
+        self.position = 0
+        self._cached_block = (None, None)
+
+    def _generator(self, block: int) -> np.random.Generator:
+        seq = np.random.SeedSequence(self.seed, spawn_key=(self.stream, block))
+        return np.random.Generator(np.random.Philox(seq))
+
+    def _anchor(self, block: int) -> int:
+        return int(self._generator(block).integers(self.v_min, self.v_max, endpoint=True))
+
+    def block(self, k: int) -> np.ndarray:
+        "Returns the values of block `k` (read-only), i.e. the values at `k * block_size` up to the next block"
+
+        if self._cached_block[0] == k:
+            return self._cached_block[1]
+
+        size = self.block_size
+        half_step = self.step / 2
+
+        gen = self._generator(k)
+        start = int(gen.integers(self.v_min, self.v_max, endpoint=True))
+        end = self._anchor(k + 1)
+
+        # plateaus: the drift stays the same for 1 to `max_equal_values` steps
+        lengths = gen.integers(1, self.max_equal_values, size=size, endpoint=True)
+        drifts = gen.uniform(-half_step, half_step, size=size)
+        jitter = gen.uniform(-half_step / 2, half_step / 2, size=size)
+
+        segment = np.repeat(np.arange(size), lengths)[:size]
+        steps = np.clip(drifts[segment] + jitter, -half_step, half_step)
+
+        walk = np.empty(size + 1)
+        walk[0] = start
+        np.cumsum(steps, out=walk[1:])
+        walk[1:] += start
+        np.clip(walk, self.v_min, self.v_max, out=walk)
+
+        walk += np.linspace(0, end - walk[-1], size + 1)
+        np.clip(walk, self.v_min, self.v_max, out=walk)
+
+        values = np.floor(walk[:size]).astype(np.int64)
+        values[0] = start
+        values.flags.writeable = False
+
+        self._cached_block = (k, values)
+        return values
+
+    def values(self, start: int, stop: int) -> np.ndarray:
+        "Returns the values at the indices `start` up to (excluding) `stop`"
+
+        if stop <= start:
+            return np.empty(0, dtype=np.int64)
+
+        first = start // self.block_size
+        last = (stop - 1) // self.block_size
+        values = np.concatenate([self.block(k) for k in range(first, last + 1)])
+
+        offset = first * self.block_size
+        return values[start - offset:stop - offset]
+
+    def value_at(self, index: int) -> int:
+        return int(self.block(index // self.block_size)[index % self.block_size])
+
+    def seek(self, index: int):
+        "Sets the index of the next value returned by `next()`"
+        self.position = index
+
+    def tell(self) -> int:
+        return self.position
+
+    def getstate(self) -> dict:
+        "Returns a JSON-serializable checkpoint, which can be restored with `setstate()`"
+        return {'seed': self.seed, 'stream': self.stream, 'position': self.position}
+
+    def setstate(self, state: dict):
+        if state['seed'] != self.seed or state['stream'] != self.stream:
+            raise ValueError('the checkpoint belongs to a different stream')
+        self.position = state['position']
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        value = self.value_at(self.position)
+        self.position += 1
+        return value
+
+    def fill(self, buffer):
+        "Overwrites every element of `buffer` with the next values and returns it"
+
+        buffer[:] = self.values(self.position, self.position + len(buffer))
+        self.position += len(buffer)
+        return buffer
+
+    def take(self, n: int) -> np.ndarray:
+        "Returns the next `n` values"
+
+        values = self.values(self.position, self.position + n)
+        self.position += n
+        return values
+
+    def blocks(self, block_size: int):
+        "Yields the values in arrays of `block_size`"
+
+        while True:
+            yield self.take(block_size)
+
+
+class SeekableWeather:
+    """
+    Counter-based variant of `weather`, built from two `SeekablePrng` streams with the same seed.
+    The factors at any index can be computed without generating the previous factors.
+    """
+
+    def __init__(self, noise_factor: float, seed: int):
+        self.noise_factor = noise_factor
+        self.seed = seed
+        self.rng1 = SeekablePrng(0, 10_000, 10, 100, seed, stream=0)
+        self.rng2 = SeekablePrng(0, 10_000, 10, 100, seed, stream=1)
+
+    def values(self, start: int, stop: int) -> np.ndarray:
+        "Returns the factors at the indices `start` up to (excluding) `stop`"
+
+        weather = (self.rng1.values(start, stop) / 10_000) * (self.rng2.values(start, stop) / 10_000)
+        return 1 - (weather * self.noise_factor)
+
+    def value_at(self, index: int) -> float:
+        return float(self.values(index, index + 1)[0])
+
+    def seek(self, index: int):
+        self.rng1.seek(index)
+        self.rng2.seek(index)
+
+    def tell(self) -> int:
+        return self.rng1.tell()
+
+    def getstate(self) -> dict:
+        return {'seed': self.seed, 'position': self.tell()}
+
+    def setstate(self, state: dict):
+        if state['seed'] != self.seed:
+            raise ValueError('the checkpoint belongs to a different stream')
+        self.seek(state['position'])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> float:
+        return self.take(1)[0]
+
+    def take(self, n: int) -> np.ndarray:
+        start = self.tell()
+        self.seek(start + n)
+        return self.values(start, start + n)
+
+    def fill(self, buffer):
+        buffer[:] = self.take(len(buffer))
+        return buffer
+
+    def blocks(self, block_size: int):
+        while True:
+            yield self.take(block_size)
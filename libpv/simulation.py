@@ -0,0 +1,221 @@
+from libpv.meter import meter_prng, day_timestamps, date_timestamps, SECONDS_STEP
+from libpv.partition import partition_of
+from libpv.pv_generation import PvGenerator
+from libpv.time_of_day import TimeOfDay, Timestamp, SECS_PER_DAY, MILLIS_PER_DAY
+
+from datetime import date as Date, timedelta
+from itertools import groupby, islice
+import numpy as np
+
+
+class Simulation:
+    """
+    Computes the PV value for each meter value and passes both values and their sum to `output`.
+
+    `weather_gen` is an iterator of weather factors, e.g. the one returned by `weather()`.
+
+    If `curve` is given, it must be the daily curve of `pv_gen` (see `CurveCache`). The PV values
+    are then looked up instead of computed. Times with milliseconds use the value of the whole second.
+
+    `last_time` is the time of the last processed sample, or `None`. `batch_start` is the time of the
+    first sample passed to `process()` since it was reset to `None`, which `Checkpointer` does for
+    every batch.
+
+    If `pv_gen` depends on the date (i.e. it has a `date` and a `for_date()` method, like
+    `SolarPvGenerator`), `date` is the date of the simulated samples. It is changed with `set_date()`,
+    and follows the date of `Timestamp`s and `datetime64` times. Otherwise it is `None`.
+    """
+
+    def __init__(self, pv_gen: PvGenerator, weather_gen, output, curve: np.ndarray = None):
+        self.pv_gen = pv_gen
+        self.weather_gen = weather_gen
+        self.output = output
+        self.curve = curve
+        self.last_time = None
+        self.batch_start = None
+        self.skip_from = None
+        self.skip_through = None
+        self.skip_previous = None
+        self.date = getattr(pv_gen, 'date', None)
+
+    def set_date(self, date: Date):
+        "Changes the date of a `pv_gen` that depends on it, and recomputes the curve if it was given"
+
+        if self.date is None or date == self.date:
+            return
+        self.pv_gen = self.pv_gen.for_date(date)
+        self.date = date
+        if self.curve is not None:
+            self.curve = self.pv_gen.profile(1)
+
+    def resume_after(self, time: TimeOfDay, batch_start: TimeOfDay = None):
+        """Skips the samples that were written before a restart, when the messages since the last checkpoint
+        are redelivered. These are the samples of the last checkpointed batch, which started at `batch_start`
+        (or at `time` if it isn't known), up to and including `time`, as long as the time doesn't go backwards.
+
+        If the first sample is older than `batch_start`, the batch wasn't redelivered and nothing is skipped,
+        so the samples of the next day after midnight aren't mistaken for samples that were written."""
+
+        self.last_time = time
+        self.skip_from = batch_start if batch_start is not None else time
+        self.skip_through = time
+        self.skip_previous = None
+
+    def _skip_written(self, samples: list) -> list:
+        "Returns the samples of a message that weren't written before the restart (see `resume_after()`)"
+
+        if not samples:
+            return samples
+        if self.skip_from is not None:
+            if samples[0][0] < self.skip_from:
+                self.skip_through = None
+                return samples
+            self.skip_from = None
+
+        (skip_through, previous) = (self.skip_through, self.skip_previous)
+        for i, (time, _) in enumerate(samples):
+            if time > skip_through or (previous is not None and time <= previous):
+                self.skip_through = None
+                return samples[i:]
+            # not `==`, which is always false for a timestamp and a time of day
+            if time >= skip_through:
+                self.skip_through = None
+                return samples[i + 1:]
+            previous = time
+
+        self.skip_previous = previous
+        return []
+
+    def process(self, samples):
+        "Processes an iterable of `(TimeOfDay, meter_value)` pairs, e.g. from `parse_meter_message()`"
+
+        if self.skip_through is not None:
+            samples = self._skip_written(list(samples))
+        if self.batch_start is None:
+            samples = list(samples)
+            if samples:
+                self.batch_start = samples[0][0]
+
+        if self.date is not None:
+            for date, day_samples in groupby(samples, key=_sample_date):
+                if date is not None:
+                    self.set_date(date)
+                self._process(day_samples)
+        else:
+            self._process(samples)
+
+    def _process(self, samples):
+        weather_gen = self.weather_gen
+        write = self.output.write
+        time = self.last_time
+
+        if self.curve is not None:
+            # indexing a memoryview returns Python floats, which is faster than indexing the array
+            curve = memoryview(self.curve)
+            for time, meter_value in samples:
+                pv_value = round(curve[int(time.seconds())] * next(weather_gen))
+                write(time, meter_value, pv_value, meter_value + pv_value)
+        else:
+            get_value = self.pv_gen.get_value
+            for time, meter_value in samples:
+                pv_value = round(get_value(time) * next(weather_gen))
+                write(time, meter_value, pv_value, meter_value + pv_value)
+
+        self.last_time = time
+
+    def process_arrays(self, times: np.ndarray, meter_values: np.ndarray):
+        """Vectorized version of `process`, where the times are given in seconds since midnight,
+        or as a `datetime64` array. The results are identical to calling `process` with the same values."""
+
+        if self.date is not None and times.dtype.kind == 'M' and len(times) > 0:
+            days = times.astype('M8[D]')
+            bounds = [0] + (np.flatnonzero(days[1:] != days[:-1]) + 1).tolist() + [len(times)]
+            for start, stop in zip(bounds, bounds[1:]):
+                self.set_date(days[start].item())
+                self._process_arrays(times[start:stop], meter_values[start:stop])
+        else:
+            self._process_arrays(times, meter_values)
+
+    def _process_arrays(self, times: np.ndarray, meter_values: np.ndarray):
+        count = len(times)
+        factors = np.fromiter(islice(self.weather_gen, count), dtype=float, count=count)
+
+        if times.dtype.kind == 'M':
+            millis = times.astype('M8[ms]').view(np.int64)
+            seconds = np.mod(millis, MILLIS_PER_DAY) / 1000
+        else:
+            seconds = times
+
+        if self.curve is not None:
+            clear_sky = self.curve[np.mod(seconds, SECS_PER_DAY).astype(np.int64)]
+        else:
+            clear_sky = self.pv_gen.get_values(seconds)
+        pv_values = np.rint(clear_sky * factors).astype(np.int64)
+
+        self.output.write_arrays(times, meter_values, pv_values, meter_values + pv_values)
+        if count > 0:
+            if times.dtype.kind == 'M':
+                self.last_time = Timestamp(millis[-1])
+            else:
+                self.last_time = TimeOfDay(seconds[-1].item())
+
+
+def _sample_date(sample) -> Date:
+    return sample[0].date() if isinstance(sample[0], Timestamp) else None
+
+
+def simulate_offline(
+        simulation: Simulation,
+        max_consumption: int, meter_seed: int,
+        days: int = 1, first_day: int = 0,
+        on_day_done=None,
+        partition: (int, int) = None,
+        seconds_step=SECONDS_STEP,
+        start_date: Date = None):
+    """Runs the simulation without a message queue, with the same meter values `meter.py` would send.
+
+    Day `n` uses the meter seed `meter_seed + n`, so the result is the same as running
+    `meter.py --seed <meter_seed + n>` once for every day while the simulator is running.
+
+    To resume an interrupted run, start at `first_day`. `on_day_done` is called with the
+    number of each day after its output was flushed.
+
+    If `partition` is a pair `(k, n)`, only the samples of partition `k` of `n` are simulated,
+    like a worker consuming `partition_queue(QUEUE, k)` (see `libpv.partition`).
+
+    The meter sends a value every `seconds_step` seconds, which can be fractional. If `start_date` is
+    given, the times are absolute `Timestamp`s, where day `n` is `n` days after `start_date`.
+
+    If the PV values depend on the date (see `Simulation`), day `n` is simulated on the date `n` days
+    after `start_date`, or after the initial date of the simulation."""
+
+    seconds = day_timestamps(seconds_step)
+    count = len(seconds)
+    in_partition = None
+    if partition is not None:
+        (k, n) = partition
+        in_partition = partition_of(seconds, n) == k
+        seconds = seconds[in_partition]
+
+    first_date = start_date if start_date is not None else simulation.date
+    for day in range(first_day, days):
+        if simulation.date is not None:
+            simulation.set_date(first_date + timedelta(days=day))
+
+        if start_date is not None:
+            times = date_timestamps(start_date + timedelta(days=day), seconds_step)
+            if in_partition is not None:
+                times = times[in_partition]
+        else:
+            times = seconds
+
+        rng = meter_prng(max_consumption, meter_seed + day)
+        meter_values = -np.asarray(rng.take(count), dtype=np.int64)
+        if in_partition is not None:
+            meter_values = meter_values[in_partition]
+
+        simulation.process_arrays(times, meter_values)
+        simulation.output.flush()
+
+        if on_day_done is not None:
+            on_day_done(day)
@@ -0,0 +1,189 @@
+from libpv.checkpoint import Checkpoint, CheckpointableIterator
+from libpv.curve_cache import CurveCache
+from libpv.messages import check_site_id
+from libpv.output import create_output
+from libpv.prng import derive_seed
+from libpv.pv_generation import PvGenerator
+from libpv.scenarios import Scenario
+from libpv.seekable import SeekableWeather
+from libpv.simulation import Simulation
+
+from collections import OrderedDict
+import time
+
+# the number of weather factors generated at once for a site
+WEATHER_BLOCK_SIZE = 64
+# the site of messages without a site id
+DEFAULT_SITE = 'default'
+
+
+class _Site:
+    __slots__ = ('simulation', 'weather_values', 'last_seen')
+
+    def __init__(self, simulation: Simulation, weather_values: CheckpointableIterator):
+        self.simulation = simulation
+        self.weather_values = weather_values
+        self.last_seen = time.monotonic()
+
+
+class SiteTable:
+    """
+    The state of every site served by one simulator: the PV parameters, the position in the
+    weather stream and the output file. Sites are opened when their first message arrives.
+
+    The parameters of a site are taken from `scenarios` (a list of `Scenario`, where the name is
+    the site id), or from `defaults` (the keyword arguments of `Scenario`). The weather of a site is
+    a `SeekableWeather` stream with a seed derived from `seed` and the site id, so its state is
+    just a position. The output of a site is written to `output_path` with `{site}` replaced by
+    the site id.
+
+    At most `max_sites` sites are open at once, each with an open output file; when another site is
+    opened, the least recently used site is evicted. Evicting a site flushes and closes its output and
+    saves the position of the weather stream and the output to a checkpoint next to the output file
+    (`<output>.checkpoint`), so the memory use doesn't grow with the number of sites. `close()` saves the
+    checkpoints of the open sites as well. A site with a checkpoint continues where it stopped when it is
+    opened again, also by a restarted simulator with the same seed. The output of a new site must not exist.
+
+    A `SiteTable` has the same buffering methods as an output (`pending`, `detach`, `write_batch`,
+    `flush`), so it can be passed to `Metrics`.
+    """
+
+    buffer_size = 1024
+
+    def __init__(
+            self,
+            seed: int,
+            output_path: str,
+            defaults: dict = None,
+            scenarios: [Scenario] = (),
+            max_sites: int = 256,
+            max_curves: int = 16):
+        if '{site}' not in output_path:
+            raise ValueError('the output path must contain `{site}`')
+        if max_sites < 1:
+            raise ValueError('max_sites must be at least 1')
+
+        self.seed = seed
+        self.output_path = output_path
+        self.defaults = defaults if defaults is not None else {}
+        self.scenarios = {scenario.name: scenario for scenario in scenarios}
+        self.max_sites = max_sites
+        self.curves = CurveCache(max_curves)
+
+        # site id -> open site, least recently used first
+        self.sites = OrderedDict()
+        # the number of buffered samples of all sites
+        self.buffered = 0
+
+    def __len__(self):
+        return len(self.sites)
+
+    def get(self, site: str) -> Simulation:
+        "Returns the simulation of a site, and opens the site if necessary"
+
+        return self._get(site).simulation
+
+    def _get(self, site: str) -> _Site:
+        entry = self.sites.get(site)
+        if entry is not None:
+            self.sites.move_to_end(site)
+            return entry
+
+        if len(self.sites) >= self.max_sites:
+            self.evict(next(iter(self.sites)))
+
+        entry = self._open(site)
+        self.sites[site] = entry
+        return entry
+
+    def process(self, site: str, samples):
+        "Passes the samples of a message to the simulation of `site` (or `DEFAULT_SITE` if it is `None`)"
+
+        if site is None:
+            site = DEFAULT_SITE
+        entry = self._get(site)
+        output = entry.simulation.output
+
+        pending = output.pending()
+        entry.simulation.process(samples)
+        self.buffered += output.pending() - pending
+        entry.last_seen = time.monotonic()
+
+    def _open(self, site: str) -> _Site:
+        check_site_id(site)
+
+        scenario = self.scenarios.get(site)
+        if scenario is None:
+            scenario = Scenario(site, **self.defaults)
+
+        pv_gen = PvGenerator(scenario.sunrise, scenario.sunset, scenario.max_power)
+        values = CheckpointableIterator(
+            SeekableWeather(scenario.weather_noise, derive_seed(self.seed, 'site', site)),
+            WEATHER_BLOCK_SIZE)
+
+        path = self.output_path.replace('{site}', site)
+        checkpoint = self._checkpoint(site)
+        state = checkpoint.load()
+        if state is not None:
+            if state['seed'] != self.seed:
+                raise ValueError(f"the seed doesn't match the seed {state['seed']} of site `{site}`")
+            values.setstate(state['weather'])
+            output = create_output(path, resume_position=state['output_position'])
+        else:
+            output = create_output(path, resumable=True)
+            # a checkpoint of the empty file, so the site can be resumed after a crash
+            checkpoint.save({'seed': self.seed, 'weather': values.getstate(), 'output_position': output.sync()})
+
+        simulation = Simulation(pv_gen, iter(values), output, curve=self.curves.get_for(pv_gen))
+        return _Site(simulation, values)
+
+    def evict(self, site: str):
+        "Flushes and closes the output of a site and removes it from memory, after saving its checkpoint"
+
+        entry = self.sites.pop(site)
+        self.buffered -= entry.simulation.output.pending()
+        self._close(site, entry)
+
+    def _close(self, site: str, entry: _Site):
+        output = entry.simulation.output
+        output.flush()
+        state = {'seed': self.seed, 'weather': entry.weather_values.getstate(), 'output_position': output.sync()}
+        self._checkpoint(site).save(state)
+        output.close()
+
+    def _checkpoint(self, site: str) -> Checkpoint:
+        return Checkpoint(self.output_path.replace('{site}', site) + '.checkpoint')
+
+    def evict_idle(self, max_idle: float) -> int:
+        "Evicts the sites that didn't receive a message for `max_idle` seconds, and returns their number"
+
+        deadline = time.monotonic() - max_idle
+        idle = [site for site, entry in self.sites.items() if entry.last_seen < deadline]
+        for site in idle:
+            self.evict(site)
+        return len(idle)
+
+    def pending(self) -> int:
+        return self.buffered
+
+    def detach(self) -> list:
+        outputs = [entry.simulation.output for entry in self.sites.values()]
+        self.buffered = 0
+        return [(output, output.detach()) for output in outputs if output.pending() > 0]
+
+    def write_batch(self, batches: list):
+        for output, batch in batches:
+            output.write_batch(batch)
+
+    def flush(self):
+        self.write_batch(self.detach())
+
+    def close(self):
+        "Flushes and closes the outputs of all sites and saves their checkpoints"
+
+        self.buffered = 0
+        try:
+            while self.sites:
+                self._close(*self.sites.popitem(last=False))
+        finally:
+            self.curves.close()
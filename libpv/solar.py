@@ -0,0 +1,171 @@
+from libpv.time_of_day import TimeOfDay, Timestamp, SECS_PER_DAY
+
+from datetime import date as Date
+from functools import lru_cache
+import numpy as np
+
+# extraterrestrial irradiance used by the Meinel clear-sky model, in W/m²
+SOLAR_CONSTANT = 1353
+# irradiance at which a panel produces its rated power (standard test conditions), in W/m²
+STC_IRRADIANCE = 1000
+
+
+def sun_position(day_of_year: int, seconds, latitude, longitude, utc_offset: float = 0):
+    """Computes the position of the sun, vectorized over `seconds` (local time of day) and, with
+    broadcasting, over latitudes and longitudes in degrees. Uses Spencer's formulas for the
+    declination and the equation of time.
+
+    Returns `(cos_zenith, azimuth)`, where the azimuth is in radians, clockwise from north."""
+
+    gamma = 2 * np.pi / 365 * (day_of_year - 1)
+    eot = 229.18 * (
+        0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    declination = (
+        0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+
+    lat = np.radians(latitude)
+    solar_minutes = np.asarray(seconds) / 60 + eot + 4 * np.asarray(longitude) - 60 * utc_offset
+    hour_angle = np.radians(solar_minutes / 4 - 180)
+
+    cos_zenith = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    azimuth = np.arctan2(
+        np.sin(hour_angle),
+        np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat)) + np.pi
+
+    return np.clip(cos_zenith, -1, 1), azimuth
+
+
+@lru_cache(maxsize=64)
+def sun_position_table(day_of_year: int, latitude: float, longitude: float, utc_offset: float, step: int):
+    """The sun position of a whole day, where index `i` belongs to `i * step` seconds after midnight.
+    Tables are cached, so they are computed only once for all sites with the same coordinates."""
+
+    (cos_zenith, azimuth) = sun_position(
+        day_of_year, np.arange(0, SECS_PER_DAY, step), latitude, longitude, utc_offset)
+    cos_zenith.flags.writeable = False
+    azimuth.flags.writeable = False
+    return cos_zenith, azimuth
+
+
+def clear_sky_power(cos_zenith, azimuth, tilt, panel_azimuth, max_power):
+    """Computes the PV power from the sun position with the Meinel clear-sky model, for panels
+    with the given tilt and azimuth (in degrees, clockwise from north). All arguments are broadcast.
+    The power is proportional to the irradiance on the panel and capped at `max_power`."""
+
+    cos_zenith = np.asarray(cos_zenith)
+    daylight = cos_zenith > 0.001
+    safe_cos = np.where(daylight, cos_zenith, 1)
+
+    # Kasten-Young air mass
+    zenith_deg = np.degrees(np.arccos(safe_cos))
+    air_mass = 1 / (safe_cos + 0.50572 * (96.07995 - zenith_deg) ** -1.6364)
+    direct = SOLAR_CONSTANT * 0.7 ** (air_mass ** 0.678)
+    diffuse = 0.1 * direct
+
+    tilt = np.radians(tilt)
+    sin_zenith = np.sqrt(1 - safe_cos ** 2)
+    cos_incidence = (
+        safe_cos * np.cos(tilt)
+        + sin_zenith * np.sin(tilt) * np.cos(azimuth - np.radians(panel_azimuth)))
+
+    irradiance = direct * np.maximum(cos_incidence, 0) + diffuse * (1 + np.cos(tilt)) / 2
+    power = np.minimum(np.asarray(max_power) * irradiance / STC_IRRADIANCE, max_power)
+    return np.where(daylight, power, 0.0)
+
+
+class SolarPvGenerator:
+    """
+    Generates PV power values from the position of the sun, as an alternative to `PvGenerator`.
+    Times are local times of day on `date`, in a time zone `utc_offset` hours ahead of UTC, or
+    timestamps, which are local times on their own date.
+    `tilt` is the angle of the panels from the horizontal, `azimuth` the direction they face
+    (in degrees, clockwise from north, so 180 = south).
+    """
+
+    def __init__(
+            self,
+            latitude: float, longitude: float, date: Date,
+            max_power: int,
+            tilt: float = 30, azimuth: float = 180,
+            utc_offset: float = 0):
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+            raise ValueError('latitude must be between -90 and 90, longitude between -180 and 180')
+
+        self.latitude = latitude
+        self.longitude = longitude
+        self.date = date
+        self.max_power = max_power
+        self.tilt = tilt
+        self.azimuth = azimuth
+        self.utc_offset = utc_offset
+        self.day_of_year = date.timetuple().tm_yday
+
+    def for_date(self, date: Date):
+        "Returns a generator with the same parameters for another date"
+
+        return SolarPvGenerator(
+            self.latitude, self.longitude, date, self.max_power, self.tilt, self.azimuth, self.utc_offset)
+
+    def get_value(self, time: TimeOfDay) -> float:
+        if isinstance(time, Timestamp):
+            return float(self.get_values(np.array([time.millis], dtype='M8[ms]'))[0])
+        return float(self.get_values([time.seconds()])[0])
+
+    def get_values(self, seconds) -> np.ndarray:
+        """Vectorized version of `get_value`, which accepts an array of seconds since midnight, or a
+        `datetime64` array, where each value uses the sun position of its own date"""
+
+        times = np.asarray(seconds)
+        day_of_year = self.day_of_year
+        if times.dtype.kind == 'M':
+            days = times.astype('M8[D]')
+            day_of_year = (days - days.astype('M8[Y]')).astype(np.int64) + 1
+            times = (times - days) / np.timedelta64(1, 's')
+
+        (cos_zenith, azimuth) = sun_position(
+            day_of_year, np.mod(times, SECS_PER_DAY),
+            self.latitude, self.longitude, self.utc_offset)
+        return clear_sky_power(cos_zenith, azimuth, self.tilt, self.azimuth, self.max_power)
+
+    def profile(self, step: int = 1) -> np.ndarray:
+        """Returns the PV values of a whole day, where the `i`-th value belongs to the time
+        `i * step` seconds after midnight. The sun positions are shared with other generators."""
+
+        (cos_zenith, azimuth) = sun_position_table(
+            self.day_of_year, self.latitude, self.longitude, self.utc_offset, step)
+        return clear_sky_power(cos_zenith, azimuth, self.tilt, self.azimuth, self.max_power)
+
+
+def fleet_profiles(
+        date: Date,
+        latitudes, longitudes,
+        max_powers, tilts=30, azimuths=180,
+        utc_offset: float = 0,
+        step: int = 60) -> np.ndarray:
+    """Computes the daily profiles of many sites at once. The arguments after `date` are arrays
+    with one value per site (or scalars for all sites). Returns an array with one row per site,
+    where column `i` belongs to `i * step` seconds after midnight.
+
+    The sun position is only computed once for each distinct pair of coordinates."""
+
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.broadcast_to(np.asarray(longitudes, dtype=float), latitudes.shape)
+    day_of_year = date.timetuple().tm_yday
+
+    coordinates = np.stack([latitudes, longitudes], axis=1)
+    (unique, inverse) = np.unique(coordinates, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    seconds = np.arange(0, SECS_PER_DAY, step)
+    (cos_zenith, azimuth) = sun_position(
+        day_of_year, seconds[np.newaxis, :], unique[:, :1], unique[:, 1:], utc_offset)
+
+    def column(values):
+        return np.broadcast_to(np.asarray(values, dtype=float), latitudes.shape)[:, np.newaxis]
+
+    return clear_sky_power(
+        cos_zenith[inverse], azimuth[inverse],
+        column(tilts), column(azimuths), column(max_powers))
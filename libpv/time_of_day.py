@@ -1,4 +1,9 @@
+from datetime import date as Date, datetime, timedelta, timezone
+
 SECS_PER_DAY = 60 * 60 * 24
+MILLIS_PER_DAY = SECS_PER_DAY * 1000
+
+_EPOCH = datetime(1970, 1, 1)
 
 
 def rem_euclid(lhs: int, rhs: int) -> int:
@@ -14,9 +19,28 @@ def rem_euclid(lhs: int, rhs: int) -> int:
         return r
 
 
+_hms_strings = None
+
+
+def hms_strings() -> [str]:
+    """A table of the formatted times `00:00:00` to `23:59:59`, where the index is the number
+    of seconds since midnight. The table is created on first use."""
+
+    global _hms_strings
+    if _hms_strings is None:
+        _hms_strings = [
+            f'{h:02}:{m:02}:{s:02}'
+            for h in range(24)
+            for m in range(60)
+            for s in range(60)
+        ]
+    return _hms_strings
+
+
 class TimeOfDay:
     """
-    A time, with seconds precision, between 00:00:00 and 23:59:59
+    A time between 00:00:00 and 23:59:59.999. The time is stored as seconds, which are an `int`
+    for whole seconds and a `float` for times with milliseconds.
 
     Example
     -------
@@ -25,9 +49,19 @@ class TimeOfDay:
     ```
     """
 
+    __slots__ = ('time',)
+
     def __init__(self, seconds=0):
         "Creates a `TimeOfDay` instance from seconds. The number can be negative and arbitrarily large."
-        self.time = rem_euclid(seconds, SECS_PER_DAY)
+        # equivalent to `rem_euclid`, because `SECS_PER_DAY` is positive
+        self.time = seconds % SECS_PER_DAY
+
+    @classmethod
+    def _from_normalized(cls, seconds):
+        "Creates a `TimeOfDay` instance from seconds that are already between 0 and `SECS_PER_DAY`"
+        t = object.__new__(cls)
+        t.time = seconds
+        return t
 
     @staticmethod
     def from_hms(h=0, m=0, s=0):
@@ -68,33 +102,142 @@ class TimeOfDay:
         return h, m, s
 
     def __str__(self):
-        (h, m, s) = self.hms()
-
-        if h < 10:
-            h = '0' + str(h)
-        if m < 10:
-            m = '0' + str(m)
-        if s < 10:
-            s = '0' + str(s)
+        if type(self.time) is int:
+            return hms_strings()[self.time]
 
-        return f'{h}:{m}:{s}'
+        (seconds, millis) = divmod(round(self.time * 1000), 1000)
+        return f'{hms_strings()[seconds % SECS_PER_DAY]}.{millis:03}'
 
     def __repr__(self):
         return f'TimeOfDay({self.time})'
 
     def __add__(self, seconds: int):
-        time = rem_euclid(self.time + seconds, SECS_PER_DAY)
-        return TimeOfDay(time)
+        return TimeOfDay._from_normalized((self.time + seconds) % SECS_PER_DAY)
 
     def __sub__(self, seconds: int):
-        time = rem_euclid(self.time - seconds, SECS_PER_DAY)
-        return TimeOfDay(time)
+        return TimeOfDay._from_normalized((self.time - seconds) % SECS_PER_DAY)
+
+    # Times can be compared with other times, or with a number of seconds since midnight
 
     def __lt__(self, rhs) -> bool:
-        return self.time < rhs.time
+        return self.time < _seconds_of(rhs)
+
+    def __le__(self, rhs) -> bool:
+        return self.time <= _seconds_of(rhs)
 
     def __gt__(self, rhs) -> bool:
-        return self.time > rhs.time
+        return self.time > _seconds_of(rhs)
+
+    def __ge__(self, rhs) -> bool:
+        return self.time >= _seconds_of(rhs)
 
     def __eq__(self, rhs) -> bool:
-        return self.time == rhs.time
+        if isinstance(rhs, Timestamp):
+            # a timestamp is never equal to a time of day, see `Timestamp`
+            return NotImplemented
+        elif isinstance(rhs, TimeOfDay):
+            return self.time == rhs.time
+        elif isinstance(rhs, (int, float)):
+            return self.time == rhs
+        else:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self.time)
+
+
+def _seconds_of(time):
+    return time.time if isinstance(time, TimeOfDay) else time
+
+
+def seconds_from_millis(millis: int):
+    "Converts milliseconds to seconds, which are an `int` if they are whole"
+
+    (seconds, rest) = divmod(millis, 1000)
+    return seconds if rest == 0 else millis / 1000
+
+
+class Timestamp(TimeOfDay):
+    """
+    An absolute point in time with millisecond precision, stored as milliseconds since the Unix epoch
+    (1970-01-01 00:00:00). Timestamps don't have a time zone; the time of day is the one in UTC.
+
+    A `Timestamp` is also a `TimeOfDay`, so it can be used wherever a time of day is expected (e.g. in
+    `PvGenerator`), but two timestamps are compared by their absolute time. Compared with a time of day
+    or a number, `<`, `<=`, `>` and `>=` use the time of day, but a timestamp is only equal to another
+    timestamp, so that equal values have equal hashes; compare `seconds()` to compare the times of day.
+    Arrays of timestamps are represented as `datetime64[ms]` arrays.
+    """
+
+    __slots__ = ('millis',)
+
+    def __init__(self, millis: int):
+        self.millis = int(millis)
+        self.time = seconds_from_millis(self.millis % MILLIS_PER_DAY)
+
+    @staticmethod
+    def from_datetime(value: datetime):
+        """Creates a `Timestamp` from a `datetime` or a `date` (at midnight). Naive datetimes are in UTC,
+        aware datetimes are converted to UTC."""
+
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        elif value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return Timestamp((value - _EPOCH) // timedelta(milliseconds=1))
+
+    @staticmethod
+    def parse(input: str):
+        """Parses a timestamp in ISO 8601 format, e.g. `2024-06-01`, `2024-06-01T12:00:00.100`
+        or `2024-06-01T14:00+02:00`. Times with a UTC offset or `Z` are converted to UTC."""
+
+        if input.endswith('Z'):
+            # not supported by `fromisoformat` before Python 3.11
+            input = input[:-1] + '+00:00'
+        return Timestamp.from_datetime(datetime.fromisoformat(input))
+
+    def to_datetime(self) -> datetime:
+        return _EPOCH + timedelta(milliseconds=self.millis)
+
+    def date(self) -> Date:
+        return self.to_datetime().date()
+
+    def __str__(self):
+        return self.to_datetime().isoformat(timespec='milliseconds')
+
+    def __repr__(self):
+        return f'Timestamp({self.millis})'
+
+    def __add__(self, seconds):
+        return Timestamp(self.millis + round(seconds * 1000))
+
+    def __sub__(self, seconds):
+        return Timestamp(self.millis - round(seconds * 1000))
+
+    def __lt__(self, rhs) -> bool:
+        if isinstance(rhs, Timestamp):
+            return self.millis < rhs.millis
+        return super().__lt__(rhs)
+
+    def __le__(self, rhs) -> bool:
+        if isinstance(rhs, Timestamp):
+            return self.millis <= rhs.millis
+        return super().__le__(rhs)
+
+    def __gt__(self, rhs) -> bool:
+        if isinstance(rhs, Timestamp):
+            return self.millis > rhs.millis
+        return super().__gt__(rhs)
+
+    def __ge__(self, rhs) -> bool:
+        if isinstance(rhs, Timestamp):
+            return self.millis >= rhs.millis
+        return super().__ge__(rhs)
+
+    def __eq__(self, rhs) -> bool:
+        if isinstance(rhs, Timestamp):
+            return self.millis == rhs.millis
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.millis)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+import sys, os, random, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+import numpy as np
+
+from libpv.aggregation import AggregatingOutput, WindowAggregator, aggregate_path, parse_window
+from libpv.output import TextOutput
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+
+class TestAggregation(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read(self, name: str) -> [str]:
+        with open(os.path.join(self.dir.name, name)) as file:
+            return file.read().splitlines()[1:]
+
+    def output(self, windows: [float], name: str = 'values.txt', step: float = 5) -> AggregatingOutput:
+        path = os.path.join(self.dir.name, name)
+        aggregators = [WindowAggregator(window, aggregate_path(path, window), step) for window in windows]
+        return AggregatingOutput(TextOutput(open(path, 'x'), csv=False), aggregators)
+
+    def testWindows(self):
+        output = self.output([60])
+        # one minute with 600 W consumption and 1200 W PV, then one with no PV
+        for t in range(0, 120, 5):
+            pv = 1200 if t < 60 else 0
+            output.write(TimeOfDay(t), -600, pv, pv - 600)
+        output.close()
+
+        self.assertEqual(self.read('values.1m.csv'), [
+            '00:00:00,12,-600,-600,-600.0,1200,1200,1200.0,600,600,600.0,-10.00,20.00,10.00,0.5000',
+            '00:01:00,12,-600,-600,-600.0,0,0,0.0,-600,-600,-600.0,-10.00,0.00,-10.00,',
+        ])
+        with open(os.path.join(self.dir.name, 'values.txt')) as file:
+            self.assertEqual(len(file.readlines()), 24)
+
+    def testArraysMatchSamples(self):
+        rng = random.Random(1)
+        times = list(range(0, 7200, 5))
+        meter = [-rng.randrange(9000) for _ in times]
+        pv = [rng.randrange(3500) for _ in times]
+
+        output = self.output([900, 3600], name='samples.txt')
+        for i, t in enumerate(times):
+            output.write(TimeOfDay(t), meter[i], pv[i], meter[i] + pv[i])
+            if i % 100 == 0:
+                output.flush()
+        output.close()
+
+        output = self.output([900, 3600], name='arrays.txt')
+        for start in range(0, len(times), 333):
+            s = slice(start, start + 333)
+            (m, p) = (np.array(meter[s]), np.array(pv[s]))
+            output.write_arrays(np.array(times[s]), m, p, m + p)
+            output.flush()
+        output.close()
+
+        self.assertEqual(len(self.read('samples.15m.csv')), 8)
+        self.assertEqual(self.read('samples.15m.csv'), self.read('arrays.15m.csv'))
+        self.assertEqual(self.read('samples.1h.csv'), self.read('arrays.1h.csv'))
+
+    def testNewDay(self):
+        output = self.output([86400])
+        for _ in range(2):
+            output.write_arrays(np.array([5, 10]), np.array([-1, -1]), np.array([2, 2]), np.array([1, 1]))
+        output.close()
+
+        self.assertEqual([line[:11] for line in self.read('values.1d.csv')], ['00:00:00,2,', '00:00:00,2,'])
+
+    def testTimestamps(self):
+        output = self.output([3600])
+        output.write(Timestamp.parse('2024-06-01T23:59:55'), -1, 0, -1)
+        output.write_arrays(
+            np.array(['2024-06-02T00:00:00', '2024-06-02T00:00:05'], dtype='M8[ms]'),
+            np.array([-1, -1]), np.array([0, 0]), np.array([-1, -1]))
+        output.close()
+
+        self.assertEqual([line.split(',')[:2] for line in self.read('values.1h.csv')], [
+            ['2024-06-01T23:00:00.000', '1'],
+            ['2024-06-02T00:00:00.000', '2'],
+        ])
+
+    def testParseWindow(self):
+        self.assertEqual(parse_window('300'), 300)
+        self.assertEqual(parse_window('15m'), 900)
+        self.assertEqual(parse_window('1.5h'), 5400)
+        self.assertEqual(aggregate_path('out/pv_values.txt', 900), 'out/pv_values.15m.csv')
+        self.assertEqual(aggregate_path('pv.npy', 0.5), 'pv.0.5s.csv')
+        with self.assertRaises(ValueError):
+            parse_window('0')
+        with self.assertRaises(ValueError):
+            parse_window('m')
+        for window in ['inf', '-inf', 'nan', '1e308h']:
+            with self.assertRaises(ValueError):
+                parse_window(window)
+
+
+if __name__ == '__main__':
+    unittest.main()
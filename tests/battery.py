@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+import sys, os, io, math, random, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+import numpy as np
+
+from libpv.battery import BatteryConfigs, BatteryDispatch
+
+
+def dispatch_one(meter_values, pv_values, capacity, max_charge, max_discharge, efficiency, step) -> dict:
+    "Simulates one battery sample by sample"
+
+    hours = step / 3600
+    e = math.sqrt(efficiency)
+    (soc, imported, exported) = (0.0, 0.0, 0.0)
+    for meter, pv in zip(meter_values, pv_values):
+        net = (meter + pv) * hours
+        if net > 0:
+            stored = min(min(net, max_charge * hours) * e, capacity - soc)
+            soc += stored
+            grid = net - stored / e
+        else:
+            taken = min(min(-net, max_discharge * hours) / e, soc)
+            soc -= taken
+            grid = net + taken * e
+        imported += max(-grid, 0)
+        exported += max(grid, 0)
+    return {'import_wh': imported, 'export_wh': exported, 'final_soc': soc}
+
+
+class TestBatteryDispatch(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        # two days with PV around noon
+        self.pv = [rng.randrange(3500) if 400 <= t % 1000 < 700 else 0 for t in range(2000)]
+        self.meter = [-rng.randrange(9000) for _ in self.pv]
+        self.configs = BatteryConfigs.grid([0, 500, 2000, 10000], [1000, 5000], [0.8, 1.0])
+
+    def testMatchesSequentialDispatch(self):
+        dispatch = BatteryDispatch(self.configs, step=5, chunk_cells=1000)
+        dispatch.process(self.meter[:777], self.pv[:777])
+        dispatch.process(self.meter[777:], self.pv[777:])
+        results = dispatch.results()
+
+        configs = self.configs
+        for i in range(len(configs)):
+            expected = dispatch_one(
+                self.meter, self.pv,
+                configs.capacity[i], configs.max_charge[i], configs.max_discharge[i], configs.efficiency[i], 5)
+            for key, value in expected.items():
+                self.assertAlmostEqual(results[key][i], value, places=6)
+
+    def testChunkSizes(self):
+        expected = None
+        for chunk_cells in [1, 16, 1000, 1 << 20]:
+            dispatch = BatteryDispatch(self.configs, step=5, chunk_cells=chunk_cells)
+            dispatch.process(self.meter, self.pv)
+            results = dispatch.results()
+            if expected is None:
+                expected = results
+            for key in expected:
+                np.testing.assert_allclose(results[key], expected[key], atol=1e-6)
+
+    def testTotals(self):
+        dispatch = BatteryDispatch(self.configs, step=5)
+        dispatch.process(self.meter, self.pv)
+        results = dispatch.results()
+
+        # without a battery, everything is exchanged with the grid
+        no_battery = self.configs.capacity == 0
+        self.assertTrue(np.all(results['charged_wh'][no_battery] == 0))
+        self.assertTrue(np.all(results['self_consumption'][~no_battery] >= results['self_consumption'][0]))
+        self.assertTrue(np.all(results['final_soc'] <= self.configs.capacity))
+
+        # energy balance: consumption = PV - export + import - losses
+        losses = results['charged_wh'] - results['discharged_wh'] - results['final_soc']
+        np.testing.assert_allclose(
+            dispatch.pv - results['export_wh'] + results['import_wh'] - losses, dispatch.consumption, rtol=1e-9)
+
+    def testWriteCsv(self):
+        dispatch = BatteryDispatch(BatteryConfigs([1000], [500], [500], 1.0), step=3600)
+        dispatch.process([-200, 0, 0], [1000, 0, 0])
+        dispatch.process([-300], [0])
+
+        file = io.StringIO()
+        dispatch.write_csv(file)
+        self.assertEqual(file.getvalue().splitlines()[1], '1000,500,500,1,0.00,300.00,500.00,300.00,0.7000,1.0000,0.30,200.00')
+
+    def testInvalid(self):
+        with self.assertRaises(ValueError):
+            BatteryConfigs([-1], [1000], [1000])
+        with self.assertRaises(ValueError):
+            BatteryConfigs([1000], [1000], [1000], efficiency=0)
+        with self.assertRaises(ValueError):
+            BatteryConfigs.grid([], [1000])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+import sys, os, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from libpv.benchmarks import BENCHMARKS, run_benchmarks, find_regressions, InMemoryQueue
+
+
+class TestBenchmarks(unittest.TestCase):
+    def testAllBenchmarksRun(self):
+        results = run_benchmarks(list(BENCHMARKS), samples=500, repeat=1)
+        self.assertEqual(set(results['results']), set(BENCHMARKS))
+        for result in results['results'].values():
+            self.assertGreater(result['samples'], 0)
+            self.assertGreater(result['samples_per_sec'], 0)
+
+    def testRegressions(self):
+        baseline = {'results': {'a': {'samples_per_sec': 100}, 'b': {'samples_per_sec': 100}}}
+        current = {'results': {'a': {'samples_per_sec': 95}, 'b': {'samples_per_sec': 80},
+                               'c': {'samples_per_sec': 1}}}
+        self.assertEqual(find_regressions(baseline, current, 0.1), [('b', 0.8)])
+
+    def testInMemoryQueue(self):
+        queue = InMemoryQueue()
+        queue.basic_publish(exchange='', routing_key='meter', body=b'1')
+        queue.basic_publish(exchange='', routing_key='meter', body=b'2')
+        received = []
+        queue.consume(received.append)
+        self.assertEqual(received, [b'1', b'2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+import sys, os, io, random, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from itertools import islice
+import json
+
+from libpv.checkpoint import Checkpoint, Checkpointer, CheckpointableIterator, saved_time
+from libpv.output import TextOutput, create_output
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation
+from libpv.time_of_day import TimeOfDay
+
+
+class TestCheckpointableIterator(unittest.TestCase):
+    def testSameValues(self):
+        expected = list(islice(weather(0.4, random.Random(1)), 100))
+        values = CheckpointableIterator(weather(0.4, random.Random(1)), block_size=16)
+        self.assertEqual(list(islice(values, 100)), expected)
+
+    def testResume(self):
+        expected = list(islice(weather(0.4, random.Random(1)), 100))
+
+        for position in [0, 16, 37]:
+            values = CheckpointableIterator(weather(0.4, random.Random(1)), block_size=16)
+            list(islice(values, position))
+            state = json.loads(json.dumps(values.getstate()))
+
+            resumed = CheckpointableIterator(weather(0.4, random.Random(2)), block_size=16)
+            resumed.setstate(state)
+            self.assertEqual(list(islice(iter(resumed), 100 - position)), expected[position:])
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'values.txt.checkpoint')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def testSaveAndLoad(self):
+        checkpoint = Checkpoint(self.path)
+        self.assertIsNone(checkpoint.load())
+
+        checkpoint.save({'seed': 1})
+        checkpoint.save({'seed': 2})
+        self.assertEqual(checkpoint.load(), {'seed': 2})
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def testResumeSimulation(self):
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        samples = [(TimeOfDay.from_hms(12, m), -1000 - m) for m in range(10)]
+
+        def simulation(output, seed: int):
+            values = CheckpointableIterator(weather(0.4, random.Random(seed)), block_size=4)
+            return Simulation(pv_gen, iter(values), output), values
+
+        expected = io.StringIO()
+        (sim, _) = simulation(TextOutput(expected, csv=True), 1)
+        sim.process(samples)
+        sim.output.flush()
+
+        output_path = os.path.join(self.dir.name, 'values.csv')
+        (sim, values) = simulation(create_output(output_path, resumable=True), 1)
+        checkpointer = Checkpointer(Checkpoint(self.path), sim, values, seed=1)
+        sim.process(samples[:5])
+        sim.output.flush()
+        checkpointer.commit(checkpointer.snapshot())
+        sim.process(samples[5:7])
+        sim.output.close()
+
+        # the redelivered messages contain samples that were already written
+        state = Checkpoint(self.path).load()
+        (sim, values) = simulation(create_output(output_path, resume_position=state['output_position']), 2)
+        values.setstate(state['weather'])
+        sim.weather_gen = iter(values)
+        sim.resume_after(saved_time(state, 'last'), saved_time(state, 'batch_start'))
+        sim.process(samples[3:6])
+        sim.process(samples[6:])
+        sim.output.close()
+
+        with open(output_path) as file:
+            self.assertEqual(file.read(), expected.getvalue())
+
+    def testRollback(self):
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        samples = [(TimeOfDay.from_hms(12, m), -1000 - m) for m in range(10)]
+
+        expected = io.StringIO()
+        sim = Simulation(pv_gen, weather(0.4, random.Random(1)), TextOutput(expected, csv=True))
+        sim.process(samples)
+        sim.output.flush()
+
+        output_path = os.path.join(self.dir.name, 'values.csv')
+        values = CheckpointableIterator(weather(0.4, random.Random(1)), block_size=4)
+        sim = Simulation(pv_gen, iter(values), create_output(output_path, resumable=True))
+        checkpointer = Checkpointer(Checkpoint(self.path), sim, values, seed=1)
+        sim.process(samples[:3])
+        sim.process(samples[3:5])
+        sim.output.flush()
+        checkpointer.commit(checkpointer.snapshot())
+        sim.process(samples[5:7])
+
+        # the connection is lost, and the messages after the checkpoint are redelivered in the same process
+        checkpointer.rollback()
+        sim.process(samples[5:7])
+        sim.process(samples[7:])
+        sim.output.close()
+
+        with open(output_path) as file:
+            self.assertEqual(file.read(), expected.getvalue())
+
+    def resumed_times(self, messages: [[int]], last: int, batch_start: int = None) -> [int]:
+        "Resumes a simulation, passes it messages with the given seconds and returns the seconds that were written"
+
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        file = io.StringIO()
+        sim = Simulation(pv_gen, weather(0.4, random.Random(1)), TextOutput(file, csv=True))
+        sim.resume_after(TimeOfDay(last), TimeOfDay(batch_start) if batch_start is not None else None)
+        for message in messages:
+            sim.process([(TimeOfDay(seconds), -1000) for seconds in message])
+        sim.output.flush()
+        return [TimeOfDay.parse_hms(line.split(',')[0]).seconds() for line in file.getvalue().splitlines()]
+
+    def testResumeBeforeMidnight(self):
+        day = list(range(5, 86400, 5))
+        last = TimeOfDay.from_hms(23, 59, 55).seconds()
+
+        # the batch from 23:59:00 wasn't redelivered, and the next day starts
+        self.assertEqual(self.resumed_times([day[:100], day[100:]], last, last - 55), day)
+        self.assertEqual(self.resumed_times([day], last, last - 55), day)
+
+        # the redelivered batch is skipped, until the time goes back to the next day
+        batch = list(range(last - 55, last + 1, 5))
+        self.assertEqual(self.resumed_times([batch[:6], batch[6:], day], last, last - 55), day)
+        self.assertEqual(self.resumed_times([batch[:6], day], last, last - 55), day)
+
+        # without the start of the batch, only the last sample is skipped
+        self.assertEqual(self.resumed_times([day], last), day)
+        self.assertEqual(self.resumed_times([batch[-1:], day[:3]], last), day[:3])
+
+    def testSavedTimes(self):
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        values = CheckpointableIterator(weather(0.4, random.Random(1)))
+        sim = Simulation(pv_gen, iter(values), TextOutput(io.StringIO(), csv=True))
+        checkpointer = Checkpointer(Checkpoint(self.path), sim, values)
+
+        sim.process([(TimeOfDay(10), 0), (TimeOfDay(20), 0)])
+        sim.process([(TimeOfDay(30), 0)])
+        state = json.loads(json.dumps(checkpointer.snapshot()))
+        self.assertEqual(saved_time(state, 'batch_start'), TimeOfDay(10))
+        self.assertEqual(saved_time(state, 'last'), TimeOfDay(30))
+
+        # the next batch starts with the next message
+        sim.process([(TimeOfDay(40), 0)])
+        self.assertEqual(saved_time(checkpointer.snapshot(), 'batch_start'), TimeOfDay(40))
+        self.assertIsNone(saved_time(checkpointer.snapshot(), 'batch_start'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+import sys, os, io, asyncio, random, threading, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from pika.spec import Basic
+
+from libpv.consumer import AsyncConsumer
+from libpv.messages import encode_meter_message
+from libpv.output import TextOutput
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation
+from libpv.time_of_day import TimeOfDay
+
+
+class FakeChannel:
+    "Records the acknowledgements together with the output that was written when they were sent"
+
+    def __init__(self, file: io.StringIO):
+        self.file = file
+        self.is_open = True
+        self.acks = []
+
+    def basic_ack(self, delivery_tag: int, multiple: bool):
+        self.acks.append((delivery_tag, multiple, self.file.getvalue().count('\n')))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class BlockingOutput(TextOutput):
+    "A text output whose writes wait until `release` is set, or fail if `error` is set"
+
+    def __init__(self, file):
+        super().__init__(file, csv=True)
+        self.release = threading.Event()
+        self.error = None
+
+    def write_batch(self, lines):
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        super().write_batch(lines)
+
+
+class TestAsyncConsumer(unittest.TestCase):
+    def setUp(self):
+        self.file = io.StringIO()
+        self.output = BlockingOutput(self.file)
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        simulation = Simulation(pv_gen, weather(0.4, random.Random(1)), self.output)
+
+        self.consumer = AsyncConsumer(simulation, 'meter', prefetch_count=4, flush_interval=0.05)
+        self.consumer.loop = asyncio.new_event_loop()
+        self.consumer.connection = FakeConnection()
+        self.consumer.channel = FakeChannel(self.file)
+
+    def tearDown(self):
+        self.output.release.set()
+        self.consumer.writer.shutdown(wait=True)
+        self.consumer.loop.close()
+
+    def deliver(self, tag: int):
+        method = Basic.Deliver(delivery_tag=tag)
+        self.consumer.on_message(self.consumer.channel, method, None, encode_meter_message([(tag * 10, -tag)]))
+
+    def wait(self, seconds: float):
+        self.consumer.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def testAckAfterWrite(self):
+        # the prefetch window is 4, so the messages are flushed after 2
+        self.deliver(1)
+        self.deliver(2)
+        self.assertEqual(self.output.pending(), 0)
+        self.assertEqual(self.consumer.unacked, 0)
+
+        # the batch isn't acknowledged while it is being written
+        self.wait(0.05)
+        self.assertEqual(self.consumer.channel.acks, [])
+        self.assertEqual(self.file.getvalue(), '')
+
+        self.output.release.set()
+        self.wait(0.1)
+        self.assertEqual(self.consumer.channel.acks, [(2, True, 2)])
+
+    def testFlushTimer(self):
+        self.output.release.set()
+        self.deliver(1)
+        self.assertIsNotNone(self.consumer.flush_timer)
+        self.assertEqual(self.consumer.channel.acks, [])
+
+        self.wait(0.2)
+        self.assertIsNone(self.consumer.flush_timer)
+        self.assertEqual(self.consumer.channel.acks, [(1, True, 1)])
+
+        # the timer is cancelled when the batch is full
+        self.deliver(2)
+        self.deliver(3)
+        self.assertIsNone(self.consumer.flush_timer)
+        self.wait(0.1)
+        self.assertEqual(self.consumer.channel.acks, [(1, True, 1), (3, True, 3)])
+
+    def testFailedWriteIsNotAcknowledged(self):
+        self.output.error = OSError('disk full')
+        self.output.release.set()
+        self.deliver(1)
+        self.deliver(2)
+        self.wait(0.1)
+
+        self.assertEqual(self.consumer.channel.acks, [])
+        self.assertIsInstance(self.consumer.error, OSError)
+        self.assertFalse(self.consumer.connection.is_open)
+
+    def testNothingToFlush(self):
+        self.assertIsNone(self.consumer.flush())
+
+
+if __name__ == '__main__':
+    unittest.main()
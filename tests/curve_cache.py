@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+import sys, os, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from libpv.curve_cache import CurveCache
+from libpv.pv_generation import PvGenerator
+from libpv.time_of_day import TimeOfDay
+
+
+class TestCurveCache(unittest.TestCase):
+    def setUp(self):
+        self.pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+
+    def testValues(self):
+        curve = CurveCache().get_for(self.pv_gen)
+        self.assertEqual(list(curve[::97]), [self.pv_gen.get_value(TimeOfDay(t)) for t in range(0, 86400, 97)])
+        self.assertFalse(curve.flags.writeable)
+
+    def testEviction(self):
+        cache = CurveCache(max_curves=2)
+        a = cache.get(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 1000)
+        cache.get(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 2000)
+        self.assertIs(cache.get(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 1000), a)
+
+        cache.get(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3000)
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 1000), a)
+        self.assertNotIn((28800, 72000, 2000), cache.curves)
+
+    def testSharedMemory(self):
+        namespace = f'pvcurvetest{os.getpid()}'
+        with CurveCache(shared=True, namespace=namespace) as owner:
+            curve = owner.get_for(self.pv_gen)
+
+            with CurveCache(shared=True, owner=False, namespace=namespace) as other:
+                shared = other.get_for(self.pv_gen)
+                self.assertIsNotNone(other.curves[(28800, 72000, 3500)][1])
+                self.assertEqual(list(shared), list(curve))
+                del shared
+
+            del curve
+
+        with CurveCache(shared=True, owner=False, namespace=namespace) as other:
+            curve = other.get_for(self.pv_gen)
+            self.assertIsNone(other.curves[(28800, 72000, 3500)][1])
+            self.assertEqual(list(curve), list(self.pv_gen.profile(1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
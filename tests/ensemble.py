@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import sys, os, io, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+from libpv.ensemble import EnsemblePrng, EnsembleWeather, ensemble_daily_energy, percentile_bands, write_bands, \
+    GROUP_SIZE
+from libpv.meter import day_timestamps
+from libpv.pv_generation import PvGenerator
+from libpv.time_of_day import TimeOfDay
+
+
+class TestEnsemble(unittest.TestCase):
+    def testPrng(self):
+        rng = EnsemblePrng(0, 10_000, 10, 100, seed=5, first_group=0, groups=2)
+        values = rng.values(0, 5000)
+
+        self.assertEqual(values.shape, (2 * GROUP_SIZE, 5000))
+        self.assertGreaterEqual(values.min(), 0)
+        self.assertLessEqual(values.max(), 10_000)
+        self.assertLessEqual(np.abs(np.diff(values, axis=1)).max(), 10)
+        # the members differ from each other
+        self.assertEqual(len(np.unique(values[:, 3000])), 2 * GROUP_SIZE)
+
+        # seekable, and the same for a different set of groups
+        second = EnsemblePrng(0, 10_000, 10, 100, seed=5, first_group=1, groups=1)
+        self.assertTrue(np.array_equal(second.values(1500, 4000), values[GROUP_SIZE:, 1500:4000]))
+
+    def testWeather(self):
+        weather = EnsembleWeather(0.5, seed=1, first_group=0, groups=1).values(0, 3000)
+        self.assertGreaterEqual(weather.min(), 0.5)
+        self.assertLessEqual(weather.max(), 1)
+
+    def testDailyEnergy(self):
+        curve = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500).get_values(day_timestamps(60))
+        energy = ensemble_daily_energy(curve, 0.4, 7, members=40, days=3, step=60, workers=1)
+        self.assertEqual(energy.shape, (40, 3))
+
+        # the energy of every day is the PV power times the weather factors, integrated over the day
+        factors = EnsembleWeather(0.4, 7, 0, 2).values(0, 3 * len(curve))[:40].reshape(40, 3, len(curve))
+        self.assertTrue(np.allclose(energy, (factors * curve).sum(axis=2) / 60))
+
+        clear_sky = curve.sum() / 60
+        self.assertTrue(np.all(energy <= clear_sky))
+        self.assertTrue(np.all(energy >= clear_sky * 0.6))
+
+        # a member doesn't depend on the number of members or workers
+        other = ensemble_daily_energy(curve, 0.4, 7, members=70, days=3, step=60, workers=2)
+        self.assertTrue(np.array_equal(other[:40], energy))
+        self.assertFalse(np.array_equal(ensemble_daily_energy(curve, 0.4, 8, 40, 3, 60, workers=1), energy))
+
+        with self.assertRaises(ValueError):
+            ensemble_daily_energy(curve, 0.4, 7, members=0)
+
+    def testDefaultWorkers(self):
+        curve = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500).get_values(day_timestamps(600))
+        expected = ensemble_daily_energy(curve, 0.4, 7, members=40, step=600, workers=1)
+
+        # one worker per CPU, and no process pool for a single CPU
+        with mock.patch('os.cpu_count', return_value=3), \
+                mock.patch('libpv.ensemble.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as executor:
+            self.assertTrue(np.array_equal(ensemble_daily_energy(curve, 0.4, 7, members=40, step=600), expected))
+        executor.assert_called_once_with(max_workers=3)
+        with mock.patch('os.cpu_count', return_value=1), mock.patch('libpv.ensemble.ProcessPoolExecutor') as executor:
+            self.assertTrue(np.array_equal(ensemble_daily_energy(curve, 0.4, 7, members=40, step=600), expected))
+        executor.assert_not_called()
+
+    def testBands(self):
+        energy = np.arange(1, 101, dtype=float)[:, np.newaxis] * [1, 2]
+        bands = percentile_bands(energy)
+
+        self.assertEqual(bands['percentiles'], [10, 50, 90])
+        self.assertTrue(np.allclose(bands['daily'], [[10.9, 21.8], [50.5, 101], [90.1, 180.2]]))
+        self.assertTrue(np.allclose(bands['total'], [32.7, 151.5, 270.3]))
+
+        file = io.StringIO()
+        write_bands(file, bands)
+        self.assertEqual(file.getvalue().splitlines(), [
+            'day,p10,p50,p90',
+            '0,10.9,50.5,90.1',
+            '1,21.8,101.0,180.2',
+            'total,32.7,151.5,270.3',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import sys, os, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from libpv.messages import encode_meter_message, parse_meter_message, parse_site_message, BINARY_FORMAT
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+
+class TestMeterMessages(unittest.TestCase):
+    def testSingleSample(self):
+        self.assertEqual(encode_meter_message([(5, -300)]), b'5:-300')
+        self.assertEqual(parse_meter_message(b'5:-300'), [(TimeOfDay(5), -300)])
+
+    def testBatch(self):
+        samples = [(5, -300), (10, -310), (15, 0)]
+        self.assertEqual(encode_meter_message(samples), b'5:-300\n10:-310\n15:0')
+        self.assertEqual(
+            parse_meter_message(encode_meter_message(samples)),
+            [(TimeOfDay(t), v) for t, v in samples])
+
+    def testBinary(self):
+        samples = [(5, -300), (10, -310), (86395, 0)]
+        msg = encode_meter_message(samples, BINARY_FORMAT)
+        self.assertEqual(len(msg), 1 + 8 * 3)
+        self.assertEqual(msg[:9], b'\x01\x05\x00\x00\x00\xd4\xfe\xff\xff')
+        self.assertEqual(parse_meter_message(msg), [(TimeOfDay(t), v) for t, v in samples])
+
+    def testSiteId(self):
+        samples = [(5, -300), (10, -310)]
+        expected = [(TimeOfDay(t), v) for t, v in samples]
+
+        self.assertEqual(encode_meter_message(samples, site='home-1'), b'@home-1\n5:-300\n10:-310')
+        for format in ['text', BINARY_FORMAT]:
+            msg = encode_meter_message(samples, format, site='tenant.home-1')
+            self.assertEqual(parse_site_message(msg), ('tenant.home-1', expected))
+            self.assertEqual(parse_meter_message(msg), expected)
+
+        self.assertEqual(parse_site_message(encode_meter_message(samples)), (None, expected))
+
+        for site in ['', 'a/b', '..', 'a.', 'x' * 65]:
+            with self.assertRaises(ValueError):
+                encode_meter_message(samples, site=site)
+
+    def testMilliseconds(self):
+        samples = [(0.1, -300), (5, -310), (86399.999, 0)]
+        self.assertEqual(encode_meter_message(samples), b'0.100:-300\n5:-310\n86399.999:0')
+
+        for format in ['text', BINARY_FORMAT]:
+            msg = encode_meter_message(samples, format)
+            self.assertEqual(parse_meter_message(msg), [(TimeOfDay(t), v) for t, v in samples])
+
+    def testTimestamps(self):
+        samples = [(Timestamp(1717243200100), -300), (Timestamp(1717329600000), -310)]
+        self.assertEqual(
+            encode_meter_message(samples, site='home'),
+            b'@home\n#epoch\n1717243200100:-300\n1717329600000:-310')
+
+        for format in ['text', BINARY_FORMAT]:
+            msg = encode_meter_message(samples, format, site='home')
+            (site, parsed) = parse_site_message(msg)
+            self.assertEqual(site, 'home')
+            self.assertEqual(parsed, samples)
+            self.assertIsInstance(parsed[0][0], Timestamp)
+
+        with self.assertRaises(ValueError):
+            encode_meter_message([(Timestamp(0), -300), (5, -300)])
+
+    def testUnknownFormat(self):
+        with self.assertRaises(ValueError):
+            parse_meter_message(b'\x7f')
+        with self.assertRaises(ValueError):
+            encode_meter_message([(5, -300)], 'xml')
+
+    def testTruncatedBinary(self):
+        # messages and the length of their header
+        messages = [
+            (encode_meter_message([(5, -300)], BINARY_FORMAT), 1),
+            (encode_meter_message([(5, -300)], BINARY_FORMAT, site='site.1'), 8),
+            (encode_meter_message([(5.5, -300)], BINARY_FORMAT, site='site.1'), 9),
+        ]
+        for message, header in messages:
+            # a message with only a header and no records is valid
+            self.assertEqual(parse_meter_message(message[:header]), [])
+            for length in range(1, len(message)):
+                if length != header:
+                    with self.assertRaises(ValueError):
+                        parse_site_message(message[:length])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+import sys, os, io, random, tempfile, time, unittest, urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from libpv.messages import encode_meter_message
+from libpv.metrics import Histogram, Metrics, ProfilerToggle, serve_metrics
+from libpv.output import TextOutput
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.file = io.StringIO()
+        self.output = TextOutput(self.file, csv=False)
+        self.simulation = Simulation(
+            PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500),
+            weather(0.4, random.Random(0)),
+            self.output)
+        self.metrics = Metrics(self.output)
+
+    def testHistogram(self):
+        h = Histogram([1, 2])
+        for value in [0.5, 1, 1.5, 3]:
+            h.observe(value)
+        self.assertEqual(h.counts, [2, 1, 1])
+        self.assertEqual(h.mean(), 1.5)
+        self.assertIn('x_bucket{le="2"} 3', h.prometheus_lines('x'))
+        self.assertIn('x_bucket{le="+Inf"} 4', h.prometheus_lines('x'))
+
+    def testProcess(self):
+        self.metrics.process(self.simulation, encode_meter_message([(5, -100), (10, -100)]))
+        self.metrics.process(self.simulation, encode_meter_message([(15, -100)]))
+        self.assertEqual(self.metrics.messages, 2)
+        self.assertEqual(self.metrics.samples, 3)
+        self.assertEqual(self.metrics.parse_latency.count, 2)
+        self.assertEqual(self.metrics.queue_lag.count, 2)
+        self.assertEqual(self.output.pending(), 3)
+
+        self.metrics.flush()
+        self.assertEqual(self.output.pending(), 0)
+        self.assertEqual(self.metrics.write_latency.count, 1)
+        self.assertEqual(len(self.file.getvalue().splitlines()), 3)
+        self.assertIn('buffer 0', self.metrics.stats_line())
+
+    def testQueueLag(self):
+        now = int(time.time() * 1000)
+        self.metrics.process(self.simulation, encode_meter_message([(Timestamp(now - 2000), -100)]))
+        self.assertTrue(2 <= self.metrics.queue_lag.mean() < 60)
+
+        # samples from the future have no lag
+        metrics = Metrics(self.output)
+        metrics.process(self.simulation, encode_meter_message([(Timestamp(now + 60_000), -100)]))
+        future = TimeOfDay.from_hms(*time.localtime(now / 1000 + 60)[3:6])
+        metrics.process(self.simulation, encode_meter_message([(future.seconds(), -100)]))
+        self.assertEqual(metrics.queue_lag.counts[0], 2)
+        self.assertEqual(metrics.queue_lag.mean(), 0)
+
+    def testEndpoint(self):
+        self.metrics.process(self.simulation, encode_meter_message([(5, -100)]))
+        server = serve_metrics(self.metrics, 0)
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            with urllib.request.urlopen(url) as response:
+                text = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertIn('simulator_messages_total 1\n', text)
+        self.assertIn('simulator_output_buffer_samples 1\n', text)
+        self.assertIn('simulator_parse_seconds_count 1\n', text)
+
+    def testProfilerToggle(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as dir:
+            os.chdir(dir)
+            try:
+                profiler = ProfilerToggle(quiet=True)
+                profiler.toggle()
+                sum(range(1000))
+                profiler.toggle()
+                self.assertEqual(os.listdir(dir), [f'simulator-{os.getpid()}-1.prof'])
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+import sys, os, io, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from contextlib import closing
+import numpy as np
+
+from libpv.output import ColumnarOutput, TextOutput, create_output, read_output, HAS_PYARROW
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+
+class TestColumnarOutput(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def writeValues(self, output):
+        output.write(TimeOfDay(5), -100, 0, -100)
+        output.write(TimeOfDay(10), -110, 20, -90)
+        output.write_arrays(
+            np.array([15, 20]), np.array([-120, -130]), np.array([30, 40]), np.array([-90, -90]))
+        output.flush()
+        output.write(TimeOfDay(25), -140, 50, -90)
+        self.assertEqual(output.pending(), 1)
+        output.close()
+
+    def testNpy(self):
+        path = os.path.join(self.dir.name, 'values.npy')
+        self.writeValues(create_output(path))
+
+        values = np.load(path, mmap_mode='r')
+        self.assertEqual(list(values['time']), [5, 10, 15, 20, 25])
+        self.assertEqual(list(values['meter']), [-100, -110, -120, -130, -140])
+        self.assertEqual(list(values['pv']), [0, 20, 30, 40, 50])
+        self.assertEqual(list(values['sum']), [-100, -90, -90, -90, -90])
+
+    @unittest.skipIf(not HAS_PYARROW, 'pyarrow is not installed')
+    def testParquet(self):
+        import pyarrow.parquet
+
+        path = os.path.join(self.dir.name, 'values.parquet')
+        self.writeValues(create_output(path))
+
+        file = pyarrow.parquet.ParquetFile(path)
+        self.assertEqual(file.num_row_groups, 2)
+        table = file.read()
+        self.assertEqual(table.column('pv').to_pylist(), [0, 20, 30, 40, 50])
+        self.assertEqual(str(table.column('time')[2]), '00:00:15')
+
+    def testTimeUnits(self):
+        for time_unit in ['ms', 'datetime']:
+            path = os.path.join(self.dir.name, f'values-{time_unit}.npy')
+            output = create_output(path, time_unit=time_unit)
+            output.write(Timestamp.parse('2024-06-01T00:00:05.250'), -100, 0, -100)
+            output.write_arrays(
+                np.array(['2024-06-02T00:00:10'], dtype='M8[ms]'), np.array([-110]), np.array([20]), np.array([-90]))
+            output.close()
+
+            times = np.load(path)['time']
+            if time_unit == 'ms':
+                self.assertEqual(list(times), [5250, 10000])
+            else:
+                self.assertEqual(str(times[0]), '2024-06-01T00:00:05.250')
+                self.assertEqual(str(times[1]), '2024-06-02T00:00:10.000')
+
+        with closing(create_output(os.path.join(self.dir.name, 'seconds.npy'))) as output:
+            with self.assertRaises(ValueError):
+                output.write_arrays(np.array([0.5]), np.array([-110]), np.array([20]), np.array([-90]))
+
+    def testTextTimes(self):
+        file = io.StringIO()
+        output = TextOutput(file, csv=True)
+        output.write(TimeOfDay(0.25), -100, 0, -100)
+        output.write_arrays(np.array([1.5, 86399.999]), np.array([-1, -2]), np.array([0, 0]), np.array([-1, -2]))
+        output.write_arrays(np.array(['2024-06-01T12:00'], dtype='M8[ms]'), np.array([-3]), np.array([0]), np.array([-3]))
+        output.flush()
+        self.assertEqual(file.getvalue(), (
+            '00:00:00.250,-100,0,-100\n00:00:01.500,-1,0,-1\n23:59:59.999,-2,0,-2\n'
+            '2024-06-01T12:00:00.000,-3,0,-3\n'))
+
+    def testTextOutput(self):
+        output = create_output(os.path.join(self.dir.name, 'values.csv'))
+        self.assertIsInstance(output, TextOutput)
+        self.assertTrue(output.csv)
+        output.close()
+
+        with self.assertRaises(FileExistsError):
+            create_output(os.path.join(self.dir.name, 'values.csv'))
+
+    def testResume(self):
+        for name in ['values.txt', 'values.npy']:
+            path = os.path.join(self.dir.name, name)
+            output = create_output(path, resumable=True)
+            output.write(TimeOfDay(5), -100, 0, -100)
+            output.flush()
+            position = output.sync()
+            output.write(TimeOfDay(10), -110, 20, -90)
+            output.close()
+
+            output = create_output(path, resume_position=position)
+            output.write(TimeOfDay(15), -120, 30, -90)
+            output.close()
+
+            if name.endswith('.npy'):
+                self.assertEqual(list(np.load(path)['time']), [5, 15])
+            else:
+                with open(path) as file:
+                    self.assertEqual(file.read(), '[00:00:05] M:-100 P:0 S:-100\n[00:00:15] M:-120 P:30 S:-90\n')
+
+        with self.assertRaises(ValueError):
+            create_output(os.path.join(self.dir.name, 'values.arrow'), resumable=True)
+
+    def testReadOutput(self):
+        names = ['values.txt', 'values.csv', 'values.npy'] + (['values.parquet'] if HAS_PYARROW else [])
+        for name in names:
+            path = os.path.join(self.dir.name, name)
+            self.writeValues(create_output(path))
+
+            chunks = list(read_output(path, chunk_size=2))
+            (meter_values, pv_values, sums) = (np.concatenate(column) for column in zip(*chunks))
+            self.assertEqual(meter_values.tolist(), [-100, -110, -120, -130, -140])
+            self.assertEqual(pv_values.tolist(), [0, 20, 30, 40, 50])
+            self.assertEqual(sums.tolist(), [-100, -90, -90, -90, -90])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+import sys, os, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from libpv.pacing import Pacer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def pacer(**kwargs) -> (Pacer, FakeClock):
+    clock = FakeClock()
+    return Pacer(clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+class TestPacer(unittest.TestCase):
+    def testSpeed(self):
+        (p, clock) = pacer(speed=10)
+        for t in [3600, 3601, 3602, 3612]:
+            p.wait(t)
+        self.assertEqual(clock.now, 101.2)
+        self.assertEqual(len(clock.sleeps), 3)
+
+    def testNoDrift(self):
+        (p, clock) = pacer(speed=1)
+        p.wait(0)
+        for t in range(1, 11):
+            # the work between two messages doesn't delay the schedule
+            clock.now += 0.3
+            p.wait(t)
+        self.assertAlmostEqual(clock.now, 110.0)
+
+    def testLateMessagesAreSentImmediately(self):
+        (p, clock) = pacer(speed=1)
+        p.wait(0)
+        clock.now += 5
+        for t in range(1, 5):
+            p.wait(t)
+        self.assertEqual(clock.sleeps, [])
+        self.assertEqual(p.max_lag, 4)
+
+    def testRate(self):
+        (p, clock) = pacer(rate=100)
+        for _ in range(101):
+            p.wait()
+        self.assertAlmostEqual(clock.now, 101.0)
+        self.assertAlmostEqual(p.achieved_rate(), 101)
+
+    def testBurst(self):
+        (p, clock) = pacer(rate=100, burst=10)
+        for _ in range(10):
+            p.wait()
+        self.assertEqual(clock.sleeps, [])
+
+        # after the bucket is empty, messages are sent at the target rate
+        for _ in range(100):
+            p.wait()
+        self.assertAlmostEqual(clock.now, 101.0)
+
+    def testBurstAfterPause(self):
+        (p, clock) = pacer(rate=100, burst=10)
+        p.wait()
+        clock.now += 1
+        for _ in range(10):
+            p.wait()
+        self.assertEqual(clock.sleeps, [])
+        p.wait()
+        self.assertEqual(len(clock.sleeps), 1)
+
+    def testShortSleepsAreSkipped(self):
+        (p, clock) = pacer(rate=10000, burst=1, min_sleep=0.001)
+        for _ in range(100):
+            p.wait()
+        # with 0.1 ms per message, messages are sent in bursts of about 10
+        self.assertTrue(all(s >= 0.001 for s in clock.sleeps))
+        self.assertLess(len(clock.sleeps), 10)
+        # messages may be sent less than `min_sleep` before their deadline
+        self.assertGreater(clock.now - 100, 0.0099 - 0.001)
+        self.assertLessEqual(clock.now - 100, 0.0099 + 1e-9)
+
+    def testInvalid(self):
+        with self.assertRaises(ValueError):
+            Pacer(speed=0)
+        with self.assertRaises(ValueError):
+            Pacer(rate=-1)
+        with self.assertRaises(ValueError):
+            Pacer(rate=1, burst=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
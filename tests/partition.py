@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+import sys, os, random, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+import numpy as np
+
+from libpv.output import create_output
+from libpv.partition import partition_of, partition_seed, merge_outputs
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation, simulate_offline
+from libpv.time_of_day import TimeOfDay
+
+
+class TestPartition(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def testPartitionOf(self):
+        self.assertEqual(partition_of(0, 3), 0)
+        self.assertEqual(partition_of(28799, 3), 0)
+        self.assertEqual(partition_of(28800, 3), 1)
+        self.assertEqual(partition_of(86399, 3), 2)
+        self.assertEqual(list(partition_of(np.array([5, 43200]), 2)), [0, 1])
+        self.assertNotEqual(partition_seed(1, 0), partition_seed(1, 1))
+
+    def simulatePartitions(self, extension: str, partitions: int, days: int = 1) -> [str]:
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        paths = []
+
+        for k in range(partitions):
+            path = os.path.join(self.dir.name, f'{partitions}-{k}-{days}{extension}')
+            simulation = Simulation(pv_gen, weather(0.4, random.Random(partition_seed(1, k))), create_output(path))
+            simulate_offline(simulation, 9000, 2, days, partition=(k, partitions))
+            simulation.output.close()
+            paths.append(path)
+
+        return paths
+
+    def testMergeText(self):
+        paths = self.simulatePartitions('.csv', 3)
+        merged = os.path.join(self.dir.name, 'merged.csv')
+        merge_outputs(list(reversed(paths)), merged)
+
+        with open(merged) as file:
+            times = [line.split(',')[0] for line in file]
+        self.assertEqual(len(times), 17279)
+        self.assertEqual(times, sorted(times))
+
+    def testMergeNpy(self):
+        merged = os.path.join(self.dir.name, 'merged.npy')
+        merge_outputs(self.simulatePartitions('.npy', 4), merged)
+
+        single = os.path.join(self.dir.name, 'single.npy')
+        merge_outputs(self.simulatePartitions('.npy', 1), single)
+
+        (merged, single) = (np.load(merged), np.load(single))
+        self.assertEqual(list(merged['time']), list(single['time']))
+        # the meter values don't depend on the partitions, only the weather does
+        self.assertEqual(list(merged['meter']), list(single['meter']))
+
+        with self.assertRaises(ValueError):
+            merge_outputs(self.simulatePartitions('.csv', 1), os.path.join(self.dir.name, 'merged2.npy'))
+
+    def testMergeDays(self):
+        def columns(path: str) -> ([str], [str]):
+            with open(path) as file:
+                rows = [line.split(',') for line in file]
+            return [row[0] for row in rows], [row[1] for row in rows]
+
+        merged = os.path.join(self.dir.name, 'merged.csv')
+        merge_outputs(self.simulatePartitions('.csv', 2, days=2), merged)
+        [single] = self.simulatePartitions('.csv', 1, days=2)
+
+        (times, meter_values) = columns(merged)
+        self.assertEqual(len(times), 2 * 17279)
+        self.assertEqual(times[17278:17280], ['23:59:55', '00:00:05'])
+        self.assertEqual((times, meter_values), columns(single))
+
+        # .npy files are merged in chunks, which end at different times in each file
+        merged = os.path.join(self.dir.name, 'merged.npy')
+        merge_outputs(self.simulatePartitions('.npy', 3, days=2), merged, chunk_size=1000)
+        [single] = self.simulatePartitions('.npy', 1, days=2)
+
+        (merged, single) = (np.load(merged), np.load(single))
+        self.assertEqual(list(merged['time']), list(single['time']))
+        self.assertEqual(list(merged['meter']), list(single['meter']))
+
+
+if __name__ == '__main__':
+    unittest.main()
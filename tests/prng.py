@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import sys, os, random, unittest, itertools
+import sys, os, json, random, unittest, itertools
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # pylint: disable=import-error
 
@@ -34,6 +34,25 @@ class TestContinuousPrng(unittest.TestCase):
             self.assertLessEqual(abs(last - n), self.max_diff)
             last = n
 
+    def testBlocks(self):
+        expected = list(itertools.islice(continuous_prng(0, 1000, 7.5, 50, random.Random(1)), 5000))
+
+        prng = continuous_prng(0, 1000, 7.5, 50, random.Random(1))
+        values = list(prng.take(1000)) + [next(prng) for _ in range(1000)]
+        values += list(prng.fill([0] * 1000))
+        values += list(itertools.islice(itertools.chain.from_iterable(prng.blocks(300)), 2000))
+
+        self.assertEqual(values, expected)
+
+    def testCheckpoint(self):
+        self.prng.take(123)
+        state = json.loads(json.dumps(self.prng.getstate()))
+        expected = list(self.prng.take(100))
+
+        other = continuous_prng(0, 1000, self.max_diff, 50, random.Random(5))
+        other.setstate(state)
+        self.assertEqual(list(other.take(100)), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
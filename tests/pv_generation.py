@@ -1,10 +1,10 @@
 #!/usr/bin/env python
-import sys, os, random, unittest, itertools
+import sys, os, json, random, unittest, itertools
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # pylint: disable=import-error
 
 from libpv.pv_generation import PvGenerator, weather
-from libpv.time_of_day import TimeOfDay
+from libpv.time_of_day import TimeOfDay, SECS_PER_DAY
 
 
 def generate_360_times():
@@ -64,6 +64,21 @@ class TestPvGeneration(unittest.TestCase):
             self.assertLess(abs(power - last), 80)
             last = power
 
+    def testValuesMatchScalar(self):
+        for sunrise, sunset in [(8, 20), (0, 12), (5, 23)]:
+            gen = PvGenerator(TimeOfDay.from_hms(sunrise), TimeOfDay.from_hms(sunset), 3500)
+            self.assertEqual(
+                list(gen.get_values(range(-SECS_PER_DAY, 2 * SECS_PER_DAY, 7))),
+                [gen.get_value(TimeOfDay(x)) for x in range(-SECS_PER_DAY, 2 * SECS_PER_DAY, 7)])
+
+    def testProfile(self):
+        gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        profile = gen.profile(240)
+        self.assertEqual(len(profile), 360)
+        self.assertEqual(
+            [round(x) for x in profile],
+            [round(gen.get_value(x)) for x in generate_360_times()])
+
 
 class TestWeatherGeneration(unittest.TestCase):
     def testEquality(self):
@@ -89,6 +104,25 @@ class TestWeatherGeneration(unittest.TestCase):
             self.assertLessEqual(0.6, n)
             self.assertLessEqual(n, 1)
 
+    def testBlocks(self):
+        expected = list(itertools.islice(weather(0.6, random.Random(4)), 3000))
+
+        w = weather(0.6, random.Random(4))
+        values = list(w.take(1000)) + [next(w) for _ in range(1000)]
+        values += list(itertools.islice(itertools.chain.from_iterable(w.blocks(300)), 1000))
+
+        self.assertEqual(values, expected)
+
+    def testCheckpoint(self):
+        w = weather(0.6, random.Random(4))
+        w.take(1234)
+        state = json.loads(json.dumps(w.getstate()))
+        expected = list(w.take(100))
+
+        other = weather(0.6, random.Random(0))
+        other.setstate(state)
+        self.assertEqual(list(other.take(100)), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+import sys, os, random, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from datetime import datetime, timedelta
+from unittest import mock
+import numpy as np
+
+from libpv.output import TextOutput
+from libpv.pv_generation import PvGenerator, weather
+from libpv.replay import read_meter_csv, resample, replay_samples, simulate_replay
+from libpv.simulation import Simulation
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', newline='') as file:
+            file.write(content)
+        return path
+
+    def read(self, path: str, **kwargs) -> (list, list):
+        chunks = list(read_meter_csv(path, **kwargs))
+        return (
+            [int(t) for times, _ in chunks for t in times],
+            [float(v) for _, values in chunks for v in values])
+
+    def testFormats(self):
+        path = self.write('values.csv', (
+            'time,power\r\n'
+            '2024-06-01T00:00:01,100\r\n'
+            '2024-06-01 00:00:03.500,300.5\r\n'
+            '\r\n'
+            '2024-06-01T00:00:07Z,"-20"\r\n'
+            '2024-06-01T00:00:21.250Z, 0.125'))
+
+        (times, values) = self.read(path)
+        start = Timestamp.parse('2024-06-01').millis
+        self.assertEqual([t - start for t in times], [1000, 3500, 7000, 21250])
+        self.assertEqual(values, [100, 300.5, -20, 0.125])
+
+    def testEpochSecondsAndColumns(self):
+        path = self.write('values.csv', '1717200001.5,x,1.25\n1717200002,y,2\n')
+        self.assertEqual(self.read(path, value_column=2), ([1717200001500, 1717200002000], [1.25, 2]))
+
+        with self.assertRaises(ValueError):
+            self.read(path, value_column=3)
+        with self.assertRaises(ValueError):
+            self.read(path, value_column=1)
+
+    def testChunks(self):
+        rng = random.Random(1)
+        start = datetime(2024, 6, 1)
+        lines = [f'{(start + timedelta(seconds=i)).isoformat()},{rng.randrange(9000)}\n' for i in range(1000)]
+        path = self.write('values.csv', 'time,power\n' + ''.join(lines))
+
+        expected = self.read(path)
+        self.assertEqual(len(expected[0]), 1000)
+        for chunk_bytes in [1, 100, 4096]:
+            self.assertEqual(self.read(path, chunk_bytes=chunk_bytes), expected)
+
+    def testResample(self):
+        chunks = [
+            (np.array([1000, 3000]), np.array([100.0, 300.0])),
+            (np.array([4000, 7000]), np.array([500.0, 20.0])),
+            (np.array([21000]), np.array([50.0])),
+        ]
+        result = list(resample(chunks, 5))
+        times = np.concatenate([t for t, _ in result]).view(np.int64).tolist()
+        values = np.concatenate([v for _, v in result]).tolist()
+
+        self.assertEqual(times, [0, 5000, 10000, 15000, 20000])
+        # the mean of each step, and the previous value for steps without values
+        self.assertEqual(values, [300, 20, 20, 20, 50])
+
+        with self.assertRaises(ValueError):
+            list(resample([(np.array([5000, 1000]), np.array([1.0, 2.0]))], 5))
+
+    def testGaps(self):
+        chunks = [(np.array([1000, 21000, 100_000_000]), np.array([100.0, 50.0, 70.0]))]
+
+        # a gap of 3 steps is filled, a gap of more than a day is skipped
+        result = list(resample(chunks, 5, max_gap=15))
+        times = np.concatenate([t for t, _ in result]).view(np.int64).tolist()
+        values = np.concatenate([v for _, v in result]).tolist()
+        self.assertEqual(times, [0, 5000, 10000, 15000, 20000, 100_000_000])
+        self.assertEqual(values, [100, 100, 100, 100, 50, 70])
+
+        result = list(resample(chunks, 5, max_gap=10))
+        self.assertEqual(np.concatenate([t for t, _ in result]).view(np.int64).tolist(), [0, 20000, 100_000_000])
+
+        # long filled gaps are yielded in pieces
+        with mock.patch('libpv.replay.PIECE_STEPS', 4):
+            result = list(resample(chunks, 1, max_gap=20))
+        self.assertTrue(all(len(times) <= 4 for times, _ in result))
+        times = np.concatenate([t for t, _ in result]).view(np.int64).tolist()
+        self.assertEqual(times, list(range(1000, 22000, 1000)) + [100_000_000])
+
+    def testReplay(self):
+        path = self.write('values.csv', 'time,kw\n2024-06-01T12:00:00,1.5\n2024-06-01T12:00:10,2.5\n')
+        samples = list(replay_samples(path, 5, scale=1000))
+        self.assertEqual([(str(t), v) for t, v in samples], [
+            ('2024-06-01T12:00:00.000', 1500),
+            ('2024-06-01T12:00:05.000', 1500),
+            ('2024-06-01T12:00:10.000', 2500),
+        ])
+
+        output_path = os.path.join(self.dir.name, 'pv_values.txt')
+        output = TextOutput(open(output_path, 'x'), csv=True)
+        pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        simulate_replay(Simulation(pv_gen, weather(0, random.Random(1)), output), path, 5, scale=1000)
+        output.close()
+
+        with open(output_path) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('2024-06-01T12:00:00.000,-1500,'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+import sys, os, json, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from libpv.scenarios import Scenario, load_scenarios, derive_seed, run_scenarios
+from libpv.time_of_day import TimeOfDay
+
+
+class TestScenarios(unittest.TestCase):
+    def testLoading(self):
+        with tempfile.TemporaryDirectory() as dir:
+            csv_path = os.path.join(dir, 'grid.csv')
+            with open(csv_path, 'w') as file:
+                file.write('name,max_power,sunrise,days\nsmall,1000,07:30,2\nlarge,,,\n')
+
+            json_path = os.path.join(dir, 'grid.json')
+            with open(json_path, 'w') as file:
+                json.dump([{'name': 'small', 'max_power': 1000, 'sunrise': '07:30', 'days': 2}], file)
+
+            [small, large] = load_scenarios(csv_path)
+            self.assertEqual(small.max_power, 1000)
+            self.assertEqual(small.sunrise, TimeOfDay.from_hms(7, 30))
+            self.assertEqual(small.days, 2)
+            self.assertEqual(large.max_power, 3500)
+            self.assertEqual(large.days, 1)
+
+            [small] = load_scenarios(json_path)
+            self.assertEqual(small.max_power, 1000)
+
+    def testValidation(self):
+        with self.assertRaises(ValueError):
+            Scenario('a', sunrise='20:00', sunset='08:00')
+        with self.assertRaises(ValueError):
+            Scenario('a', weather_noise=2)
+        for name in ['', '../evil', 'a/b', '.hidden']:
+            with self.assertRaises(ValueError):
+                Scenario(name)
+
+    def testDerivedSeeds(self):
+        self.assertEqual(derive_seed(1, 'a', 0), derive_seed(1, 'a', 0))
+        self.assertNotEqual(derive_seed(1, 'a', 0), derive_seed(1, 'a', 1))
+        self.assertNotEqual(derive_seed(1, 'a', 0), derive_seed(2, 'a', 0))
+
+    def testDeterministicOutput(self):
+        # more site-days than are simulated ahead with one worker
+        scenarios = [Scenario('a', days=2), Scenario('b', max_power=5000), Scenario('c', days=3)]
+
+        with tempfile.TemporaryDirectory() as dir:
+            run_scenarios(scenarios, 42, os.path.join(dir, 'one'), workers=1)
+            run_scenarios(scenarios, 42, os.path.join(dir, 'two'), workers=2)
+
+            for name in ['a.txt', 'b.txt', 'c.txt']:
+                with open(os.path.join(dir, 'one', name)) as one, \
+                        open(os.path.join(dir, 'two', name)) as two:
+                    self.assertEqual(one.read(), two.read())
+
+            with open(os.path.join(dir, 'one', 'a.txt')) as file:
+                self.assertEqual(len(file.readlines()), 2 * 17279)
+
+
+if __name__ == '__main__':
+    unittest.main()
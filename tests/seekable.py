@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+import sys, os, json, unittest, itertools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+import numpy as np
+
+from libpv.seekable import SeekablePrng, SeekableWeather
+
+
+class TestSeekablePrng(unittest.TestCase):
+    def setUp(self):
+        self.max_diff = 18
+        self.prng = SeekablePrng(0, 9000, self.max_diff, 300, seed=7)
+
+    def testContinuityAndBounds(self):
+        values = self.prng.values(0, 10 * self.prng.block_size + 5)
+        self.assertLessEqual(np.abs(np.diff(values)).max(), self.max_diff)
+        self.assertGreaterEqual(values.min(), 0)
+        self.assertLessEqual(values.max(), 9000)
+
+    def testRandomAccess(self):
+        values = self.prng.values(0, 5000)
+        other = SeekablePrng(0, 9000, self.max_diff, 300, seed=7)
+
+        self.assertEqual(list(other.values(2500, 3500)), list(values[2500:3500]))
+        self.assertEqual(other.value_at(4321), values[4321])
+        self.assertNotEqual(list(SeekablePrng(0, 9000, self.max_diff, 300, seed=8).values(0, 10)), list(values[:10]))
+
+    def testIteration(self):
+        values = list(self.prng.values(0, 3000))
+        self.prng.seek(0)
+        taken = [next(self.prng) for _ in range(10)] + list(self.prng.take(990))
+        taken += list(self.prng.fill(np.zeros(1000, dtype=np.int64)))
+        taken += list(itertools.islice(itertools.chain.from_iterable(self.prng.blocks(300)), 1000))
+        self.assertEqual(taken, values)
+
+    def testCheckpoint(self):
+        self.prng.take(1234)
+        state = json.loads(json.dumps(self.prng.getstate()))
+        expected = list(self.prng.take(100))
+
+        other = SeekablePrng(0, 9000, self.max_diff, 300, seed=7)
+        other.setstate(state)
+        self.assertEqual(list(other.take(100)), expected)
+
+        with self.assertRaises(ValueError):
+            SeekablePrng(0, 9000, self.max_diff, 300, seed=8).setstate(state)
+
+    def testBlockSize(self):
+        with self.assertRaises(ValueError):
+            SeekablePrng(0, 10_000, 10, 100, seed=0, block_size=100)
+        with self.assertRaises(ValueError):
+            SeekablePrng(0, 10_000, 0.5, 100, seed=0)
+
+
+class TestSeekableWeather(unittest.TestCase):
+    def testNoiseFactor(self):
+        factors = SeekableWeather(0.4, 3).values(0, 100_000)
+        self.assertGreaterEqual(factors.min(), 0.6)
+        self.assertLessEqual(factors.max(), 1)
+
+    def testRandomAccess(self):
+        factors = SeekableWeather(0.4, 3).values(0, 10_000)
+
+        weather = SeekableWeather(0.4, 3)
+        weather.setstate({'seed': 3, 'position': 7000})
+        self.assertEqual(list(weather.take(3000)), list(factors[7000:]))
+        self.assertEqual(weather.value_at(5), factors[5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+import sys, os, io, random, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+import numpy as np
+
+from libpv.meter import meter_prng, times_of_day, timestamps, SECONDS_STEP
+from libpv.output import TextOutput
+from libpv.pv_generation import PvGenerator, weather
+from libpv.simulation import Simulation, simulate_offline
+from libpv.time_of_day import TimeOfDay
+
+from datetime import date, timedelta
+
+
+class TestSimulation(unittest.TestCase):
+    def setUp(self):
+        self.pv_gen = PvGenerator(TimeOfDay.from_hms(8), TimeOfDay.from_hms(20), 3500)
+        self.samples = [(TimeOfDay.from_hms(12, m), -1000 - m) for m in range(0, 60, 10)]
+
+    def simulate(self, csv: bool) -> str:
+        file = io.StringIO()
+        output = TextOutput(file, csv)
+        simulation = Simulation(self.pv_gen, weather(0.4, random.Random(1)), output)
+
+        simulation.process(self.samples[:3])
+        self.assertEqual(file.getvalue(), '')
+        self.assertEqual(output.pending(), 3)
+
+        simulation.process(self.samples[3:])
+        output.flush()
+        self.assertEqual(output.pending(), 0)
+        return file.getvalue()
+
+    def testTextOutput(self):
+        w = weather(0.4, random.Random(1))
+        lines = []
+        for time, meter_value in self.samples:
+            pv_value = round(self.pv_gen.get_value(time) * next(w))
+            lines.append(f'[{time}] M:{meter_value} P:{pv_value} S:{meter_value + pv_value}\n')
+
+        self.assertEqual(self.simulate(csv=False), ''.join(lines))
+
+    def testCsvOutput(self):
+        lines = self.simulate(csv=True).splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith('12:00:00,-1000,'))
+
+        for line in lines:
+            [_, meter_value, pv_value, sum] = line.split(',')
+            self.assertEqual(int(meter_value) + int(pv_value), int(sum))
+
+    def testOffline(self):
+        for csv in [False, True]:
+            offline_file = io.StringIO()
+            simulation = Simulation(self.pv_gen, weather(0.4, random.Random(1)), TextOutput(offline_file, csv))
+            simulate_offline(simulation, 9000, meter_seed=7, days=2)
+
+            file = io.StringIO()
+            output = TextOutput(file, csv)
+            simulation = Simulation(self.pv_gen, weather(0.4, random.Random(1)), output)
+            for day in range(2):
+                meter = meter_prng(9000, 7 + day)
+                simulation.process((time, -next(meter)) for time in times_of_day(SECONDS_STEP))
+            output.flush()
+
+            self.assertEqual(offline_file.getvalue(), file.getvalue())
+
+    def testOfflineTimestamps(self):
+        for step in [7.25, SECONDS_STEP]:
+            for curve in [None, self.pv_gen.profile(1)]:
+                offline_file = io.StringIO()
+                simulation = Simulation(
+                    self.pv_gen, weather(0.4, random.Random(1)), TextOutput(offline_file, True), curve)
+                simulate_offline(simulation, 9000, 7, days=2, seconds_step=step, start_date=date(2024, 6, 1))
+
+                file = io.StringIO()
+                simulation = Simulation(self.pv_gen, weather(0.4, random.Random(1)), TextOutput(file, True), curve)
+                for day in range(2):
+                    meter = meter_prng(9000, 7 + day)
+                    times = timestamps(date(2024, 6, 1) + timedelta(days=day), step)
+                    simulation.process((time, -next(meter)) for time in times)
+                simulation.output.flush()
+
+                self.assertEqual(offline_file.getvalue(), file.getvalue())
+
+        lines = file.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('2024-06-01T00:00:05.000,'))
+        self.assertTrue(lines[-1].startswith('2024-06-02T23:59:55.000,'))
+
+    def testCurve(self):
+        expected = self.simulate(csv=False)
+
+        for arrays in [False, True]:
+            file = io.StringIO()
+            output = TextOutput(file, csv=False)
+            simulation = Simulation(self.pv_gen, weather(0.4, random.Random(1)), output, curve=self.pv_gen.profile(1))
+            if arrays:
+                simulation.process_arrays(
+                    np.array([t.seconds() for t, _ in self.samples]),
+                    np.array([v for _, v in self.samples]))
+            else:
+                simulation.process(self.samples)
+            output.flush()
+            self.assertEqual(file.getvalue(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
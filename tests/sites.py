@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+import sys, os, tempfile, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from contextlib import closing
+
+from libpv.scenarios import Scenario
+from libpv.sites import SiteTable
+from libpv.time_of_day import TimeOfDay
+
+
+class TestSiteTable(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def simulate(self, name: str, max_sites: int, restart_hours=()) -> dict:
+        "Simulates sites `a`, `b` and `c`, and restarts the simulator before the given hours"
+
+        path = os.path.join(self.dir.name, name, '{site}.csv')
+        os.mkdir(os.path.dirname(path))
+
+        def site_table():
+            return SiteTable(1, path, scenarios=[Scenario('b', max_power=1000)], max_sites=max_sites)
+
+        sites = site_table()
+        for hour in range(8, 20):
+            if hour in restart_hours:
+                sites.close()
+                sites = site_table()
+            for site in ['a', 'b', 'c']:
+                sites.process(site, [(TimeOfDay.from_hms(hour, m), -1000) for m in range(0, 60, 10)])
+            self.assertLessEqual(len(sites), max_sites)
+            if sites.pending() >= 50:
+                sites.flush()
+                self.assertEqual(sites.pending(), 0)
+        sites.close()
+
+        results = {}
+        for site in ['a', 'b', 'c']:
+            # the positions are stored in a checkpoint next to the output
+            self.assertTrue(os.path.exists(path.replace('{site}', site) + '.checkpoint'))
+            with open(path.replace('{site}', site)) as file:
+                results[site] = file.read()
+        return results
+
+    def testEviction(self):
+        results = self.simulate('all', 3)
+        self.assertEqual(self.simulate('evicted', 1), results)
+
+        self.assertEqual(len(results['a'].splitlines()), 72)
+        self.assertTrue(results['a'].startswith('08:00:00,-1000,'))
+        # sites have different weather and parameters
+        self.assertNotEqual(results['a'], results['c'])
+        self.assertLess(
+            max(int(line.split(',')[2]) for line in results['b'].splitlines()),
+            max(int(line.split(',')[2]) for line in results['a'].splitlines()))
+
+    def testRestart(self):
+        results = self.simulate('all', 3)
+        self.assertEqual(self.simulate('restarted', 3, restart_hours=[10, 15]), results)
+        self.assertEqual(self.simulate('restarted_evicted', 1, restart_hours=[12]), results)
+
+    def testExistingOutput(self):
+        path = os.path.join(self.dir.name, '{site}.txt')
+        with open(path.replace('{site}', 'a'), 'w') as file:
+            file.write('left from another run\n')
+        with closing(SiteTable(1, path)) as sites:
+            with self.assertRaises(FileExistsError):
+                sites.process('a', [(TimeOfDay(5), -100)])
+            sites.process('b', [(TimeOfDay(5), -100)])
+            self.assertEqual(len(sites), 1)
+
+        # a checkpoint of another seed
+        with closing(SiteTable(2, path)) as sites:
+            with self.assertRaises(ValueError):
+                sites.process('b', [(TimeOfDay(10), -100)])
+
+    def testInvalidSite(self):
+        with closing(SiteTable(1, os.path.join(self.dir.name, '{site}.txt'))) as sites:
+            with self.assertRaises(ValueError):
+                sites.process('../x', [(TimeOfDay(5), -100)])
+        with self.assertRaises(ValueError):
+            SiteTable(1, os.path.join(self.dir.name, 'values.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+import sys, os, io, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+from datetime import date
+from itertools import repeat
+import numpy as np
+
+from libpv.output import TextOutput
+from libpv.simulation import Simulation, simulate_offline
+from libpv.solar import SolarPvGenerator, fleet_profiles, sun_position
+from libpv.time_of_day import TimeOfDay, Timestamp
+
+
+class TestSolar(unittest.TestCase):
+    def setUp(self):
+        # Berlin, summer solstice, local time = UTC + 2
+        self.gen = SolarPvGenerator(52.5, 13.4, date(2026, 6, 21), 3500, utc_offset=2)
+
+    def testSunPosition(self):
+        # at the equator during an equinox, the sun is almost at the zenith at 12:00 solar time
+        (cos_zenith, azimuth) = sun_position(80, [12 * 3600, 0], 0, 0)
+        self.assertGreater(cos_zenith[0], 0.99)
+        self.assertLess(cos_zenith[1], -0.99)
+
+        # in the northern hemisphere, the sun is in the south at noon
+        (_, azimuth) = sun_position(172, [12 * 3600], 52.5, 0)
+        self.assertAlmostEqual(np.degrees(azimuth[0]), 180, delta=5)
+
+    def testDailyProfile(self):
+        profile = self.gen.profile(60)
+        self.assertEqual(len(profile), 1440)
+        self.assertEqual(profile[0], 0)
+        self.assertEqual(profile[23 * 60], 0)
+        self.assertGreaterEqual(profile.min(), 0)
+        self.assertLessEqual(profile.max(), 3500)
+
+        # the maximum is around 13:15 local time
+        self.assertAlmostEqual(int(np.argmax(profile)) / 60, 13.25, delta=1)
+
+    def testScalarMatchesArrays(self):
+        seconds = np.arange(0, 86400, 900)
+        self.assertTrue(np.allclose(
+            self.gen.get_values(seconds),
+            [self.gen.get_value(TimeOfDay(int(s))) for s in seconds]))
+        self.assertTrue(np.allclose(self.gen.get_values(seconds), self.gen.profile(900)))
+
+    def testSeasonsAndOrientation(self):
+        winter = SolarPvGenerator(52.5, 13.4, date(2026, 12, 21), 3500, utc_offset=1)
+        north = SolarPvGenerator(52.5, 13.4, date(2026, 6, 21), 3500, azimuth=0, utc_offset=2)
+        self.assertGreater(self.gen.profile(60).sum(), 2 * winter.profile(60).sum())
+        self.assertGreater(self.gen.profile(60).sum(), north.profile(60).sum())
+
+    def testFleet(self):
+        latitudes = [52.5, 40.4, 52.5]
+        longitudes = [13.4, -3.7, 13.4]
+        tilts = [30, 10, 45]
+        profiles = fleet_profiles(date(2026, 6, 21), latitudes, longitudes, 3500, tilts, 180, 2, step=300)
+        self.assertEqual(profiles.shape, (3, 288))
+
+        for i in range(3):
+            gen = SolarPvGenerator(latitudes[i], longitudes[i], date(2026, 6, 21), 3500, tilts[i], 180, 2)
+            self.assertTrue(np.allclose(profiles[i], gen.profile(300)))
+
+    def testDates(self):
+        winter = self.gen.for_date(date(2026, 12, 21))
+        self.assertEqual(winter.day_of_year, 355)
+        self.assertEqual(self.gen.day_of_year, 172)
+
+        # timestamps use the sun position of their own date
+        times = np.array(['2026-06-21T12:00', '2026-12-21T12:00'], dtype='M8[ms]')
+        self.assertTrue(np.allclose(
+            self.gen.get_values(times),
+            [self.gen.get_values([12 * 3600])[0], winter.get_values([12 * 3600])[0]]))
+        self.assertAlmostEqual(
+            self.gen.get_value(Timestamp.parse('2026-12-21T12:00')), winter.get_value(TimeOfDay.from_hms(12)))
+
+    def testOfflineDays(self):
+        gen = SolarPvGenerator(52.5, 13.4, date(2026, 12, 20), 3500, utc_offset=1)
+        file = io.StringIO()
+        simulation = Simulation(gen, repeat(1.0), TextOutput(file, csv=True), curve=gen.profile(1))
+        simulate_offline(simulation, 0, meter_seed=1, days=2, first_day=1, seconds_step=60)
+
+        # the second day is simulated on its own date, also when it is resumed
+        pv_values = [int(line.split(',')[2]) for line in file.getvalue().splitlines()]
+        expected = gen.for_date(date(2026, 12, 21)).profile(60)[1:]
+        self.assertEqual(pv_values, np.rint(expected).astype(int).tolist())
+        self.assertEqual(simulation.date, date(2026, 12, 21))
+
+    def testTimestampSamples(self):
+        file = io.StringIO()
+        simulation = Simulation(self.gen, repeat(1.0), TextOutput(file, csv=True), curve=self.gen.profile(1))
+        noon = [Timestamp.parse('2026-06-21T12:00'), Timestamp.parse('2026-12-21T12:00')]
+
+        simulation.process([(time, 0) for time in noon])
+        simulation.process_arrays(np.array([time.millis for time in noon], dtype='M8[ms]'), np.zeros(2, dtype=np.int64))
+        self.assertEqual(simulation.date, date(2026, 12, 21))
+
+        expected = [round(self.gen.get_value(time)) for time in noon] * 2
+        simulation.output.flush()
+        self.assertEqual([int(line.split(',')[2]) for line in file.getvalue().splitlines()], expected)
+
+    def testValidation(self):
+        with self.assertRaises(ValueError):
+            SolarPvGenerator(100, 0, date(2026, 1, 1), 3500)
+
+
+if __name__ == '__main__':
+    unittest.main()
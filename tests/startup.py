@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import sys, os, subprocess, unittest
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# pylint: disable=import-error
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ['meter', 'simulator', 'scenarios', 'merge', 'battery', 'ensemble']
+# modules that must only be imported when they are needed
+HEAVY_MODULES = ['numpy', 'pika', 'pyarrow']
+# the time to import a command line program, excluding the interpreter startup. The real time is
+# about 20 ms, but the budget leaves room for slow machines.
+BUDGET_MICROS = 150_000
+
+
+def import_times(*args: str) -> dict:
+    "Runs python with `-X importtime` and returns the cumulative import time of every module in µs"
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            (_, cumulative, name) = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def testHelp(self):
+        for script in SCRIPTS:
+            times = import_times(f'{script}.py', '--help')
+            self.assertIn(f'libpv.cli.{script}', times)
+            for module in HEAVY_MODULES:
+                self.assertNotIn(module, times, f'{script}.py --help imports {module}')
+
+    def testInvalidArguments(self):
+        with self.assertRaises(subprocess.CalledProcessError) as e:
+            import_times('simulator.py', '--days', '0')
+        self.assertNotIn('numpy', e.exception.stderr)
+        self.assertNotIn('pika', e.exception.stderr)
+
+    def testImportTime(self):
+        for script in SCRIPTS:
+            # the best of a few runs, since the first run may have to read the files from disk
+            best = min(import_times('-c', f'import libpv.cli.{script}')[f'libpv.cli.{script}'] for _ in range(3))
+            self.assertLess(best, BUDGET_MICROS, f'importing libpv.cli.{script} took {best} µs')
+
+
+if __name__ == '__main__':
+    unittest.main()
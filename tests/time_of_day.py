@@ -3,7 +3,9 @@ import sys, os, random, unittest
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # pylint: disable=import-error
 
-from libpv.time_of_day import TimeOfDay, rem_euclid
+from datetime import date
+
+from libpv.time_of_day import TimeOfDay, Timestamp, rem_euclid, hms_strings, SECS_PER_DAY
 
 
 class TestTimeOfDay(unittest.TestCase):
@@ -47,9 +49,65 @@ class TestTimeOfDay(unittest.TestCase):
         self.assertLess(TimeOfDay(0), TimeOfDay(1))
         self.assertGreater(TimeOfDay(1), TimeOfDay(0))
 
+        self.assertLessEqual(TimeOfDay(1), TimeOfDay(1))
+        self.assertGreaterEqual(TimeOfDay(1), TimeOfDay(1))
+        self.assertNotEqual(TimeOfDay(1), TimeOfDay(2))
+
+    def testIntComparisons(self):
+        self.assertEqual(TimeOfDay(5), 5)
+        self.assertEqual(TimeOfDay(-1), 86399)
+        self.assertLess(TimeOfDay(0), 1)
+        self.assertGreater(TimeOfDay(1), 0.5)
+        self.assertGreaterEqual(TimeOfDay(1), 1)
+        self.assertNotEqual(TimeOfDay(1), '00:00:01')
+
+    def testHashing(self):
+        self.assertEqual(hash(TimeOfDay(10)), hash(TimeOfDay(86410)))
+        self.assertEqual(len({TimeOfDay(0), TimeOfDay(SECS_PER_DAY), TimeOfDay(1)}), 2)
+
+    def testFormatting(self):
+        self.assertEqual(str(TimeOfDay(SECS_PER_DAY - 1)), '23:59:59')
+        self.assertEqual(str(TimeOfDay(3600.5)), '01:00:00.500')
+        self.assertEqual(str(TimeOfDay(0.1)), '00:00:00.100')
+        self.assertEqual(hms_strings()[7508], '02:05:08')
+        self.assertEqual(len(hms_strings()), SECS_PER_DAY)
+
     def testAdding(self):
         self.assertEqual(TimeOfDay(0) + 10, TimeOfDay(10))
         self.assertEqual(TimeOfDay(30) - 10, TimeOfDay(20))
+        self.assertEqual(TimeOfDay(10) - 20, TimeOfDay(86390))
+        self.assertEqual(TimeOfDay(86390) + 20, TimeOfDay(10))
+        self.assertEqual((TimeOfDay(5) + 0.5).seconds(), 5.5)
+
+
+class TestTimestamp(unittest.TestCase):
+    def testConversion(self):
+        t = Timestamp.parse('2024-06-01T12:00:00.100')
+        self.assertEqual(t.millis, 1717243200100)
+        self.assertEqual(t.seconds(), 43200.1)
+        self.assertEqual(t.date(), date(2024, 6, 1))
+        self.assertEqual(str(t), '2024-06-01T12:00:00.100')
+        self.assertEqual(Timestamp.from_datetime(date(2024, 6, 2)), t + 43199.9)
+        self.assertEqual(Timestamp(1717243200000).seconds(), 43200)
+
+        # aware times are converted to UTC
+        self.assertEqual(Timestamp.parse('2024-06-01T12:00Z'), Timestamp(1717243200000))
+        self.assertEqual(Timestamp.parse('2024-06-01T14:00:00+02:00'), Timestamp(1717243200000))
+
+    def testComparison(self):
+        day1 = Timestamp.parse('2024-06-01T12:00')
+        day2 = Timestamp.parse('2024-06-02T08:00')
+        self.assertLess(day1, day2)
+        self.assertNotEqual(day1, Timestamp.parse('2024-06-02T12:00'))
+        # compared with a time of day, only the time of day counts, but they are never equal
+        eight = TimeOfDay.from_hms(8)
+        self.assertGreater(day1, eight)
+        self.assertLessEqual(day2, eight)
+        self.assertNotEqual(day2, eight)
+        self.assertNotEqual(eight, day2)
+        self.assertNotEqual(day2, eight.seconds())
+        self.assertEqual(day2.seconds(), eight.seconds())
+        self.assertEqual(len({day2, eight, Timestamp.parse('2024-06-02T08:00')}), 2)
 
 
 if __name__ == '__main__':